@@ -0,0 +1,89 @@
+"""
+Action Mask - Direcciones transitables desde la casilla del jugador
+Combina colisiones de la pantalla, sprites y bordillos para no malgastar steps contra paredes
+"""
+
+from core.sprites import FACING, FACINGS, SPRITE_STATE_DATA_1, read_sprites, sprite_tiles
+from core.text_observation import PLAYER_CELL, read_screen_warps, read_walkable_blocks
+
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+# Celda vecina en la rejilla 9x10 de bloques (fila, columna), ver read_walkable_blocks
+GRID_DELTAS = {
+    "UP": (-1, 0),
+    "DOWN": (1, 0),
+    "LEFT": (0, -1),
+    "RIGHT": (0, 1),
+}
+
+# Bordillos (pokered LedgeTiles): (dirección, tile bajo el jugador, tile de enfrente)
+TILE_MAP_ADDR = 0xC3A0          # wTileMap: 20x18 tiles de la pantalla
+SCREEN_WIDTH = 20
+CUR_TILESET_ADDR = 0xD367       # wCurMapTileset; los bordillos solo existen en OVERWORLD (0)
+STANDING_TILE = (9, 8)          # (fila, columna) en wTileMap
+FRONT_TILES = {"UP": (7, 8), "DOWN": (11, 8), "LEFT": (9, 6), "RIGHT": (9, 10)}
+LEDGE_TILES = {
+    ("DOWN", 0x2C, 0x37), ("DOWN", 0x39, 0x36), ("DOWN", 0x39, 0x37),
+    ("LEFT", 0x2C, 0x27), ("LEFT", 0x39, 0x27),
+    ("RIGHT", 0x2C, 0x0D), ("RIGHT", 0x2C, 0x1D), ("RIGHT", 0x39, 0x0D),
+}
+
+
+def _tile_at(memory, cell):
+    return memory[TILE_MAP_ADDR + cell[0] * SCREEN_WIDTH + cell[1]]
+
+
+def is_ledge_jump(memory, direction):
+    """True si pulsar `direction` salta un bordillo"""
+    if memory[CUR_TILESET_ADDR] != 0:
+        return False
+    standing = _tile_at(memory, STANDING_TILE)
+    front = _tile_at(memory, FRONT_TILES[direction])
+    return (direction, standing, front) in LEDGE_TILES
+
+
+def player_facing(memory):
+    return FACINGS[(memory[SPRITE_STATE_DATA_1 + FACING] >> 2) & 0x3]
+
+
+def passable_directions(emu, game_state):
+    """
+    Direcciones que mueven (o giran de forma útil) al jugador
+
+    - Pared según la colisión de PyBoy: bloqueada, salvo bordillo saltable o warp.
+    - NPC / objeto en la casilla: bloqueada si ya se le mira; si no, se deja
+      para poder girarse y hablar con él.
+    - Sobre un warp o en batalla / diálogo no se enmascara nada.
+
+    Returns:
+        Tupla con las direcciones permitidas (en el orden de DIRECTIONS)
+    """
+    if game_state.get('in_battle') or game_state.get('in_dialog'):
+        return DIRECTIONS
+    wrapper = getattr(emu, 'game_wrapper', None)
+    if wrapper is None:
+        return DIRECTIONS
+
+    memory = emu.memory
+    walkable = read_walkable_blocks(wrapper)
+    origin = (game_state['x'] - PLAYER_CELL[0], game_state['y'] - PLAYER_CELL[1])
+    warps = read_screen_warps(memory, origin)
+    if PLAYER_CELL in warps:
+        return DIRECTIONS
+
+    occupied = sprite_tiles(read_sprites(memory))
+    facing = player_facing(memory)
+
+    allowed = []
+    for direction in DIRECTIONS:
+        dr, dc = GRID_DELTAS[direction]
+        cell = (PLAYER_CELL[0] + dr, PLAYER_CELL[1] + dc)
+        tile = (game_state['x'] + dr, game_state['y'] + dc)
+
+        if tile in occupied:
+            if direction != facing:
+                allowed.append(direction)
+            continue
+        if walkable[cell] or cell in warps or is_ledge_jump(memory, direction):
+            allowed.append(direction)
+    return tuple(allowed)
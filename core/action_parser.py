@@ -0,0 +1,69 @@
+"""
+Action Parser - Gramática estricta para la respuesta del LLM
+Reconoce el botón palabra a palabra, apto para respuestas en streaming
+"""
+
+VALID_ACTIONS = ("UP", "DOWN", "LEFT", "RIGHT", "A", "B")
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+
+class ActionStreamParser:
+    """
+    Parser incremental de la respuesta del modelo
+
+    Reglas:
+        - Solo cuentan palabras completas (seguidas de un separador o del fin del stream),
+          así "A" nunca coincide dentro de "ATTACK" ni "UP" dentro de "UPSTAIRS".
+        - La primera palabra manda: si es un botón válido (incluidos A y B), se acepta.
+        - Después de la primera palabra solo se aceptan direcciones, para no confundir
+          el artículo "A" de una frase con el botón A.
+    """
+
+    def __init__(self, valid_actions=VALID_ACTIONS):
+        self.valid_actions = set(valid_actions)
+        self.text = ""
+        self.action = None
+        self._word = []
+        self._words_seen = 0
+
+    def feed(self, chunk):
+        """
+        Procesa un fragmento de texto
+
+        Returns:
+            El botón reconocido, o None si aún no hay ninguno
+        """
+        if self.action is not None or not chunk:
+            return self.action
+
+        self.text += chunk
+        for char in chunk:
+            if char.isalnum():
+                self._word.append(char)
+            elif self._word:
+                if self._close_word():
+                    return self.action
+        return None
+
+    def finish(self):
+        """Cierra el stream: la última palabra pendiente cuenta como completa"""
+        if self.action is None and self._word:
+            self._close_word()
+        return self.action
+
+    def _close_word(self):
+        word = "".join(self._word).upper()
+        self._word = []
+        self._words_seen += 1
+
+        if word in self.valid_actions and (self._words_seen == 1 or word in DIRECTIONS):
+            self.action = word
+            return True
+        return False
+
+
+def parse_action(text, valid_actions=VALID_ACTIONS):
+    """Aplica la gramática a una respuesta completa"""
+    parser = ActionStreamParser(valid_actions)
+    parser.feed(text)
+    return parser.finish()
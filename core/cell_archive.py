@@ -0,0 +1,220 @@
+"""
+Cell Archive - Archivo estilo Go-Explore de estados prometedores
+Cada celda guarda un save state comprimido con zstd para poder volver a ella
+"""
+
+import io
+import json
+import math
+import os
+from dataclasses import asdict, dataclass
+
+import zstandard
+
+from core.game_state import event_flag_digest
+
+
+@dataclass
+class Cell:
+    """Una celda del archivo: (mapa, x/y gruesos, medallas, huella de flags)"""
+
+    key: tuple
+    score: float
+    size: int = 0
+    seen: int = 0            # Veces que el agente pasó por la celda
+    chosen: int = 0          # Veces que se restauró como frontera
+    on_disk: bool = False
+
+    @property
+    def map_id(self):
+        return self.key[0]
+
+    @property
+    def badges(self):
+        return self.key[3]
+
+
+class CellArchive:
+    """
+    Archivo de celdas con presupuesto de memoria y disco
+
+    - Las celdas nuevas o con mejor score guardan el save state comprimido.
+    - Si se supera el presupuesto de memoria, los estados menos valiosos se
+      vuelcan a disco; si se supera el de disco, se eliminan primero las
+      celdas dominadas (misma posición gruesa, menos medallas y menos score).
+    - `select_frontier` elige celdas poco exploradas (peso 1/sqrt(1+visitas)).
+    """
+
+    def __init__(self, directory="cell_archive", coarse=4, memory_budget=64 * 1024 * 1024,
+                 disk_budget=1024 * 1024 * 1024, compression_level=3):
+        """
+        Args:
+            directory: Carpeta para estados volcados a disco y el índice
+            coarse: Tamaño (en casillas) de la rejilla gruesa de x/y
+            memory_budget: Bytes máximos de estados comprimidos en memoria
+            disk_budget: Bytes máximos de estados en disco
+            compression_level: Nivel de zstd
+        """
+        self.directory = directory
+        self.coarse = coarse
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+        self.cells = {}
+        self.states = {}          # key -> bytes comprimidos (solo celdas en memoria)
+        self.memory_used = 0
+        self.disk_used = 0
+
+        self._load_index()
+
+    def cell_key(self, emu, game_state):
+        return (
+            game_state['map_id'],
+            game_state['x'] // self.coarse,
+            game_state['y'] // self.coarse,
+            game_state['badges'],
+            event_flag_digest(emu),
+        )
+
+    def update(self, emu, game_state, score):
+        """
+        Registra la visita a la celda actual
+
+        Returns:
+            True si la celda es nueva o mejoró su score (se guardó el estado)
+        """
+        key = self.cell_key(emu, game_state)
+        cell = self.cells.get(key)
+
+        if cell is not None:
+            cell.seen += 1
+            if score <= cell.score:
+                return False
+            cell.score = score
+        else:
+            cell = self.cells[key] = Cell(key=key, score=score, seen=1)
+
+        buffer = io.BytesIO()
+        emu.save_state(buffer)
+        self._store(cell, self._compressor.compress(buffer.getvalue()))
+        self._enforce_budgets()
+        return True
+
+    def select_frontier(self, current_key=None, min_score=None, max_score=None):
+        """Elige una celda poco explorada (None si no hay candidatas)"""
+        best = None
+        best_weight = 0.0
+        for cell in self.cells.values():
+            if cell.key == current_key:
+                continue
+            if min_score is not None and cell.score < min_score:
+                continue
+            if max_score is not None and cell.score > max_score:
+                continue
+            weight = 1.0 / math.sqrt(1 + cell.chosen + 0.5 * cell.seen)
+            if weight > best_weight:
+                best, best_weight = cell, weight
+        return best
+
+    def restore(self, emu, cell):
+        """Carga el estado de la celda en el emulador"""
+        data = self.states.get(cell.key)
+        if data is None:
+            with open(self._path(cell.key), 'rb') as f:
+                data = f.read()
+        emu.load_state(io.BytesIO(self._decompressor.decompress(data)))
+        cell.chosen += 1
+
+    # --- Almacenamiento ---
+
+    def _path(self, key):
+        return os.path.join(self.directory, "cell_" + "_".join(str(k) for k in key) + ".zst")
+
+    def _store(self, cell, data):
+        self._discard_state(cell)
+        self.states[cell.key] = data
+        cell.size = len(data)
+        cell.on_disk = False
+        self.memory_used += cell.size
+
+    def _discard_state(self, cell):
+        if cell.key in self.states:
+            self.memory_used -= len(self.states.pop(cell.key))
+        if cell.on_disk:
+            try:
+                os.remove(self._path(cell.key))
+            except OSError:
+                pass
+            self.disk_used -= cell.size
+            cell.on_disk = False
+
+    def _value(self, cell):
+        """Valor para decidir qué se vuelca / elimina primero (menor = antes)"""
+        return (cell.score, cell.badges, -cell.chosen)
+
+    def _is_dominated(self, cell):
+        for other in self.cells.values():
+            if other is cell or other.key[:3] != cell.key[:3]:
+                continue
+            if other.badges >= cell.badges and other.score >= cell.score:
+                return True
+        return False
+
+    def _enforce_budgets(self):
+        if self.memory_used > self.memory_budget:
+            os.makedirs(self.directory, exist_ok=True)
+            for cell in sorted((self.cells[k] for k in self.states), key=self._value):
+                if self.memory_used <= self.memory_budget:
+                    break
+                data = self.states.pop(cell.key)
+                with open(self._path(cell.key), 'wb') as f:
+                    f.write(data)
+                self.memory_used -= len(data)
+                self.disk_used += len(data)
+                cell.on_disk = True
+
+        if self.disk_used > self.disk_budget:
+            on_disk = [c for c in self.cells.values() if c.on_disk]
+            order = sorted(on_disk, key=lambda c: (not self._is_dominated(c), self._value(c)))
+            for cell in order:
+                if self.disk_used <= self.disk_budget:
+                    break
+                self._discard_state(cell)
+                del self.cells[cell.key]
+
+    # --- Índice persistente (para reutilizar el archivo entre ejecuciones) ---
+
+    def save_index(self):
+        """Vuelca a disco los estados en memoria y guarda el índice"""
+        os.makedirs(self.directory, exist_ok=True)
+        for key, data in list(self.states.items()):
+            with open(self._path(key), 'wb') as f:
+                f.write(data)
+            self.cells[key].on_disk = True
+            self.disk_used += len(data)
+        self.states.clear()
+        self.memory_used = 0
+
+        index_path = os.path.join(self.directory, "index.json")
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([asdict(c) for c in self.cells.values()], f)
+        os.replace(tmp_path, index_path)
+
+    def _load_index(self):
+        index_path = os.path.join(self.directory, "index.json")
+        if not os.path.exists(index_path):
+            return
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for data in json.load(f):
+                    data['key'] = tuple(data['key'])
+                    cell = Cell(**data)
+                    if cell.on_disk and os.path.exists(self._path(cell.key)):
+                        self.cells[cell.key] = cell
+                        self.disk_used += cell.size
+        except (OSError, ValueError, TypeError) as e:
+            print(f"    ERROR: loading cell archive index: {e}")
@@ -0,0 +1,137 @@
+"""
+Checkpoint Manager - Guardado periódico y atómico del estado completo del agente
+Incluye el save state de PyBoy y un snapshot de cada componente del core
+"""
+
+import glob
+import io
+import os
+import pickle
+import threading
+import time
+
+CHECKPOINT_VERSION = 1
+
+
+class CheckpointManager:
+    """
+    Escribe checkpoints rotados en disco
+
+    Cada componente registrado debe implementar `to_dict()` y `load_dict(data)`.
+    El snapshot se toma en el hilo principal (consistente con el step) y la
+    escritura a disco se hace en segundo plano con tmp + fsync + rename.
+    """
+
+    def __init__(self, directory="checkpoints", every=250, keep=3):
+        """
+        Args:
+            directory: Carpeta de checkpoints
+            every: Steps entre checkpoints automáticos
+            keep: Número de checkpoints que se conservan
+        """
+        self.directory = directory
+        self.every = max(1, every)
+        self.keep = max(1, keep)
+        self._writer = None
+
+    def maybe_save(self, step, emu, components):
+        """Guarda si toca según `every`"""
+        if step > 0 and step % self.every == 0:
+            self.save(step, emu, components)
+
+    def save(self, step, emu, components):
+        """
+        Toma un snapshot y lo escribe en segundo plano
+
+        Args:
+            step: Step actual (se restaura como contador del loop)
+            emu: Instancia de PyBoy
+            components: Dict nombre -> componente con to_dict()
+        """
+        emu_buffer = io.BytesIO()
+        emu.save_state(emu_buffer)
+
+        payload = {
+            'version': CHECKPOINT_VERSION,
+            'step': step,
+            'timestamp': time.time(),
+            'components': {name: comp.to_dict() for name, comp in components.items()},
+            'emulator_state': emu_buffer.getvalue(),
+        }
+        # Serializar aquí: el hilo de escritura no debe ver objetos que el loop sigue mutando
+        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Un solo escritor a la vez
+        self.wait()
+        self._writer = threading.Thread(
+            target=self._write, args=(step, data), name="checkpoint-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _write(self, step, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"checkpoint_{step:07d}.ckpt")
+        tmp_path = path + ".tmp"
+
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self._rotate()
+            print(f"   💾 Checkpoint saved: {path}")
+        except OSError as e:
+            print(f"    ERROR: writing checkpoint: {e}")
+
+    def _rotate(self):
+        for old in self.list_checkpoints()[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def wait(self):
+        """Espera a que termine la escritura pendiente"""
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def list_checkpoints(self):
+        """Checkpoints completos ordenados del más antiguo al más reciente"""
+        return sorted(glob.glob(os.path.join(self.directory, "checkpoint_*.ckpt")))
+
+    def latest_path(self):
+        checkpoints = self.list_checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def load(self, path=None):
+        """
+        Carga un checkpoint (el más reciente si no se indica ruta)
+
+        Returns:
+            Payload del checkpoint, o None si no hay ninguno
+        """
+        path = path or self.latest_path()
+        if path is None:
+            return None
+
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+
+        if payload.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {payload.get('version')}")
+        return payload
+
+    def restore(self, payload, emu, components):
+        """
+        Restaura emulador y componentes desde un payload
+
+        Returns:
+            Step en el que se guardó el checkpoint
+        """
+        emu.load_state(io.BytesIO(payload['emulator_state']))
+        for name, comp in components.items():
+            if name in payload['components']:
+                comp.load_dict(payload['components'][name])
+        return payload['step']
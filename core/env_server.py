@@ -0,0 +1,336 @@
+"""
+Env Server - Servidor local de emuladores con API de steps por lotes
+Envuelve PyBoy + read_game_state + PokemonRedReader + EventChecker detrás de un
+socket Unix o TCP en localhost, con mensajes msgpack de longitud prefijada
+"""
+
+import argparse
+import io
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+import msgpack
+from pyboy import PyBoy
+
+from core.event_checker import EventChecker
+from core.game_state import read_game_state
+from core.input_scheduler import InputScheduler, skip_intro
+from core.memory_buffer_ko import PokemonRedReader
+
+_HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def send_message(sock, payload):
+    data = msgpack.packb(payload, use_bin_type=True)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    """Lee un mensaje completo (None si el otro extremo cerró la conexión)"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message too large: {length} bytes")
+    data = _recv_exact(sock, length)
+    if data is None:
+        return None
+    return msgpack.unpackb(data, raw=False)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class EmulatorSlot:
+    """Un emulador del pool con sus lectores; se usa bajo `lock`"""
+
+    def __init__(self, rom_path, events_file, init_state=None, **scheduler_kwargs):
+        self.emu = PyBoy(rom_path, window="null")
+        self.emu.set_emulation_speed(0)
+        self.scheduler = InputScheduler(self.emu, render=False, **scheduler_kwargs)
+        self.reader = PokemonRedReader(self.emu.memory)
+        self.event_checker = EventChecker(events_file)
+        if init_state is None:
+            # Sin save state inicial: saltar la intro una sola vez y partir siempre de ahí
+            skip_intro(self.emu)
+            init_state = self.snapshot()
+        self.init_state = init_state
+        self.lock = threading.Lock()
+        self.owner = None
+
+    def reset(self, state=None):
+        self.restore(state or self.init_state)
+        self.event_checker.reset()
+
+    def snapshot(self):
+        buffer = io.BytesIO()
+        self.emu.save_state(buffer)
+        return buffer.getvalue()
+
+    def restore(self, state):
+        self.emu.load_state(io.BytesIO(state))
+        self.emu.tick(1, True)
+
+    def step(self, actions, objective=None):
+        frames = 0
+        states = []
+        for action in actions:
+            frames += self.scheduler.execute(action)
+            states.append(read_game_state(self.emu))
+
+        result = {'states': states, 'frames': frames}
+        if objective is not None:
+            result['objective_complete'] = self.event_checker.check_objective_complete(
+                objective, states[-1] if states else read_game_state(self.emu), self.emu.memory
+            )
+        return result
+
+    def observe(self, include):
+        """Datos opcionales por petición: 'state', 'screen' (RGB crudo), 'reader'"""
+        obs = {}
+        if 'state' in include:
+            obs['state'] = read_game_state(self.emu)
+        if 'screen' in include:
+            obs['screen'] = self.emu.screen.ndarray[:, :, :3].tobytes()
+        if 'reader' in include:
+            obs['reader'] = {
+                'player': self.reader.read_player_name(),
+                'location': self.reader.read_location(),
+                'coordinates': list(self.reader.read_coordinates()),
+                'money': self.reader.read_money(),
+                'badges': self.reader.read_badges(),
+                'dialog': self.reader.read_dialog(),
+                'sprites': self.reader.read_sprites().tolist(),
+            }
+        return obs
+
+    def close(self):
+        self.emu.stop(save=False)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server.env_server
+        owned = set()
+        try:
+            while True:
+                request = recv_message(self.request)
+                if request is None:
+                    break
+                try:
+                    response = server.dispatch(request, owned)
+                    response['ok'] = True
+                except Exception as e:
+                    response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+                send_message(self.request, response)
+        finally:
+            server.release_all(owned)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class EnvServer:
+    """
+    Pool de emuladores compartido por varios procesos planner
+
+    Operaciones (campo 'op'):
+      acquire                     -> {'env': id} reserva un emulador libre
+      release  env                -> libera el emulador
+      reset    env [state]        -> estado inicial, save state opcional
+      step     env actions [objective]
+                                  -> {'states': [...], 'frames': n, 'objective_complete'?}
+      snapshot env                -> {'state': bytes}
+      restore  env state
+      batch    requests           -> {'responses': [...]} varias operaciones en un mensaje
+    Todas aceptan 'include': ['state', 'screen', 'reader'] para adjuntar observaciones.
+    """
+
+    def __init__(self, rom_path, pool_size=4, events_file="config/events.json",
+                 init_state=None, **scheduler_kwargs):
+        """
+        Args:
+            rom_path: ROM de Pokémon Red
+            pool_size: Número de emuladores del pool
+            events_file: Ruta a events.json
+            init_state: Save state (bytes o ruta) para reset; None = saltar la intro
+            **scheduler_kwargs: Parámetros del InputScheduler
+        """
+        if isinstance(init_state, str):
+            with open(init_state, 'rb') as f:
+                init_state = f.read()
+        self.slots = [
+            EmulatorSlot(rom_path, events_file, init_state, **scheduler_kwargs)
+            for _ in range(pool_size)
+        ]
+        self._pool_lock = threading.Lock()
+        self._server = None
+
+    def _slot(self, request, owned):
+        env = request['env']
+        if env not in owned:
+            raise PermissionError(f"Env {env} not acquired by this connection")
+        return self.slots[env]
+
+    def dispatch(self, request, owned):
+        op = request['op']
+
+        if op == 'batch':
+            return {'responses': [self._dispatch_one(r, owned) for r in request['requests']]}
+        return self._dispatch_one(request, owned)
+
+    def _dispatch_one(self, request, owned):
+        op = request['op']
+
+        if op == 'acquire':
+            with self._pool_lock:
+                for env, slot in enumerate(self.slots):
+                    if slot.owner is None:
+                        slot.owner = id(owned)
+                        owned.add(env)
+                        return {'env': env}
+            raise RuntimeError("No free emulators in the pool")
+
+        if op == 'release':
+            self.release_all({request['env']} & owned)
+            owned.discard(request['env'])
+            return {}
+
+        slot = self._slot(request, owned)
+        with slot.lock:
+            if op == 'reset':
+                slot.reset(request.get('state'))
+                response = {}
+            elif op == 'step':
+                response = slot.step(request['actions'], request.get('objective'))
+            elif op == 'snapshot':
+                response = {'state': slot.snapshot()}
+            elif op == 'restore':
+                slot.restore(request['state'])
+                response = {}
+            else:
+                raise ValueError(f"Unknown op: {op}")
+            response.update(slot.observe(request.get('include', ())))
+        return response
+
+    def release_all(self, envs):
+        with self._pool_lock:
+            for env in envs:
+                self.slots[env].owner = None
+
+    def serve_forever(self, address):
+        """
+        Args:
+            address: Ruta de socket Unix (str) o (host, port) en localhost
+        """
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            self._server = _UnixServer(address, _Handler)
+        else:
+            self._server = _TCPServer(address, _Handler)
+        self._server.env_server = self
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if isinstance(address, str) and os.path.exists(address):
+                os.remove(address)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+        for slot in self.slots:
+            slot.close()
+
+
+class EnvClient:
+    """Cliente del EnvServer (una conexión; puede reservar varios emuladores)"""
+
+    def __init__(self, address):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.connect(address)
+
+    def call(self, op, **fields):
+        fields['op'] = op
+        send_message(self.sock, fields)
+        response = recv_message(self.sock)
+        if response is None:
+            raise ConnectionError("Env server closed the connection")
+        if not response.pop('ok'):
+            raise RuntimeError(response['error'])
+        return response
+
+    def acquire(self):
+        return self.call('acquire')['env']
+
+    def release(self, env):
+        self.call('release', env=env)
+
+    def reset(self, env, state=None, include=('state',)):
+        return self.call('reset', env=env, state=state, include=list(include))
+
+    def step(self, env, actions, objective=None, include=()):
+        return self.call('step', env=env, actions=list(actions), objective=objective,
+                         include=list(include))
+
+    def snapshot(self, env):
+        return self.call('snapshot', env=env)['state']
+
+    def restore(self, env, state, include=('state',)):
+        return self.call('restore', env=env, state=state, include=list(include))
+
+    def batch(self, requests):
+        """Envía varias operaciones en un solo mensaje: [{'op': ..., 'env': ...}, ...]"""
+        return self.call('batch', requests=list(requests))['responses']
+
+    def close(self):
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de emuladores Pokémon Red")
+    parser.add_argument("--rom", default="pokemon_red.gb")
+    parser.add_argument("--events", default="config/events.json")
+    parser.add_argument("--state", default=None, help="Save state inicial para reset")
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--socket", default=None, help="Ruta del socket Unix")
+    parser.add_argument("--port", type=int, default=7777, help="Puerto TCP en localhost si no hay --socket")
+    args = parser.parse_args()
+
+    server = EnvServer(args.rom, args.pool, args.events, args.state)
+    address = args.socket or ("127.0.0.1", args.port)
+    print(f"🖥️ Env server con {args.pool} emuladores en {address}")
+    try:
+        server.serve_forever(address)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Escape KB - Secuencias que sacaron al agente de un atasco, por casilla y objetivo
+Clave (map_id, x, y, objective_id); la mejor secuencia de cada clave se mantiene
+precalculada para consultarla en O(1)
+"""
+
+import json
+import os
+
+
+class EscapeKnowledgeBase:
+    """
+    Aprende qué acciones sacan al jugador de cada casilla donde se atascó
+
+    Un episodio empieza en la casilla del atasco y acumula solo las acciones
+    de la rama de escape (steps en los que saltó la detección de atasco).
+    Termina con éxito cuando pasan `clear_steps` steps seguidos en los que la
+    detección se ejecutó y no saltó, y con fallo al llegar a `max_sequence`
+    acciones o al volver a atascarse en otra casilla antes de quedar libre.
+    Salir de la casilla no basta: en NO_PROGRESS o en un loop el jugador ya se mueve.
+    Si otra rama toma el control (lookahead, macro, archivo) el episodio se cancela.
+
+    Cada secuencia guarda intentos, éxitos y la suma de steps hasta quedar libre;
+    a igual tasa de éxito gana la que libera antes.
+    """
+
+    # Resultado de la detección de atasco en el step observado
+    ESCAPE = 'escape'       # saltó y la acción salió de la rama de atasco
+    CLEAR = 'clear'         # se ejecutó y no saltó
+    SKIPPED = None          # no se ejecutó (batalla, sin objetivo...): no cuenta
+
+    def __init__(self, path=None, max_sequence=8, min_success_rate=0.5, clear_steps=5):
+        """
+        Args:
+            path: Fichero JSON donde persistir la base (None = solo en memoria)
+            max_sequence: Acciones máximas de un intento de escape
+            min_success_rate: Tasa de éxito mínima para reutilizar una secuencia
+            clear_steps: Steps seguidos sin atasco para dar el escape por bueno
+        """
+        self.path = path
+        self.max_sequence = max_sequence
+        self.min_success_rate = min_success_rate
+        self.clear_steps = clear_steps
+
+        self.stats = {}         # clave -> {secuencia: [intentos, éxitos, steps hasta quedar libre]}
+        self.best_cache = {}    # clave -> mejor secuencia (tupla)
+        self.episode = None
+        self.dirty = False
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.load_dict(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"    ERROR: loading escape knowledge base: {e}")
+
+    @staticmethod
+    def key(game_state, objective_id):
+        return (game_state['map_id'], game_state['x'], game_state['y'], objective_id)
+
+    def best(self, key):
+        """Mejor secuencia conocida para la clave, o None"""
+        return self.best_cache.get(key)
+
+    def _rank(self, key):
+        best = None
+        best_rank = None
+        for sequence, (attempts, successes, steps) in self.stats[key].items():
+            rate = successes / attempts
+            if rate < self.min_success_rate:
+                continue
+            steps_to_clear = steps / successes if successes else float('inf')
+            rank = (rate, -steps_to_clear, -len(sequence))
+            if best_rank is None or rank > best_rank:
+                best, best_rank = sequence, rank
+        if best is None:
+            self.best_cache.pop(key, None)
+        else:
+            self.best_cache[key] = best
+
+    def update(self, key, sequence, success, steps_to_clear=0):
+        entry = self.stats.setdefault(key, {}).setdefault(tuple(sequence), [0, 0, 0])
+        entry[0] += 1
+        entry[1] += int(success)
+        if success:
+            entry[2] += steps_to_clear
+        self._rank(key)
+        self.dirty = True
+
+    # --- Episodios ---
+
+    def suggest(self, key):
+        """
+        Siguiente acción de escape según la mejor secuencia conocida
+
+        Returns:
+            Acción, o None si no hay secuencia conocida (o ya se agotó)
+        """
+        episode = self.episode
+        if episode is not None and episode['key'] != key and episode['quiet']:
+            # Nuevo atasco en otra casilla antes de quedar libre: el escape anterior no sirvió
+            self._fail()
+        elif episode is not None and episode['key'][3] != key[3]:
+            self.episode = None
+        if self.episode is None:
+            # Dentro de un mismo atasco el episodio sigue aunque el jugador cambie de casilla
+            self.episode = {'key': key, 'sequence': self.best(key), 'actions': [], 'quiet': 0, 'steps': 0}
+        sequence = self.episode['sequence']
+        index = len(self.episode['actions'])
+        if sequence and index < len(sequence):
+            return sequence[index]
+        return None
+
+    def observe(self, action, detection):
+        """
+        Registra el step recién ejecutado
+
+        Args:
+            action: Acción ejecutada
+            detection: ESCAPE, CLEAR o SKIPPED (ver constantes de la clase);
+                solo las acciones ESCAPE forman la secuencia
+
+        Returns:
+            True si el episodio terminó (con éxito o fallo)
+        """
+        episode = self.episode
+        if episode is None or detection is self.SKIPPED:
+            return False
+        episode['steps'] += 1
+
+        if detection == self.CLEAR:
+            episode['quiet'] += 1
+            if episode['quiet'] >= self.clear_steps:
+                steps_to_clear = episode['steps'] - episode['quiet']
+                self.update(episode['key'], episode['actions'], True, steps_to_clear)
+                self.episode = None
+                return True
+            return False
+
+        episode['actions'].append(action)
+        episode['quiet'] = 0
+        if len(episode['actions']) >= self.max_sequence:
+            self._fail()
+            return True
+        return False
+
+    def _fail(self):
+        if self.episode['sequence']:
+            self.update(self.episode['key'], self.episode['sequence'], False)
+        self.episode = None
+
+    def cancel(self):
+        self.episode = None
+
+    # --- Persistencia ---
+
+    def to_dict(self):
+        return {
+            'entries': [
+                {'key': list(key), 'sequence': list(sequence), 'attempts': a, 'successes': s,
+                 'steps_to_clear': steps}
+                for key, sequences in self.stats.items()
+                for sequence, (a, s, steps) in sequences.items()
+            ]
+        }
+
+    def load_dict(self, data):
+        self.stats = {}
+        for entry in data.get('entries', []):
+            key = tuple(entry['key'])
+            self.stats.setdefault(key, {})[tuple(entry['sequence'])] = [
+                entry['attempts'], entry['successes'], entry.get('steps_to_clear', 0)
+            ]
+        self.best_cache = {}
+        for key in self.stats:
+            self._rank(key)
+
+    def save(self):
+        """Persiste la base si hubo cambios (escritura atómica)"""
+        if not self.path or not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"    ERROR: saving escape knowledge base: {e}")
@@ -15,6 +15,7 @@ class EventChecker:
             self.events = json.load(f)
         
         self.completed_events = set()
+        self.run_store = None   # Base de datos de ejecuciones (la asigna el runner)
     
     def _read_flag(self, memory, address_str, bit=None):
         """Lee un flag de memoria (con soporte para bits)"""
@@ -28,6 +29,14 @@ class EventChecker:
             # Leer valor completo
             return value
     
+    def watched_addresses(self):
+        """Direcciones de RAM que pueden cambiar el resultado de los checks"""
+        addresses = [int(self.events['game_state']['badge_count'], 16)]
+        addresses += [int(flag['address'], 16) for flag in self.events['story_flags'].values()]
+        addresses += [int(addr, 16) for addr in self.events['key_items'].values()]
+        addresses += [int(addr, 16) for addr in self.events['hms'].values()]
+        return addresses
+    
     def check_story_flag(self, memory, flag_name):
         """Verifica un story flag específico"""
         if flag_name not in self.events['story_flags']:
@@ -230,6 +239,24 @@ class EventChecker:
         # Default: no completado
         return False
     
+    def poll_story_flags(self, memory):
+        """
+        Marca los story flags que se activaron desde la última consulta
+        
+        Returns:
+            Lista con los nombres de los flags nuevos
+        """
+        new_flags = []
+        for flag_name in self.events['story_flags']:
+            if flag_name in self.completed_events:
+                continue
+            if self.check_story_flag(memory, flag_name):
+                self.mark_event_complete(flag_name)
+                new_flags.append(flag_name)
+                if self.run_store is not None:
+                    self.run_store.record_event('story_flag', flag_name)
+        return new_flags
+    
     def mark_event_complete(self, event_name):
         """Marca evento como completado"""
         self.completed_events.add(event_name)
@@ -242,6 +269,14 @@ class EventChecker:
         """Lista de eventos completados"""
         return list(self.completed_events)
     
+    def to_dict(self):
+        """Snapshot serializable para checkpoints"""
+        return {'completed_events': sorted(self.completed_events)}
+    
+    def load_dict(self, data):
+        """Restaura el estado desde to_dict()"""
+        self.completed_events = set(data.get('completed_events', []))
+    
     def reset(self):
         """Reset del checker"""
         self.completed_events.clear()
@@ -0,0 +1,111 @@
+"""
+Frame History - Últimas K capturas compuestas en una sola imagen
+La captura actual va a tamaño completo con flechas del recorrido reciente y las
+anteriores, reducidas, en columna a su derecha: contexto temporal en una
+única imagen por petición en lugar de K
+"""
+
+from collections import deque
+
+from PIL import Image, ImageDraw
+
+from core.image_payload import BLOCK_PX, PLAYER_PX
+
+SHEET_BACKGROUND = (0xFF, 0xFF, 0xFF)
+SEPARATOR_PX = 2
+
+
+class FrameHistory:
+    """
+    Anillo con las K-1 capturas anteriores (ya reducidas) y composición de la hoja
+
+    Uso por step: `compose(captura, historial, estado)` y después `push(captura)`.
+    """
+
+    def __init__(self, frames=3, thumb_scale=0.5, arrows=True):
+        """
+        Args:
+            frames: Capturas por hoja, incluida la actual (K)
+            thumb_scale: Escala de las capturas anteriores
+            arrows: Dibujar el recorrido reciente sobre la captura actual
+        """
+        if frames < 1:
+            raise ValueError("frames must be >= 1")
+        self.frames = frames
+        self.thumb_scale = thumb_scale
+        self.arrows = arrows
+        self.ring = deque(maxlen=frames - 1)
+
+    def push(self, image):
+        """Guarda una copia reducida de la captura (emu.screen.image se reutiliza entre frames)"""
+        if not self.ring.maxlen:
+            return
+        size = (max(1, int(image.width * self.thumb_scale)), max(1, int(image.height * self.thumb_scale)))
+        self.ring.append(image.convert('RGB').resize(size, Image.Resampling.BOX))
+
+    def clear(self):
+        """Olvida las capturas anteriores (saltos de estado: checkpoint, archivo...)"""
+        self.ring.clear()
+
+    def compose(self, image, positions=(), game_state=None):
+        """
+        Args:
+            image: Captura actual (PIL)
+            positions: MemoryBuffer.get_position_history(), de la más antigua a la más reciente
+            game_state: Estado actual (posición del jugador; sin flechas en batalla)
+
+        Returns:
+            Imagen RGB: captura actual a la izquierda y anteriores a la derecha (la más reciente arriba)
+        """
+        current = image.convert('RGB')
+        if self.arrows and game_state is not None and not game_state.get('in_battle'):
+            self._draw_trail(current, positions, game_state)
+        if not self.ring:
+            return current
+
+        thumbs = list(reversed(self.ring))
+        thumb_w, thumb_h = thumbs[0].size
+        rows = max(1, (current.height + SEPARATOR_PX) // (thumb_h + SEPARATOR_PX))
+        columns = -(-len(thumbs) // rows)
+        width = current.width + columns * (thumb_w + SEPARATOR_PX)
+
+        sheet = Image.new('RGB', (width, current.height), SHEET_BACKGROUND)
+        sheet.paste(current, (0, 0))
+        for i, thumb in enumerate(thumbs):
+            column, row = divmod(i, rows)
+            left = current.width + SEPARATOR_PX + column * (thumb_w + SEPARATOR_PX)
+            sheet.paste(thumb, (left, row * (thumb_h + SEPARATOR_PX)))
+        return sheet
+
+    def _draw_trail(self, image, positions, game_state):
+        """Flechas casilla a casilla desde las posiciones recientes hasta la actual"""
+        here = (game_state['map_id'], game_state['x'], game_state['y'])
+        points = [(map_id, x, y) for x, y, map_id in positions if map_id == here[0]] + [here]
+
+        draw = ImageDraw.Draw(image)
+        for start, end in zip(points, points[1:]):
+            if start[0] != end[0] or start[1:] == end[1:]:
+                continue
+            if abs(end[1] - start[1]) + abs(end[2] - start[2]) > 1:
+                continue    # Warp o salto de estado: no es un paso
+            _arrow(draw, self._tile_center(start, here), self._tile_center(end, here))
+
+    @staticmethod
+    def _tile_center(position, here):
+        """Centro en px de la casilla `position`; 'x' es la fila y 'y' la columna (ver game_state)"""
+        row, column = position[1] - here[1], position[2] - here[2]
+        return (PLAYER_PX[0] + column * BLOCK_PX + BLOCK_PX // 2,
+                PLAYER_PX[1] + row * BLOCK_PX + BLOCK_PX // 2)
+
+
+def _arrow(draw, start, end, head=4):
+    """Flecha blanca con borde negro: se distingue tras cuantizar a 4 tonos"""
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = max(1, abs(dx) + abs(dy))
+    ux, uy = dx / length, dy / length
+    tip = (end[0] - ux * head, end[1] - uy * head)
+    wing = ((tip[0] - ux * head - uy * head, tip[1] - uy * head + ux * head),
+            (tip[0] - ux * head + uy * head, tip[1] - uy * head - ux * head))
+    for color, width in (((0, 0, 0), 4), ((0xFF, 0xFF, 0xFF), 2)):
+        draw.line([start, tip], fill=color, width=width)
+    draw.polygon([tip, wing[0], wing[1]], fill=(0xFF, 0xFF, 0xFF), outline=(0, 0, 0))
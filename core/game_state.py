@@ -0,0 +1,73 @@
+"""
+Game State - Lectura del estado del juego desde la memoria del emulador
+
+Nota: por convención histórica del proyecto, 'x' se lee de 0xD361 (wYCoord en
+pokered) e 'y' de 0xD362 (wXCoord). Waypoints y hints usan esa misma convención.
+"""
+
+import zlib
+
+MEMORY_ADDRESSES = {
+    'map_id': 0xD35E,
+    'player_x': 0xD361,
+    'player_y': 0xD362,
+    'badges': 0xD356,
+    'party_count': 0xD163,
+    'money_bcd1': 0xD347,
+    'money_bcd2': 0xD348,
+    'money_bcd3': 0xD349,
+    'in_battle': 0xD057,
+}
+
+
+def read_game_state(emu):
+    """Lee el estado actual del juego desde la memoria"""
+    mem = emu.memory
+    
+    # Leer dinero (formato BCD)
+    money_h = mem[MEMORY_ADDRESSES['money_bcd1']]
+    money_m = mem[MEMORY_ADDRESSES['money_bcd2']]
+    money_l = mem[MEMORY_ADDRESSES['money_bcd3']]
+    money = ((money_h >> 4) * 100000 + (money_h & 0xF) * 10000 +
+             (money_m >> 4) * 1000 + (money_m & 0xF) * 100 +
+             (money_l >> 4) * 10 + (money_l & 0xF))
+    
+    # Nivel máximo del equipo
+    party_count = mem[MEMORY_ADDRESSES['party_count']]
+    max_level = 0
+    if 0 < party_count <= 6:
+        for i in range(party_count):
+            level_addr = 0xD18C + (i * 44)
+            level = mem[level_addr]
+            max_level = max(max_level, level)
+    
+    return {
+        'map_id': mem[MEMORY_ADDRESSES['map_id']],
+        'x': mem[MEMORY_ADDRESSES['player_x']],
+        'y': mem[MEMORY_ADDRESSES['player_y']],
+        'badges': bin(mem[MEMORY_ADDRESSES['badges']]).count('1'),
+        'party_count': party_count if 0 < party_count <= 6 else 0,
+        'max_level': max_level,
+        'money': money,
+        'in_battle': mem[MEMORY_ADDRESSES['in_battle']] > 0
+    }
+
+
+# Región de flags de eventos (pokered: wEventFlags)
+EVENT_FLAGS_START = 0xD747
+EVENT_FLAGS_END = 0xD887
+
+
+def read_event_flags(emu):
+    """Lee de una vez toda la región de flags de eventos"""
+    return bytes(emu.memory[EVENT_FLAGS_START:EVENT_FLAGS_END])
+
+
+def count_new_flags(before, after):
+    """Número de bits de evento que pasaron de 0 a 1"""
+    return sum(bin(~b & a & 0xFF).count('1') for b, a in zip(before, after))
+
+
+def event_flag_digest(emu):
+    """Huella corta (CRC32) de todos los flags de eventos"""
+    return zlib.crc32(read_event_flags(emu))
@@ -0,0 +1,191 @@
+"""
+Gym Env - Entorno gymnasium sobre PyBoy headless para entrenar políticas locales
+Incluye un constructor de entornos vectorizados (sync / subprocesos)
+"""
+
+import io
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from pyboy import PyBoy
+
+from core.event_checker import EventChecker
+from core.game_state import read_game_state
+from core.input_scheduler import ACTION_MAP, RELEASE_MAP, InputScheduler
+from core.progress_tracker import ProgressTracker
+
+ACTIONS = ("UP", "DOWN", "LEFT", "RIGHT", "A", "B", "START")
+RAM_FEATURES = ('map_id', 'x', 'y', 'badges', 'party_count', 'max_level', 'in_battle', 'money')
+SCREEN_SHAPE = (144, 160, 3)
+
+
+class PokemonRedEnv(gym.Env):
+    """
+    Entorno de un solo emulador
+
+    Observación: {'screen': RGB uint8 (144, 160, 3), 'ram': vector float32 con RAM_FEATURES}
+    Recompensa: flags de historia nuevos (EventChecker), waypoints alcanzados
+    (ProgressTracker), medallas nuevas y un pequeño bonus por casilla nueva.
+    """
+
+    metadata = {"render_modes": ["rgb_array"]}
+
+    def __init__(self, rom_path, init_state, events_file="config/events.json",
+                 waypoints_file="config/waypoints.json", objective=None, max_steps=2048,
+                 frame_skip=None, flag_reward=5.0, waypoint_reward=1.0, badge_reward=20.0,
+                 exploration_reward=0.01, render_mode=None):
+        """
+        Args:
+            rom_path: ROM de Pokémon Red
+            init_state: Save state inicial (bytes o ruta) desde el que se resetea
+            events_file: Ruta a events.json
+            waypoints_file: Ruta a waypoints.json
+            objective: Texto del objetivo atómico para los waypoints (None = sin reward de waypoints)
+            max_steps: Steps por episodio antes de truncar
+            frame_skip: Frames fijos por acción (None = InputScheduler, más preciso pero más lento)
+            *_reward: Pesos de cada componente de la recompensa
+            render_mode: None o 'rgb_array'
+        """
+        super().__init__()
+        if isinstance(init_state, str):
+            with open(init_state, 'rb') as f:
+                init_state = f.read()
+        self.init_state = init_state
+
+        self.emu = PyBoy(rom_path, window="null")
+        self.emu.set_emulation_speed(0)
+        self.scheduler = InputScheduler(self.emu, render=False)
+        self.frame_skip = frame_skip
+
+        self.event_checker = EventChecker(events_file)
+        self.progress_tracker = ProgressTracker(waypoints_file)
+        self.objective = objective
+        self.max_steps = max_steps
+
+        self.flag_reward = flag_reward
+        self.waypoint_reward = waypoint_reward
+        self.badge_reward = badge_reward
+        self.exploration_reward = exploration_reward
+        self.render_mode = render_mode
+
+        self.action_space = spaces.Discrete(len(ACTIONS))
+        self.observation_space = spaces.Dict({
+            'screen': spaces.Box(0, 255, SCREEN_SHAPE, dtype=np.uint8),
+            'ram': spaces.Box(0.0, np.inf, (len(RAM_FEATURES),), dtype=np.float32),
+        })
+
+        self._steps = 0
+        self._flags = frozenset()
+        self._badges = 0
+        self._seen = set()
+
+    def _story_flags(self):
+        memory = self.emu.memory
+        return frozenset(
+            name for name in self.event_checker.events['story_flags']
+            if self.event_checker.check_story_flag(memory, name)
+        )
+
+    def _observation(self, state):
+        screen = self.emu.screen.ndarray[:, :, :3].copy()
+        ram = np.array([float(state[k]) for k in RAM_FEATURES], dtype=np.float32)
+        return {'screen': screen, 'ram': ram}
+
+    def _act(self, action):
+        if self.frame_skip is None:
+            self.scheduler.execute(action)
+            return
+        self.emu.send_input(ACTION_MAP[action])
+        self.emu.tick(self.frame_skip - 1, False)
+        self.emu.send_input(RELEASE_MAP[action])
+        self.emu.tick(1, True)
+
+    def reset(self, *, seed=None, options=None):
+        """
+        Resetea al save state inicial (o a options['state'] si se pasa, p. ej. una celda del archivo)
+        """
+        super().reset(seed=seed)
+        state_bytes = (options or {}).get('state', self.init_state)
+        self.emu.load_state(io.BytesIO(state_bytes))
+        self.emu.tick(1, True)
+
+        self.progress_tracker.reset_for_new_objective()
+        self.event_checker.reset()
+        self._steps = 0
+        self._flags = self._story_flags()
+
+        state = read_game_state(self.emu)
+        self._badges = state['badges']
+        self._seen = {(state['map_id'], state['x'], state['y'])}
+        return self._observation(state), {'game_state': state}
+
+    def step(self, action_index):
+        action = ACTIONS[int(action_index)]
+        self._act(action)
+        self._steps += 1
+
+        state = read_game_state(self.emu)
+        reward = 0.0
+
+        flags = self._story_flags()
+        new_flags = flags - self._flags
+        if new_flags:
+            for name in new_flags:
+                self.event_checker.mark_event_complete(name)
+            reward += self.flag_reward * len(new_flags)
+        self._flags = flags
+
+        if self.objective and self.progress_tracker.check_progress(state, self.objective) == 'progress':
+            reward += self.waypoint_reward
+
+        if state['badges'] > self._badges:
+            reward += self.badge_reward * (state['badges'] - self._badges)
+        self._badges = state['badges']
+
+        position = (state['map_id'], state['x'], state['y'])
+        if position not in self._seen:
+            self._seen.add(position)
+            reward += self.exploration_reward
+
+        truncated = self._steps >= self.max_steps
+        info = {'game_state': state, 'action': action, 'new_flags': sorted(new_flags)}
+        return self._observation(state), reward, False, truncated, info
+
+    def snapshot(self):
+        """Save state actual (para usarlo luego como options['state'])"""
+        buffer = io.BytesIO()
+        self.emu.save_state(buffer)
+        return buffer.getvalue()
+
+    def render(self):
+        if self.render_mode == "rgb_array":
+            return self.emu.screen.ndarray[:, :, :3].copy()
+        return None
+
+    def close(self):
+        self.emu.stop(save=False)
+
+
+def make_vector_env(num_envs, rom_path, init_state, mode="async", **env_kwargs):
+    """
+    Crea un VectorEnv de gymnasium con `num_envs` emuladores
+
+    Args:
+        num_envs: Número de emuladores
+        rom_path: ROM de Pokémon Red
+        init_state: Save state inicial (bytes o ruta), compartido por todos
+        mode: 'async' (un subproceso por env) o 'sync' (mismo proceso)
+        **env_kwargs: Argumentos extra para PokemonRedEnv
+
+    El auto-reset al terminar/truncar lo hace el propio VectorEnv llamando a reset().
+    """
+    def make_env():
+        return PokemonRedEnv(rom_path, init_state, **env_kwargs)
+
+    env_fns = [make_env for _ in range(num_envs)]
+    if mode == "sync":
+        return gym.vector.SyncVectorEnv(env_fns)
+    if mode == "async":
+        return gym.vector.AsyncVectorEnv(env_fns, shared_memory=True)
+    raise ValueError(f"Unknown vector env mode: {mode}")
@@ -0,0 +1,160 @@
+"""
+Image Payload - Prepara la captura para el LLM con el menor tamaño posible
+Cuantiza a los 4 tonos de la Game Boy, recorta alrededor del jugador, escala
+con vecino más cercano y elige el formato más pequeño (PNG-8, WebP o JPEG)
+"""
+
+import base64
+import io
+import math
+from dataclasses import dataclass
+
+from PIL import Image
+
+from core.text_observation import PLAYER_CELL
+
+# Paleta por defecto de PyBoy (de claro a oscuro)
+GB_PALETTE = ((0xFF, 0xFF, 0xFF), (0x99, 0x99, 0x99), (0x55, 0x55, 0x55), (0x00, 0x00, 0x00))
+BLOCK_PX = 16
+PLAYER_PX = (PLAYER_CELL[1] * BLOCK_PX, PLAYER_CELL[0] * BLOCK_PX)    # (x, y) del bloque del jugador
+
+FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+@dataclass
+class ImagePayload:
+    """Imagen codificada lista para el mensaje, con su contabilidad"""
+
+    data: bytes
+    mime: str
+    width: int
+    height: int
+    raw_bytes: int           # Tamaño sin comprimir de la captura original, para comparar
+    tokens: int              # Estimación de tokens de imagen
+
+    @property
+    def b64(self):
+        return base64.b64encode(self.data).decode()
+
+    @property
+    def data_url(self):
+        return f"data:{self.mime};base64,{self.b64}"
+
+    @property
+    def saved_bytes(self):
+        return self.raw_bytes - len(self.data)
+
+
+def _palette_image():
+    palette = [c for color in GB_PALETTE for c in color]
+    palette += [0] * (768 - len(palette))
+    image = Image.new('P', (1, 1))
+    image.putpalette(palette)
+    return image
+
+
+class ImagePreparer:
+    """
+    Etapa de preparación de la captura antes de decide_action
+
+    Todas las opciones son independientes; con los valores por defecto la
+    imagen se cuantiza, se recorta a `roi_blocks` bloques alrededor del jugador
+    (solo fuera de batalla y diálogo) y se codifica en el formato más pequeño.
+    """
+
+    def __init__(self, quantize=True, roi_blocks=3, scale=2, formats=('png', 'webp'),
+                 jpeg_quality=85, tile_size=336, tokens_per_tile=144, metrics=None):
+        """
+        Args:
+            quantize: Reducir a los 4 tonos de GB_PALETTE
+            roi_blocks: Bloques de 16 px alrededor del jugador a conservar (None = pantalla completa)
+            scale: Factor de escalado con vecino más cercano (1 = sin escalar)
+            formats: Formatos candidatos ('png', 'webp', 'jpeg'); se queda el más pequeño
+            jpeg_quality: Calidad JPEG si se incluye 'jpeg'
+            tile_size: Lado en px de cada tile de visión del modelo (estimación de tokens)
+            tokens_per_tile: Tokens por tile de visión (estimación de tokens)
+            metrics: Colector de métricas (opcional)
+        """
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown image formats: {sorted(unknown)}")
+        self.quantize = quantize
+        self.roi_blocks = roi_blocks
+        self.scale = scale
+        self.formats = tuple(formats)
+        self.jpeg_quality = jpeg_quality
+        self.tile_size = tile_size
+        self.tokens_per_tile = tokens_per_tile
+        self.metrics = metrics
+        self._palette = _palette_image() if quantize else None
+
+    def crop_box(self, size):
+        """Caja (izq, arriba, der, abajo) alrededor del bloque del jugador"""
+        width, height = size
+        margin = self.roi_blocks * BLOCK_PX
+        left = max(0, PLAYER_PX[0] - margin)
+        top = max(0, PLAYER_PX[1] - margin)
+        right = min(width, PLAYER_PX[0] + BLOCK_PX + margin)
+        bottom = min(height, PLAYER_PX[1] + BLOCK_PX + margin)
+        return (left, top, right, bottom)
+
+    def estimate_tokens(self, width, height):
+        return math.ceil(width / self.tile_size) * math.ceil(height / self.tile_size) * self.tokens_per_tile
+
+    def _encode(self, image, fmt):
+        pil_format, mime = FORMATS[fmt]
+        buffer = io.BytesIO()
+        if fmt == 'png':
+            image.save(buffer, pil_format, optimize=True)
+        elif fmt == 'webp':
+            image.save(buffer, pil_format, lossless=True, method=6)
+        else:
+            image.convert('RGB').save(buffer, pil_format, quality=self.jpeg_quality, optimize=True)
+        return buffer.getvalue(), mime
+
+    def prepare(self, image, game_state=None, crop=True):
+        """
+        Args:
+            image: Captura PIL (emu.screen.image)
+            game_state: Estado actual; en batalla o diálogo no se recorta
+            crop: False si la imagen no es una captura simple (p. ej. hoja de FrameHistory)
+
+        Returns:
+            ImagePayload con el formato más pequeño
+        """
+        raw_bytes = image.width * image.height * len(image.getbands())
+
+        overworld = game_state is None or not (game_state.get('in_battle') or game_state.get('in_dialog'))
+        if crop and self.roi_blocks is not None and overworld:
+            image = image.crop(self.crop_box(image.size))
+
+        image = image.convert('RGB')
+        if self.quantize:
+            image = image.quantize(palette=self._palette, dither=Image.Dither.NONE)
+
+        if self.scale and self.scale != 1:
+            image = image.resize((image.width * self.scale, image.height * self.scale), Image.Resampling.NEAREST)
+
+        best = None
+        for fmt in self.formats:
+            data, mime = self._encode(image, fmt)
+            if best is None or len(data) < len(best[0]):
+                best = (data, mime)
+
+        payload = ImagePayload(
+            data=best[0],
+            mime=best[1],
+            width=image.width,
+            height=image.height,
+            raw_bytes=raw_bytes,
+            tokens=self.estimate_tokens(image.width, image.height),
+        )
+        if self.metrics is not None:
+            self.metrics.incr('image_payload_bytes', len(payload.data))
+            self.metrics.incr('image_raw_bytes', raw_bytes)
+            self.metrics.incr('image_tokens', payload.tokens)
+        return payload
@@ -0,0 +1,204 @@
+"""
+Input Scheduler - Ejecuta una acción y avanza frames hasta que realmente termina
+Sustituye al "pulsar + 30 ticks + soltar" fijo por condiciones leídas de la RAM
+"""
+
+from pyboy.utils import WindowEvent
+
+ACTION_MAP = {
+    "UP": WindowEvent.PRESS_ARROW_UP,
+    "DOWN": WindowEvent.PRESS_ARROW_DOWN,
+    "LEFT": WindowEvent.PRESS_ARROW_LEFT,
+    "RIGHT": WindowEvent.PRESS_ARROW_RIGHT,
+    "A": WindowEvent.PRESS_BUTTON_A,
+    "B": WindowEvent.PRESS_BUTTON_B,
+    "START": WindowEvent.PRESS_BUTTON_START,
+    "SELECT": WindowEvent.PRESS_BUTTON_SELECT,
+}
+
+RELEASE_MAP = {
+    "UP": WindowEvent.RELEASE_ARROW_UP,
+    "DOWN": WindowEvent.RELEASE_ARROW_DOWN,
+    "LEFT": WindowEvent.RELEASE_ARROW_LEFT,
+    "RIGHT": WindowEvent.RELEASE_ARROW_RIGHT,
+    "A": WindowEvent.RELEASE_BUTTON_A,
+    "B": WindowEvent.RELEASE_BUTTON_B,
+    "START": WindowEvent.RELEASE_BUTTON_START,
+    "SELECT": WindowEvent.RELEASE_BUTTON_SELECT,
+}
+
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+# Direcciones RAM (pokered)
+WALK_COUNTER_ADDR = 0xCFC5      # wWalkCounter: 8..1 mientras el jugador anda
+JOY_IGNORE_ADDR = 0xCD6B        # wJoyIgnore: != 0 durante scripts / carga de mapa
+MAP_ID_ADDR = 0xD35E
+COORD_ADDRS = (0xD361, 0xD362)
+TEXT_ARROW_ADDR = 0xC4F2        # wTileMap (18, 16): flecha ▼ de "pulsa un botón"
+TEXT_ARROW_TILE = 0xEE
+TEXT_BOX_START = 0xC4B8         # Filas 14-17 del tilemap (caja de texto: wTileMap + 14 * 20)
+TEXT_BOX_END = 0xC508
+
+
+class InputScheduler:
+    """
+    Pulsa un botón y avanza frames hasta que la acción se completa
+
+    - Dirección: se mantiene hasta que empieza el paso (o hasta `turn_frames` si
+      el jugador solo gira / choca) y se espera a que el contador de paso vuelva a 0
+      y, si hubo cambio de mapa, a que termine la carga.
+    - Botón: se pulsa `press_frames`, se suelta y se espera a la flecha de texto o
+      a que la caja de texto y los flags de control estén quietos.
+    Siempre con un tope de frames.
+    """
+
+    def __init__(self, emu, press_frames=4, turn_frames=10, settle_frames=4,
+                 max_frames=120, render=True):
+        """
+        Args:
+            emu: Instancia de PyBoy
+            press_frames: Frames mínimos con el botón pulsado
+            turn_frames: Frames máximos pulsando una dirección sin que empiece el paso
+            settle_frames: Frames consecutivos "quietos" para dar la acción por terminada
+            max_frames: Tope de frames por acción
+            render: Renderizar todos los frames (False = solo el último; mismos frames emulados)
+        """
+        self.emu = emu
+        self.press_frames = press_frames
+        self.turn_frames = turn_frames
+        self.settle_frames = settle_frames
+        self.max_frames = max_frames
+        self.render = render
+        self.last_frames = 0
+
+    def _tick(self, render=None):
+        self.emu.tick(1, self.render if render is None else render)
+
+    def _position(self):
+        mem = self.emu.memory
+        return (mem[MAP_ID_ADDR], mem[COORD_ADDRS[0]], mem[COORD_ADDRS[1]])
+
+    def execute(self, action):
+        """
+        Ejecuta la acción
+
+        Returns:
+            Frames emulados (0 si la acción no es válida)
+        """
+        if action not in ACTION_MAP:
+            self.last_frames = 0
+            return 0
+
+        if action in DIRECTIONS:
+            frames = self._execute_move(action)
+        else:
+            frames = self._execute_button(action)
+
+        # Frame final siempre renderizado (captura / vídeo). Se emula con y sin
+        # `render` para que las ramas del lookahead sigan el mismo calendario de
+        # frames que la ejecución en vivo (RNG y NPCs incluidos)
+        self._tick(render=True)
+        frames += 1
+
+        self.last_frames = frames
+        return frames
+
+    def _execute_move(self, action):
+        mem = self.emu.memory
+        start_pos = self._position()
+        frames = 0
+
+        # 1. Mantener hasta que arranque el paso (o se agote el tiempo de giro)
+        self.emu.send_input(ACTION_MAP[action])
+        started = False
+        while frames < self.max_frames:
+            self._tick()
+            frames += 1
+            if mem[WALK_COUNTER_ADDR] > 0 or self._position() != start_pos:
+                started = True
+                break
+            if frames >= self.turn_frames:
+                break
+        self.emu.send_input(RELEASE_MAP[action])
+
+        if not started:
+            # Giro en el sitio o choque contra un obstáculo
+            return frames
+
+        # 2. Esperar a que el paso (y la posible carga de mapa) termine
+        stable = 0
+        while frames < self.max_frames:
+            self._tick()
+            frames += 1
+            idle = mem[WALK_COUNTER_ADDR] == 0 and mem[JOY_IGNORE_ADDR] == 0
+            moved = self._position() != start_pos
+            stable = stable + 1 if (idle and moved) else 0
+            if stable >= self.settle_frames:
+                break
+
+        return frames
+
+    def _execute_button(self, action):
+        mem = self.emu.memory
+        frames = 0
+
+        self.emu.send_input(ACTION_MAP[action])
+        for _ in range(self.press_frames):
+            self._tick()
+            frames += 1
+        self.emu.send_input(RELEASE_MAP[action])
+
+        stable = 0
+        last_text = None
+        while frames < self.max_frames:
+            self._tick()
+            frames += 1
+
+            if mem[TEXT_ARROW_ADDR] == TEXT_ARROW_TILE:
+                break
+
+            text = bytes(mem[TEXT_BOX_START:TEXT_BOX_END])
+            idle = mem[JOY_IGNORE_ADDR] == 0 and text == last_text
+            last_text = text
+            stable = stable + 1 if idle else 0
+            if stable >= self.settle_frames:
+                break
+
+        return frames
+
+
+def skip_intro(emu):
+    """Salta la intro del juego hasta tener el control del jugador (secuencia manual)"""
+    # Esperar a pantalla de título
+    for _ in range(300):
+        emu.tick()
+
+    # Presionar START para entrar
+    emu.send_input(WindowEvent.PRESS_BUTTON_START)
+    for _ in range(10):
+        emu.tick()
+    emu.send_input(WindowEvent.RELEASE_BUTTON_START)
+    for _ in range(50):
+        emu.tick()
+
+    # Presionar START repetidamente
+    for _ in range(100):
+        emu.send_input(WindowEvent.PRESS_BUTTON_START)
+        for _ in range(2):
+            emu.tick()
+        emu.send_input(WindowEvent.RELEASE_BUTTON_START)
+        for _ in range(2):
+            emu.tick()
+
+    # Presionar A para continuar
+    for _ in range(100):
+        emu.send_input(WindowEvent.PRESS_BUTTON_A)
+        for _ in range(2):
+            emu.tick()
+        emu.send_input(WindowEvent.RELEASE_BUTTON_A)
+        for _ in range(2):
+            emu.tick()
+
+    # Esperar estabilización
+    for _ in range(30):
+        emu.tick()
@@ -3,12 +3,53 @@ LLM Planner - Adaptado para Groq (Llama-3.2-90B-Vision)
 Gestiona la toma de decisiones del agente basado en objetivos jerárquicos
 """
 
+import importlib.util
 import json
+import threading
+import time
+
+import httpx
 from groq import Groq
 
+from core.action_parser import DIRECTIONS, ActionStreamParser, parse_action
+from core.local_policy import LocalPolicy
+from core.metrics import Metrics
+from core.objective_cursor import ObjectiveCursor
+from core.prompt_builder import PromptBuilder, compact_history, estimate_tokens, parse_history
+from core.resilience import CircuitBreaker, HedgedCaller
+from core.sprites import describe_sprites
+from core.text_observation import render_text_map
+
+DEFAULT_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+OBSERVATION_MODES = ("image", "text", "both", "history")
+FRAME_SHEET_NOTE = ("Image: current screen on the left, arrows show your last steps. "
+                    "Smaller previous screens on the right, newest at the top.")
+
+
+def create_http_client(max_connections=4, max_keepalive=4, keepalive_expiry=120.0,
+                       http2=True, timeout=30.0):
+    """
+    Crea el transporte HTTP del planner con un pool keep-alive explícito
+    
+    HTTP/2 solo se activa si el paquete `h2` está instalado.
+    """
+    use_http2 = http2 and importlib.util.find_spec('h2') is not None
+    return httpx.Client(
+        http2=use_http2,
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+    )
+
 
 class LLMPlanner:
-    def __init__(self, api_key, objectives_file, skills_file, waypoints_file=None):
+    def __init__(self, api_key, objectives_file, skills_file, waypoints_file=None, metrics=None,
+                 model=DEFAULT_MODEL, stream=True, http_client=None, hedging=True,
+                 breaker_failures=3, breaker_cooldown=30.0, observation_mode="image",
+                 step_budget=None, escalation_model=None):
         """
         Inicializa el planificador con acceso a Groq
         
@@ -17,8 +58,41 @@ class LLMPlanner:
             objectives_file: Ruta a objectives.json
             skills_file: Ruta a skills.json
             waypoints file: Ruta a waypoints.json
+            metrics: Colector de métricas (opcional)
+            model: Modelo de Groq a usar
+            stream: Leer la respuesta en streaming y cortar al primer botón válido
+            http_client: Cliente httpx compartido (por defecto, pool keep-alive de create_http_client)
+            hedging: Duplicar la petición si supera el p95 de latencia observado
+            breaker_failures: Fallos seguidos que abren el circuit breaker
+            breaker_cooldown: Segundos en abierto antes de probar de nuevo la API
+            observation_mode: 'image' (captura), 'text' (mapa ASCII), 'both' o 'history'
+                (hoja con las últimas capturas, ver core/frame_history.py)
+            step_budget: StepBudget con presupuestos por objetivo (None = tope fijo)
+            escalation_model: Modelo al que escalar antes del timeout (None = no escalar)
         """
-        self.client = Groq(api_key=api_key)
+        if observation_mode not in OBSERVATION_MODES:
+            raise ValueError(f"Unknown observation mode: {observation_mode}")
+        self.observation_mode = observation_mode
+        self.http_client = http_client if http_client is not None else create_http_client()
+        self.client = Groq(api_key=api_key, http_client=self.http_client)
+        self.model = model
+        self.base_model = model
+        self.escalation_model = escalation_model
+        self.stream = stream
+        
+        # Resiliencia: hedging + circuit breaker + política local de respaldo
+        self.hedger = HedgedCaller() if hedging else None
+        self.breaker = CircuitBreaker(breaker_failures, breaker_cooldown)
+        self.local_policy = LocalPolicy()
+        self.last_source = "LLM"
+        
+        # Prompt por secciones con presupuesto; el prefijo estático va como mensaje de sistema
+        self.prompt_builder = PromptBuilder()
+        
+        # Grafo de mapas para objetivos en otro mapa y base de datos de ejecuciones (los asigna el runner)
+        self.world_graph = None
+        self.run_store = None
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
         
         # Cargar archivos de configuración
         with open(objectives_file, 'r', encoding='utf-8') as f:
@@ -41,55 +115,132 @@ class LLMPlanner:
                 print(f"    ERROR: loading waypoints: {e}")
                 pass
         
-        # Estado actual en la jerarquía
-        self.current_phase = 0  # Layer 1
-        self.current_tactical = 0  # Layer 2
-        self.current_atomic = 0  # Layer 3
+        # Jerarquía aplanada: posición actual (fase, táctico, atómico) = un índice
+        self.cursor = ObjectiveCursor(self.objectives)
         
         # Contador de pasos sin progreso
         self.steps_since_advance = 0
         self.max_steps_per_objective = 500  # Máximo de acciones por objetivo atómico
+        self.step_budget = step_budget
+        self.pending_recovery = None
     
-    def get_current_context(self):
-        """Obtiene el contexto actual del objetivo"""
+    def warm_up(self):
+        """
+        Abre la conexión (DNS + TCP + TLS) con una petición barata
+        
+        Returns:
+            Segundos que tardó el warm-up, o None si falló
+        """
+        start = time.perf_counter()
         try:
-            phase = self.objectives['objective_hierarchy']['layer_1_strategic'][self.current_phase]
-            tactical = phase['layer_2_tactical'][self.current_tactical]
-            atomic_step = tactical['layer_3_atomic'][self.current_atomic]
-            
-            return {
-                'strategic_goal': phase['goal'],
-                'tactical_goal': tactical['goal'],
-                'current_step': atomic_step,
-                'phase_id': phase['id'],
-                'tactical_id': tactical['id']
-            }
-        except (IndexError, KeyError):
-            # Llegamos al final
+            self.client.models.list()
+        except Exception as e:
+            print(f"    WARNING: planner warm-up failed: {e}")
             return None
+        
+        elapsed = time.perf_counter() - start
+        self.metrics.observe('planner_warm_up', elapsed)
+        return elapsed
+    
+    def warm_up_async(self):
+        """Lanza warm_up en un hilo para solaparlo con el arranque del emulador"""
+        thread = threading.Thread(target=self.warm_up, name="planner-warm-up", daemon=True)
+        thread.start()
+        return thread
+    
+    def close(self):
+        """Libera los hilos del hedging"""
+        if self.hedger:
+            self.hedger.shutdown()
+    
+    @property
+    def current_phase(self):
+        record = self.cursor.current
+        return record.phase if record else len(self.objectives['objective_hierarchy']['layer_1_strategic'])
+    
+    @property
+    def current_tactical(self):
+        record = self.cursor.current
+        return record.tactical if record else 0
+    
+    @property
+    def current_atomic(self):
+        record = self.cursor.current
+        return record.atomic if record else 0
+    
+    def get_current_context(self):
+        """Obtiene el contexto actual del objetivo (precalculado; None si se completaron todos)"""
+        record = self.cursor.current
+        return record.context if record else None
     
-    def build_prompt(self, game_state, memory_summary):
-        """Prompt minimalista - solo lo esencial"""
+    def build_prompt(self, game_state, memory_summary, tile_view=None, sprites=None):
+        """
+        Parte dinámica del prompt (el prefijo estático es prompt_builder.static_prefix)
+        
+        Args:
+            game_state: Estado actual del juego
+            memory_summary: Resumen de MemoryBuffer.get_recent_summary()
+            tile_view: TileView para el mapa ASCII (modos 'text' y 'both')
+            sprites: Array de core.sprites.read_sprites (NPCs cercanos, fuera de batalla)
+        """
         context = self.get_current_context()
     
         if not context:
             return "Game completed!"
     
         waypoint_hint = self._get_waypoint_hint(context['current_step'], game_state)
+        options, blocked_note = self._action_options(game_state)
+        history = parse_history(memory_summary)
+        
+        keys = f"Allowed keys: {options}.{blocked_note}"
+        # Si la última dirección no movió al jugador, prohibirla en este turno
+        if history and history[-1][0] in DIRECTIONS and history[-1][1] == "No change":
+            keys += f"\nIMPORTANT: Do NOT use {history[-1][0]}. Try a DIFFERENT direction to explore."
+        
+        text_map = None
+        if tile_view is not None and self.uses_text_map:
+            target = self._find_target_waypoint(context['current_step'], game_state)
+            if target is not None and target['map'] != game_state['map_id']:
+                target = None
+            text_map = render_text_map(tile_view, target)
+        
+        npcs = None
+        if sprites is not None and len(sprites) and not game_state.get('in_battle'):
+            npcs = describe_sprites(sprites, game_state)
+        
+        return self.prompt_builder.build({
+            'state': f"Position: ({game_state['x']}, {game_state['y']}) Map {game_state['map_id']}",
+            'frames': FRAME_SHEET_NOTE if self.uses_frame_history else None,
+            'map': text_map,
+            'sprites': npcs,
+            'objective': context['current_step'],
+            'waypoint': waypoint_hint,
+            'history': compact_history(history),
+            'skills': self._select_relevant_skills(game_state),
+            'keys': keys + "\nYour response:",
+        })
     
-        # PROMPT ULTRA SIMPLE
-        prompt = f"""Pokemon Red. Position: ({game_state['x']}, {game_state['y']}) Map {game_state['map_id']}
+    def _action_options(self, game_state):
+        """Teclas ofrecidas en el prompt, sin las direcciones bloqueadas"""
+        passable = game_state.get('passable', DIRECTIONS)
+        options = [d for d in ("DOWN", "UP", "LEFT", "RIGHT") if d in passable] + ["A", "B"]
+        blocked = [d for d in ("DOWN", "UP", "LEFT", "RIGHT") if d not in passable]
+        blocked_note = f"\nBlocked (wall or NPC): {', '.join(blocked)}" if blocked else ""
+        return ", ".join(options), blocked_note
+    
+    def mask_action(self, action, game_state):
+        """
+        Rechaza direcciones bloqueadas antes de llegar al emulador
         
-Try to reach {waypoint_hint}
-Try get to the given coordinates.
-Answer with ONE KEY, select one at each prompt to reach the objetive:  DOWN, UP, LEFT, RIGHT, A, B.
-Try not to repeat the same KEY to move.
-JUST ONE WORD, NO MORE.
-Do not add a dot at the end of the answer.
-Your response:"""
-
+        El origen de la decisión (last_source) no cambia: enmascarar no es un fallo de la API.
         
-        return prompt
+        Returns:
+            La acción, o la de la política local si la dirección no es transitable
+        """
+        if action in DIRECTIONS and action not in game_state.get('passable', DIRECTIONS):
+            self.metrics.incr('masked_moves')
+            return self._local_action(game_state)
+        return action
     
     def _select_relevant_skills(self, game_state):
         """Selecciona skills relevantes según el contexto"""
@@ -110,97 +261,317 @@ Your response:"""
         
         return "\n".join(skills_text)
     
-    def decide_action(self, screenshot_b64, game_state, memory_summary):
+    @property
+    def uses_image(self):
+        return self.observation_mode in ("image", "both", "history")
+    
+    @property
+    def uses_frame_history(self):
+        return self.observation_mode == "history"
+    
+    @property
+    def uses_text_map(self):
+        return self.observation_mode in ("text", "both")
+    
+    def decide_action(self, screenshot_b64, game_state, memory_summary, tile_view=None, sprites=None):
         """
         Llama al LLM para decidir la siguiente acción
         
         Args:
-            screenshot_b64: Screenshot en base64
+            screenshot_b64: Screenshot PNG en base64, ImagePayload de core.image_payload (en modo
+                'history', de la hoja de FrameHistory), o None en modo 'text'
             game_state: Estado actual del juego
             memory_summary: Resumen de acciones recientes
+            tile_view: TileView de core.text_observation (modos 'text' y 'both')
+            sprites: Array de core.sprites.read_sprites para la sección de NPCs
             
         Returns:
             String con el nombre del botón (UP, DOWN, A, etc.)
         """
-        prompt = self.build_prompt(game_state, memory_summary)
+        with self.metrics.timer('planner_build_prompt'):
+            prompt = self.build_prompt(game_state, memory_summary, tile_view, sprites)
+        builder = self.prompt_builder
+        prompt_estimate = builder.static_tokens + sum(builder.last_tokens.values())
+        if screenshot_b64 is not None and self.uses_image and not isinstance(screenshot_b64, str):
+            prompt_estimate += screenshot_b64.tokens
+        self.metrics.incr('prompt_tokens_estimated', prompt_estimate)
+        if builder.last_truncated:
+            self.metrics.incr('prompt_truncations', len(builder.last_truncated))
         # --- CAMBIO 1: IMPRIMIR PROMPT PARA DEPURAR ---
         print("\n" + "="*40)
         print("🔍 PROMPT ENVIADO AL LLM:")
         print(prompt)
         print("="*40 + "\n")
         # ----------------------------------------------
-        # 1. Detectar si estamos atascados (misma posición que antes)
-        # Accedemos a la última acción de la memoria para prohibirla
-        last_action = memory_summary[-1] if memory_summary else ""
+        
+        if not self.breaker.allow_request():
+            return self._fallback_action(game_state)
+        
+        self.metrics.incr('llm_requests')
+        request_start = time.perf_counter()
+        
+        content = []
+        if screenshot_b64 is not None and self.uses_image:
+            if isinstance(screenshot_b64, str):
+                image_url = f"data:image/png;base64,{screenshot_b64}"
+            else:
+                image_url = screenshot_b64.data_url
+            content.append({"type": "image_url", "image_url": {"url": image_url}})
+        content.append({"type": "text", "text": prompt})
+        # El prefijo estático va primero y sin cambios para aprovechar el caché de prompts
+        messages = [
+            {"role": "system", "content": builder.static_prefix},
+            {"role": "user", "content": content},
+        ]
         
         try:
-            # Usar el modelo con visión más rápido disponible
-            # llama-3.2-11b-vision-preview: Más rápido, gratis, 30 req/min
-            # llama-3.2-90b-vision-preview: Más preciso pero lento
-            response = self.client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct", # Tu modelo
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"}},
-                        {"type": "text", "text": prompt + f"\nIMPORTANT: Do NOT use {last_action}. Try a DIFFERENT direction to explore."}
-                    ]
-                }],
-                max_tokens=5,
-                temperature=0.7 # Subimos temperatura para que no sea tan repetitivo
-            )
-            
-            action = response.choices[0].message.content.strip().upper()
-            
-            
+            if self.hedger:
+                action, raw, usage = self.hedger.call(self._request_action, messages)
+            else:
+                action, raw, usage = self._request_action(messages)
+            latency = time.perf_counter() - request_start
+            self.metrics.observe('planner_llm_request', latency)
+            self.breaker.record_success()
+            self.last_source = "LLM"
+            # Solo la petición ganadora cuenta: la perdedora de un hedge se descarta
+            estimated = usage is None
+            if estimated:
+                # Streaming cortado antes del chunk de uso: estimación del PromptBuilder,
+                # en métricas aparte para no mezclarla con lo que factura el proveedor
+                usage = (prompt_estimate, estimate_tokens(raw))
+                self.metrics.incr('llm_usage_estimated')
+                self.metrics.incr('llm_prompt_tokens_estimated', usage[0])
+                self.metrics.incr('llm_completion_tokens_estimated', usage[1])
+            else:
+                self.metrics.incr('llm_prompt_tokens', usage[0])
+                self.metrics.incr('llm_completion_tokens', usage[1])
+            self._record_llm_call(game_state, latency, usage, raw, action, estimated=estimated)
             
-            # Limpieza rápida
-            for v in ["UP", "DOWN", "LEFT", "RIGHT", "A", "B"]:
-                if v in action: return v
+            if action is None:
+                self.metrics.incr('llm_unparsed_answers')
+                print(f"   ⚠️ Unparsed LLM answer: {raw!r}")
+                return "A"
             
-            return "A"
+            return self.mask_action(action, game_state)
             
         except Exception as e:
+            self.metrics.incr('llm_errors')
+            latency = time.perf_counter() - request_start
+            self.metrics.observe('planner_llm_request', latency)
+            self.breaker.record_failure()
+            self._record_llm_call(game_state, latency, error=str(e))
             print(f"Error: {e}")
-            return "A"
+            return self._fallback_action(game_state)
     
-    def advance_objective(self):
-        """Avanza al siguiente objetivo atómico"""
-        self.steps_since_advance = 0
-        self.current_atomic += 1
+    def _record_llm_call(self, game_state, latency, usage=None, raw=None, action=None, error=None,
+                         estimated=False):
+        """Registra la llamada en la base de datos de ejecuciones (si la hay)"""
+        if self.run_store is None:
+            return
+        prompt_tokens, completion_tokens = usage if usage else (None, None)
+        self.run_store.record_llm_call(
+            self.current_objective_id(), game_state['map_id'], self.model, latency,
+            prompt_tokens, completion_tokens, raw, action, error, estimated=estimated
+        )
+    
+    def _fallback_action(self, game_state):
+        """Decide con la política local (API caída o circuit breaker abierto)"""
+        self.metrics.incr('llm_fallback_decisions')
+        self.last_source = "FALLBACK"
+        return self._local_action(game_state)
+    
+    def _local_action(self, game_state):
+        """Acción de la política local hacia el waypoint del objetivo actual"""
+        context = self.get_current_context()
+        target = self._find_target_waypoint(context['current_step'], game_state) if context else None
+        return self.local_policy.decide(game_state, target)
+    
+    def _request_action(self, messages, cancel=None):
+        """
+        Lanza la petición al modelo y extrae el botón con la gramática estricta
         
-        # Verificar si completamos el objetivo táctico
-        phase = self.objectives['objective_hierarchy']['layer_1_strategic'][self.current_phase]
-        tactical = phase['layer_2_tactical'][self.current_tactical]
+        Args:
+            messages: Mensajes de la petición
+            cancel: threading.Event que activa el HedgedCaller si otra petición ganó
         
-        if self.current_atomic >= len(tactical['layer_3_atomic']):
-            # Avanzar al siguiente objetivo táctico
-            self.current_atomic = 0
-            self.current_tactical += 1
+        Returns:
+            Tupla (acción o None, texto crudo recibido, (tokens prompt, tokens respuesta) o None)
+        """
+        # Usar el modelo con visión más rápido disponible
+        # llama-3.2-11b-vision-preview: Más rápido, gratis, 30 req/min
+        # llama-3.2-90b-vision-preview: Más preciso pero lento
+        if not self.stream:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=5,
+                temperature=0.7 # Subimos temperatura para que no sea tan repetitivo
+            )
             
-            # Verificar si completamos la fase estratégica
-            if self.current_tactical >= len(phase['layer_2_tactical']):
-                self.current_tactical = 0
-                self.current_phase += 1
+            usage = getattr(response, 'usage', None)
+            tokens = None
+            if usage is not None:
+                tokens = (getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0)
+            
+            raw = response.choices[0].message.content or ""
+            return parse_action(raw), raw, tokens
+        
+        request_start = time.perf_counter()
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=5,
+            temperature=0.7,
+            stream=True
+        )
+        
+        parser = ActionStreamParser()
+        first_token = True
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    # Perdió el hedge: cerrar la conexión en lugar de leer hasta el final
+                    break
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token:
+                    self.metrics.observe('planner_llm_ttft', time.perf_counter() - request_start)
+                    first_token = False
+                self.metrics.incr('llm_completion_chunks')
                 
-                print(f"\n🎉 PHASE {self.current_phase} COMPLETED!\n")
+                # Cortar el stream en cuanto haya un botón válido
+                if parser.feed(delta):
+                    self.metrics.incr('llm_early_terminations')
+                    break
+        finally:
+            stream.close()
+        
+        # El stream se corta antes del chunk final con el uso: decide_action lo estima
+        return parser.finish(), parser.text, None
+    
+    def current_objective_id(self):
+        """Id estable del objetivo atómico actual (para el historial de presupuestos)"""
+        record = self.cursor.current
+        if record is None:
+            return None
+        return f"{record.context['phase_id']}/{record.context['tactical_id']}/{record.atomic}"
+    
+    def advance_objective(self, completed=True):
+        """Avanza al siguiente objetivo atómico (completed=False si es por timeout)"""
+        objective_id = self.current_objective_id()
+        if self.run_store is not None and objective_id:
+            self.run_store.record_objective(
+                objective_id, self.cursor.current.text, 'completed' if completed else 'timeout',
+                self.steps_since_advance, self.model
+            )
+        if self.step_budget is not None and objective_id:
+            if completed:
+                self.step_budget.record(objective_id, self.steps_since_advance)
+            else:
+                self.step_budget.record_timeout(objective_id)
+        if self.model != self.base_model:
+            print(f"   ↩️ Back to model {self.base_model}")
+            self.model = self.base_model
+        self.pending_recovery = None
+        
+        self.steps_since_advance = 0
+        previous = self.cursor.current
+        self.cursor.advance()
+        
+        if previous and (self.cursor.finished or self.cursor.current.phase != previous.phase):
+            print(f"\n🎉 PHASE {previous.phase + 1} COMPLETED!\n")
         
         context = self.get_current_context()
         if context:
             print(f"\n➡️  NEW OBJECTIVE: {context['current_step']}\n")
     
+    def skip_satisfied_objectives(self, game_state, memory):
+        """
+        Salta los objetivos que ya están cumplidos (p. ej. tras reanudar o por progreso incidental)
+        
+        Returns:
+            Número de objetivos saltados
+        """
+        steps = self.steps_since_advance
+        skipped = self.cursor.skip_satisfied(game_state, memory)
+        if skipped and self.run_store is not None:
+            for record in skipped:
+                objective_id = f"{record.context['phase_id']}/{record.context['tactical_id']}/{record.atomic}"
+                self.run_store.record_objective(objective_id, record.text, 'skipped', steps, self.model)
+                steps = 0
+        if skipped:
+            self.steps_since_advance = 0
+            self.model = self.base_model
+            self.pending_recovery = None
+            self.metrics.incr('objectives_skipped', len(skipped))
+            print(f"\n⏩ SKIPPED {len(skipped)} objectives already done (last: {skipped[-1].text})")
+        return len(skipped)
+    
     def increment_step_counter(self):
         """Incrementa el contador de pasos sin progreso"""
         self.steps_since_advance += 1
         
+        objective_id = self.current_objective_id()
+        if self.step_budget is not None and objective_id:
+            signal = self.step_budget.check(objective_id, self.steps_since_advance)
+        elif self.steps_since_advance >= self.max_steps_per_objective:
+            signal = 'timeout'
+        else:
+            signal = None
+        
         # Si lleva demasiado tiempo en un objetivo, forzar avance
-        if self.steps_since_advance >= self.max_steps_per_objective:
+        if signal == 'timeout':
             print(f"\n⏭️  Objective timeout, forcing advance...\n")
-            self.advance_objective()
+            self.metrics.incr('objective_timeouts')
+            self.advance_objective(completed=False)
             return True
         
+        if signal == 'escalate_model':
+            self.escalate_model()
+        elif signal is not None:
+            # El runner se encarga (p. ej. 'reload_checkpoint')
+            self.pending_recovery = signal
+        
         return False
     
+    def escalate_model(self):
+        """Cambia al modelo de escalado hasta que avance el objetivo"""
+        if self.escalation_model and self.model != self.escalation_model:
+            print(f"   ⬆️ Escalating to model {self.escalation_model}")
+            self.metrics.incr('model_escalations')
+            self.model = self.escalation_model
+    
+    def pop_recovery(self):
+        """Recuperación pendiente para el runner (None si no hay)"""
+        recovery, self.pending_recovery = self.pending_recovery, None
+        return recovery
+    
+    def progress_score(self):
+        """Escalar monótono del avance en la jerarquía (mayor = más avanzado)"""
+        return self.current_phase * 10000 + self.current_tactical * 100 + self.current_atomic
+    
+    def to_dict(self):
+        """Snapshot serializable para checkpoints"""
+        return {
+            'current_phase': self.current_phase,
+            'current_tactical': self.current_tactical,
+            'current_atomic': self.current_atomic,
+            'steps_since_advance': self.steps_since_advance,
+            'model': self.model,
+            'local_policy': self.local_policy.to_dict(),
+        }
+    
+    def load_dict(self, data):
+        """Restaura el estado desde to_dict()"""
+        self.cursor.seek(data['current_phase'], data['current_tactical'], data['current_atomic'])
+        self.steps_since_advance = data['steps_since_advance']
+        self.model = data.get('model', self.model)
+        if 'local_policy' in data:
+            self.local_policy.load_dict(data['local_policy'])
+    
     def get_progress_info(self):
         """Retorna información del progreso actual"""
         return {
@@ -211,11 +582,8 @@ Your response:"""
         }
         
         
-    def _get_waypoint_hint(self, objective_name, game_state):
-        """Genera hint basado en waypoints cercanos"""
-        if not self.waypoints:
-            return "No waypoint data available"
-            
+    def _find_relevant_waypoints(self, objective_name):
+        """Busca la lista de waypoints asociada al objetivo"""
         objective_lower = objective_name.lower()
         
         #Buscar waypoints relevantes
@@ -234,24 +602,56 @@ Your response:"""
                     break
             if relevant_waypoints:
                 break
-                
-        if not relevant_waypoints:
-            return "Navigate towards your objetive"
-            
-        #Encontrar waypoint mas cercano no visitado
-        current_pos = (game_state['map_id'], game_state['x'], game_state['y'])
         
+        return relevant_waypoints
+    
+    def _closest_waypoint(self, waypoints, game_state):
+        """Waypoint más cercano en el mapa actual (None si no hay ninguno)"""
         closest = None
         min_distance = float('inf')
         
-        for wp in relevant_waypoints:
-            if wp['map'] != current_pos[0]:
+        for wp in waypoints:
+            if wp['map'] != game_state['map_id']:
                 continue    #Diferente mapa, skip
        
-            distance = abs(wp['x'] - current_pos[1]) + abs(wp['y'] - current_pos[2])
+            distance = abs(wp['x'] - game_state['x']) + abs(wp['y'] - game_state['y'])
             if distance < min_distance:
                 min_distance = distance
                 closest = wp
+        
+        return closest
+    
+    def _find_target_waypoint(self, objective_name, game_state):
+        """Waypoint objetivo en el mapa actual (o salida hacia su mapa), para la política local"""
+        if not self.waypoints:
+            return None
+        relevant_waypoints = self._find_relevant_waypoints(objective_name)
+        closest = self._closest_waypoint(relevant_waypoints, game_state)
+        if closest is None and relevant_waypoints:
+            exit_tile = self._find_map_exit(game_state, relevant_waypoints[0]['map'])
+            if exit_tile:
+                return {'map': game_state['map_id'], 'x': exit_tile['x'], 'y': exit_tile['y']}
+        return closest
+    
+    def _find_map_exit(self, game_state, target_map):
+        """Salida del mapa actual hacia target_map según el grafo de mapas"""
+        if self.world_graph is None:
+            return None
+        return self.world_graph.next_exit(game_state, target_map)
+    
+    def _get_waypoint_hint(self, objective_name, game_state):
+        """Genera hint basado en waypoints cercanos"""
+        if not self.waypoints:
+            return "No waypoint data available"
+        
+        relevant_waypoints = self._find_relevant_waypoints(objective_name)
+                
+        if not relevant_waypoints:
+            return "Navigate towards your objetive"
+            
+        #Encontrar waypoint mas cercano no visitado
+        current_pos = (game_state['map_id'], game_state['x'], game_state['y'])
+        closest = self._closest_waypoint(relevant_waypoints, game_state)
                 
         if closest:
             direction_hint = self._get_direction_hint(current_pos, closest)
@@ -265,6 +665,13 @@ Your response:"""
             # Si el objetivo está en otro mapa (ej: Mapa 0) y nosotros en otro (Mapa 38)
             # las coordenadas NO sirven y solo confunden al robot causando bucles.
             if first_wp['map'] != current_pos[0]:
+                exit_tile = self._find_map_exit(game_state, first_wp['map'])
+                if exit_tile:
+                    exit_wp = {'x': exit_tile['x'], 'y': exit_tile['y']}
+                    direction_hint = self._get_direction_hint(current_pos, exit_wp)
+                    if exit_tile['action'] and direction_hint == "You are close!":
+                        direction_hint = f"You are close! Press {exit_tile['action']}"
+                    return f"Target: exit to Map {exit_tile['dst_map']} at ({exit_tile['x']}, {exit_tile['y']}) - {direction_hint}"
                 return " You are currently inside a room or building. The objective is OUTSIDE. IGNORE COORDINATES. Look for STAIRS, a DOOR, or a carpet to EXIT this map."
             # -----------------------------------------------
 
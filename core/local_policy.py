@@ -0,0 +1,89 @@
+"""
+Local Policy - Política local sin LLM para cuando la API no está disponible
+Prioridad: avanzar diálogo -> ir hacia el waypoint -> explorar lo menos visitado
+"""
+
+import random
+from collections import Counter
+
+DIRECTION_DELTAS = {
+    "UP": (0, -1),
+    "DOWN": (0, 1),
+    "LEFT": (-1, 0),
+    "RIGHT": (1, 0),
+}
+
+
+class LocalPolicy:
+    """
+    Decide acciones con información local: waypoints, visitas y choques
+    """
+
+    def __init__(self):
+        self.visits = Counter()   # (map_id, x, y) -> veces visitado
+        self.blocked = set()      # (map_id, x, y, dirección) que no movieron al jugador
+
+    def record_transition(self, action, state_before, state_after):
+        """Actualiza visitas y direcciones bloqueadas tras ejecutar una acción"""
+        pos_after = (state_after['map_id'], state_after['x'], state_after['y'])
+        self.visits[pos_after] += 1
+
+        if action in DIRECTION_DELTAS:
+            pos_before = (state_before['map_id'], state_before['x'], state_before['y'])
+            if pos_before == pos_after and not state_after.get('in_battle'):
+                self.blocked.add(pos_before + (action,))
+            else:
+                self.blocked.discard(pos_before + (action,))
+
+    def to_dict(self):
+        return {
+            'visits': [list(pos) + [count] for pos, count in self.visits.items()],
+            'blocked': [list(entry) for entry in self.blocked],
+        }
+
+    def load_dict(self, data):
+        self.visits = Counter({tuple(v[:3]): v[3] for v in data.get('visits', [])})
+        self.blocked = {tuple(b) for b in data.get('blocked', [])}
+
+    def decide(self, game_state, target=None):
+        """
+        Args:
+            game_state: Estado actual (acepta las claves opcionales 'in_dialog' y 'passable')
+            target: Waypoint {'map', 'x', 'y'} en el mapa actual, o None
+
+        Returns:
+            Nombre del botón
+        """
+        if game_state.get('in_dialog') or game_state.get('in_battle'):
+            return "A"
+
+        pos = (game_state['map_id'], game_state['x'], game_state['y'])
+        passable = game_state.get('passable', DIRECTION_DELTAS)
+        open_dirs = [d for d in DIRECTION_DELTAS if d in passable and pos + (d,) not in self.blocked]
+        if not open_dirs:
+            return "B"
+
+        # Pathfinder greedy hacia el waypoint (eje más largo primero)
+        if target is not None and target['map'] == pos[0]:
+            dx = target['x'] - pos[1]
+            dy = target['y'] - pos[2]
+            preferred = []
+            horizontal = "RIGHT" if dx > 0 else "LEFT"
+            vertical = "DOWN" if dy > 0 else "UP"
+            if abs(dx) >= abs(dy):
+                preferred = [horizontal] if dx else []
+                preferred += [vertical] if dy else []
+            else:
+                preferred = [vertical] if dy else []
+                preferred += [horizontal] if dx else []
+            for direction in preferred:
+                if direction in open_dirs:
+                    return direction
+
+        # Exploración: vecino menos visitado
+        def neighbour_visits(direction):
+            ddx, ddy = DIRECTION_DELTAS[direction]
+            return self.visits[(pos[0], pos[1] + ddx, pos[2] + ddy)]
+
+        least = min(neighbour_visits(d) for d in open_dirs)
+        return random.choice([d for d in open_dirs if neighbour_visits(d) == least])
@@ -0,0 +1,192 @@
+"""
+Lookahead - Búsqueda por ramas sobre save states para salir de atascos
+Prueba secuencias candidatas en emuladores clonados y elige la mejor
+"""
+
+import io
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from pyboy import PyBoy
+
+from core.game_state import count_new_flags, read_event_flags, read_game_state
+from core.input_scheduler import InputScheduler
+
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+PERPENDICULAR = {
+    "UP": ("LEFT", "RIGHT"),
+    "DOWN": ("LEFT", "RIGHT"),
+    "LEFT": ("UP", "DOWN"),
+    "RIGHT": ("UP", "DOWN"),
+}
+
+
+def default_candidates():
+    """Secuencias cortas: botones sueltos, tramos rectos y giros en L"""
+    candidates = [[button] for button in ("A", "B")]
+    for direction in DIRECTIONS:
+        candidates.append([direction] * 3)
+        for side in PERPENDICULAR[direction]:
+            candidates.append([direction, direction, side, side])
+    candidates.append(["B", "B", "DOWN", "DOWN"])
+    return candidates
+
+
+@dataclass
+class BranchResult:
+    """Resultado de simular una secuencia desde el save state raíz"""
+
+    actions: list
+    states: list                 # game_state tras cada acción
+    new_flags: int
+    frames: int
+    score: float = 0.0
+    details: dict = field(default_factory=dict)
+
+
+def simulate_branch(emu, scheduler, root_state, actions):
+    """Carga el estado raíz y ejecuta la secuencia en `emu`"""
+    emu.load_state(io.BytesIO(root_state))
+    flags_before = read_event_flags(emu)
+
+    states = []
+    frames = 0
+    for action in actions:
+        frames += scheduler.execute(action)
+        states.append(read_game_state(emu))
+
+    return BranchResult(
+        actions=list(actions),
+        states=states,
+        new_flags=count_new_flags(flags_before, read_event_flags(emu)),
+        frames=frames,
+    )
+
+
+# --- Worker del pool de procesos (un emulador headless por proceso) ---
+_worker_emu = None
+_worker_scheduler = None
+
+
+def _init_worker(rom_path, scheduler_kwargs):
+    global _worker_emu, _worker_scheduler
+    _worker_emu = PyBoy(rom_path, window="null")
+    _worker_emu.set_emulation_speed(0)
+    _worker_scheduler = InputScheduler(_worker_emu, **scheduler_kwargs, render=False)
+
+
+def _worker_simulate(root_state, actions):
+    return simulate_branch(_worker_emu, _worker_scheduler, root_state, actions)
+
+
+class LookaheadSearch:
+    """
+    Busca la mejor secuencia de acciones desde el estado actual
+
+    En modo headless las ramas se reparten entre un pool de procesos con su
+    propio emulador clonado. Con ventana se simulan en serie sobre el emulador
+    vivo y se restaura el estado raíz al terminar.
+    """
+
+    def __init__(self, rom_path, headless=False, workers=4, candidates=None,
+                 distance_weight=2.0, novelty_weight=1.0, flag_weight=10.0, length_penalty=0.1,
+                 scheduler_kwargs=None):
+        """
+        Args:
+            rom_path: ROM para los emuladores clonados
+            headless: Usar el pool de procesos
+            workers: Procesos del pool
+            candidates: Lista de secuencias a probar (por defecto default_candidates())
+            *_weight: Pesos del score (acercarse al objetivo, casillas nuevas, flags nuevos)
+            length_penalty: Penalización por acción de la secuencia
+            scheduler_kwargs: Parámetros del InputScheduler (los mismos que el del juego en vivo,
+                para que una rama simulada dure lo mismo que al repetirla)
+        """
+        self.rom_path = rom_path
+        self.headless = headless
+        self.workers = workers
+        self.candidates = candidates or default_candidates()
+        self.distance_weight = distance_weight
+        self.novelty_weight = novelty_weight
+        self.flag_weight = flag_weight
+        self.length_penalty = length_penalty
+        self.scheduler_kwargs = dict(scheduler_kwargs or {})
+        self.scheduler_kwargs.pop('render', None)
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.rom_path, self.scheduler_kwargs)
+            )
+        return self._pool
+
+    def search(self, emu, game_state, target=None, visits=None):
+        """
+        Args:
+            emu: Emulador vivo (no se modifica: se restaura su estado)
+            game_state: Estado actual
+            target: Waypoint {'map', 'x', 'y'} hacia el que puntuar, o None
+            visits: Counter de (map_id, x, y) visitados para la novedad
+
+        Returns:
+            El mejor BranchResult con score > 0, o None
+        """
+        buffer = io.BytesIO()
+        emu.save_state(buffer)
+        root_state = buffer.getvalue()
+
+        if self.headless:
+            pool = self._get_pool()
+            futures = [pool.submit(_worker_simulate, root_state, seq) for seq in self.candidates]
+            results = [f.result() for f in futures]
+        else:
+            scheduler = InputScheduler(emu, **self.scheduler_kwargs, render=False)
+            try:
+                results = [simulate_branch(emu, scheduler, root_state, seq) for seq in self.candidates]
+            finally:
+                emu.load_state(io.BytesIO(root_state))
+
+        for result in results:
+            self._score(result, game_state, target, visits or {})
+
+        best = max(results, key=lambda r: r.score)
+        if best.score <= 0:
+            return None
+        return best
+
+    def _score(self, result, game_state, target, visits):
+        start = (game_state['map_id'], game_state['x'], game_state['y'])
+        end_state = result.states[-1]
+        end = (end_state['map_id'], end_state['x'], end_state['y'])
+
+        progress = 0.0
+        if target is not None:
+            def distance(pos):
+                if pos[0] != target['map']:
+                    return None
+                return abs(pos[1] - target['x']) + abs(pos[2] - target['y'])
+
+            d_start, d_end = distance(start), distance(end)
+            if d_start is not None and d_end is not None:
+                progress = d_start - d_end
+            elif d_start is None and d_end is not None:
+                progress = 5.0    # Entrar en el mapa del objetivo
+
+        tiles = {(s['map_id'], s['x'], s['y']) for s in result.states} - {start}
+        novelty = sum(1 for tile in tiles if visits.get(tile, 0) == 0)
+
+        result.details = {'progress': progress, 'novelty': novelty, 'new_flags': result.new_flags}
+        result.score = (
+            self.distance_weight * progress
+            + self.novelty_weight * novelty
+            + self.flag_weight * result.new_flags
+            - self.length_penalty * len(result.actions)
+        )
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,213 @@
+"""
+Macro Library - Secuencias de acciones que ya completaron un objetivo, en SQLite
+Clave: objetivo + casilla de inicio (mapa, x, y, huella de flags). Se reproducen
+verificando la posición tras cada paso y, si algo no cuadra, se vuelve al LLM
+"""
+
+import json
+import sqlite3
+import time
+
+from core.game_state import event_flag_digest
+
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS macros (
+    id INTEGER PRIMARY KEY,
+    objective_id TEXT NOT NULL,
+    actions TEXT NOT NULL,
+    positions TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS macro_starts (
+    objective_id TEXT NOT NULL,
+    map_id INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    flags INTEGER NOT NULL,
+    macro_id INTEGER NOT NULL REFERENCES macros(id),
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_macro_starts
+    ON macro_starts (objective_id, map_id, x, y, flags);
+"""
+
+
+def remove_cycles(actions, points):
+    """
+    Elimina vueltas en círculo: tramos solo de direcciones que acaban en la misma casilla
+
+    Un tramo no se elimina si lo sigue un botón (A, B...), porque la última
+    dirección decide hacia dónde mira el jugador al pulsarlo.
+
+    Args:
+        actions: Acciones ejecutadas
+        points: Casillas [inicio] + [tras cada acción]; len(points) == len(actions) + 1
+    """
+    actions, points = list(actions), list(points)
+    i = 0
+    while i < len(actions):
+        run_end = i
+        while run_end < len(actions) and actions[run_end] in DIRECTIONS:
+            run_end += 1
+        for j in range(run_end, i, -1):
+            if points[j][:3] == points[i][:3] and (j == len(actions) or actions[j] in DIRECTIONS):
+                del actions[i:j]
+                del points[i + 1:j + 1]
+                break
+        i += 1
+    return actions, points
+
+
+class MacroReplay:
+    """Reproducción en curso de una macro desde un offset"""
+
+    def __init__(self, macro_id, actions, positions, offset):
+        self.macro_id = macro_id
+        self.actions = actions
+        self.positions = positions
+        self.index = offset
+
+    @property
+    def done(self):
+        return self.index >= len(self.actions)
+
+    def next_action(self):
+        return self.actions[self.index]
+
+    def verify(self, game_state):
+        """Comprueba la casilla tras ejecutar next_action(); avanza si cuadra"""
+        expected = tuple(self.positions[self.index][:3])
+        actual = (game_state['map_id'], game_state['x'], game_state['y'])
+        if actual != expected:
+            return False
+        self.index += 1
+        return True
+
+
+class MacroLibrary:
+    """
+    Graba la trayectoria de cada objetivo y la guarda al completarlo
+
+    Cada casilla de la trayectoria (ya sin vueltas) queda indexada como posible
+    inicio, así una macro también se puede retomar a mitad de camino.
+    """
+
+    def __init__(self, path="macros.db", max_length=2000):
+        """
+        Args:
+            path: Base de datos SQLite
+            max_length: Acciones máximas grabadas por objetivo (más = se descarta)
+        """
+        self.path = path
+        self.max_length = max_length
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._objective_id = None
+        self._actions = []
+        self._points = []
+
+    @staticmethod
+    def point(emu, game_state):
+        return (game_state['map_id'], game_state['x'], game_state['y'], event_flag_digest(emu))
+
+    # --- Grabación ---
+
+    def start_recording(self, objective_id, emu, game_state):
+        """Empieza (o reinicia tras un salto de estado) la trayectoria del objetivo"""
+        self._objective_id = objective_id
+        self._actions = []
+        self._points = [self.point(emu, game_state)]
+
+    def record_step(self, action, emu, game_state):
+        if self._objective_id is None:
+            return
+        if len(self._actions) >= self.max_length:
+            self.cancel_recording()
+            return
+        self._actions.append(action)
+        self._points.append(self.point(emu, game_state))
+
+    def cancel_recording(self):
+        self._objective_id = None
+        self._actions = []
+        self._points = []
+
+    def finish_recording(self):
+        """
+        Guarda la trayectoria del objetivo recién completado
+
+        Returns:
+            Id de la macro, o None si no había nada nuevo que guardar
+        """
+        objective_id = self._objective_id
+        actions, points = remove_cycles(self._actions, self._points)
+        self.cancel_recording()
+        if objective_id is None or not actions:
+            return None
+
+        encoded = json.dumps(actions)
+        duplicate = self.conn.execute(
+            """
+            SELECT 1 FROM macro_starts s JOIN macros m ON m.id = s.macro_id
+            WHERE s.objective_id = ? AND s.map_id = ? AND s.x = ? AND s.y = ? AND s.flags = ?
+              AND s.offset = 0 AND m.actions = ?
+            """,
+            (objective_id, *points[0], encoded)
+        ).fetchone()
+        if duplicate:
+            return None
+
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO macros (objective_id, actions, positions, length, created) VALUES (?, ?, ?, ?, ?)",
+                (objective_id, encoded, json.dumps(points[1:]), len(actions), time.time())
+            )
+            macro_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO macro_starts (objective_id, map_id, x, y, flags, macro_id, offset) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(objective_id, *point, macro_id, offset) for offset, point in enumerate(points[:-1])]
+            )
+        return macro_id
+
+    # --- Reproducción ---
+
+    def lookup(self, objective_id, emu, game_state):
+        """
+        Mejor macro que empieza en la casilla actual para el objetivo
+
+        Se prefieren macros con mejor historial y, a igualdad, con menos pasos restantes.
+
+        Returns:
+            MacroReplay o None
+        """
+        map_id, x, y, flags = self.point(emu, game_state)
+        row = self.conn.execute(
+            """
+            SELECT m.id, m.actions, m.positions, s.offset
+            FROM macro_starts s JOIN macros m ON m.id = s.macro_id
+            WHERE s.objective_id = ? AND s.map_id = ? AND s.x = ? AND s.y = ? AND s.flags = ?
+              AND m.failures <= m.successes + 2
+            ORDER BY (m.successes - m.failures) DESC,
+                     m.length - s.offset ASC
+            LIMIT 1
+            """,
+            (objective_id, map_id, x, y, flags)
+        ).fetchone()
+        if row is None:
+            return None
+        macro_id, actions, positions, offset = row
+        return MacroReplay(macro_id, json.loads(actions), json.loads(positions), offset)
+
+    def report(self, macro_id, success):
+        column = "successes" if success else "failures"
+        with self.conn:
+            self.conn.execute(f"UPDATE macros SET {column} = {column} + 1 WHERE id = ?", (macro_id,))
+
+    def close(self):
+        self.conn.close()
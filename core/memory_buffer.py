@@ -9,7 +9,13 @@ class MemoryBuffer:
     Buffer sofisticado para recordar acciones y detectar loops/stuck
     """
     
-    def __init__(self, max_size=20):
+    def __init__(self, max_size=20, world_graph=None):
+        """
+        Args:
+            max_size: Número de acciones recordadas
+            world_graph: WorldGraph opcional donde registrar los cambios de mapa
+        """
+        self.world_graph = world_graph
         self.actions = deque(maxlen=max_size)
         self.states_before = deque(maxlen=max_size)
         self.states_after = deque(maxlen=max_size)
@@ -31,16 +37,18 @@ class MemoryBuffer:
         self.states_after.append(state_after)
         
         # Calcular resultado
-        result = self._compute_result(state_before, state_after)
+        result = self._compute_result(state_before, state_after, action)
         self.results.append(result)
     
-    def _compute_result(self, before, after):
+    def _compute_result(self, before, after, action=None):
         """Detecta qué cambió entre estados"""
         changes = []
         
         # Cambio de mapa (más importante)
         if before['map_id'] != after['map_id']:
             changes.append(f"Map {before['map_id']}→{after['map_id']}")
+            if self.world_graph is not None:
+                self.world_graph.record_transition(before, action, after)
         
         # Cambio de batalla
         if before.get('in_battle') != after.get('in_battle'):
@@ -160,26 +168,26 @@ class MemoryBuffer:
         
         recent = list(self.actions)[-5:]
         
-      # NIVEL 1: Primeros intentos (1-3) - Probar B o A
-       #if self.stuck_counter == 0:
-       #    return "A"
-       #elif self.stuck_counter == 1:
-       #    if recent.count("A") >= 2:
-       #        return "DOWN"
-       #    return "RIGHT"
+        # NIVEL 1: Primeros intentos (1-3) - Probar B o A
+        #if self.stuck_counter == 0:
+        #    return "A"
+        #elif self.stuck_counter == 1:
+        #    if recent.count("A") >= 2:
+        #        return "DOWN"
+        #    return "RIGHT"
         
-       # NIVEL 2: Intentos 4-8 - Forzar movimiento simple
+        # NIVEL 2: Intentos 4-8 - Forzar movimiento simple
         if self.stuck_counter <= 5:
-        # Alternar entre direcciones no usadas recientemente
+            # Alternar entre direcciones no usadas recientemente
             directions = ["UP", "DOWN", "LEFT", "RIGHT"]
-        for direction in directions:
-            if recent.count(direction) == 0:
-                return direction
-        return "DOWN"  # Default si todas están usadas
-    
-    # NIVEL 3: Intentos 9-15 - Movimiento agresivo
+            for direction in directions:
+                if recent.count(direction) == 0:
+                    return direction
+            return "DOWN"  # Default si todas están usadas
+        
+        # NIVEL 3: Intentos 9-15 - Movimiento agresivo
         if self.stuck_counter <= 10:
-        # Probar la dirección opuesta a la última usada
+            # Probar la dirección opuesta a la última usada
             last_action = self.actions[-1]
             opposites = {
                 "UP": "DOWN",
@@ -187,16 +195,15 @@ class MemoryBuffer:
                 "LEFT": "RIGHT",
                 "RIGHT": "LEFT"
             }
-        if last_action in opposites:
-            return opposites[last_action]
-        return "DOWN"
-    
-    # NIVEL 4: Más de 15 intentos - Secuencia de escape
+            if last_action in opposites:
+                return opposites[last_action]
+            return "DOWN"
+        
+        # NIVEL 4: Más de 15 intentos - Secuencia de escape
         escape_sequence = ["START", "B", "DOWN", "DOWN", "A"]
         idx = self.stuck_counter % len(escape_sequence)
         return escape_sequence[idx]
     
-    
     def get_position_history(self, n=10):
         """
         Retorna historial de posiciones recientes
@@ -215,6 +222,24 @@ class MemoryBuffer:
             for s in list(self.states_after)[-n:]
         ]
     
+    def to_dict(self):
+        """Snapshot serializable para checkpoints"""
+        return {
+            'actions': list(self.actions),
+            'states_before': list(self.states_before),
+            'states_after': list(self.states_after),
+            'results': list(self.results),
+            'stuck_counter': self.stuck_counter,
+        }
+    
+    def load_dict(self, data):
+        """Restaura el buffer desde to_dict()"""
+        self.actions = deque(data['actions'], maxlen=self.max_size)
+        self.states_before = deque(data['states_before'], maxlen=self.max_size)
+        self.states_after = deque(data['states_after'], maxlen=self.max_size)
+        self.results = deque(data['results'], maxlen=self.max_size)
+        self.stuck_counter = data.get('stuck_counter', 0)
+    
     def clear(self):
         """Limpia todo el buffer"""
         self.actions.clear()
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from enum import IntEnum, IntFlag
 
+from core.sprites import read_sprites
+
 
 class StatusCondition(IntFlag):
     NONE = 0
@@ -1193,6 +1195,10 @@ class PokemonRedReader:
 
         return text
 
+    def read_sprites(self):
+        """Read on-screen NPC/object sprites as rows of (sprite id, x, y, facing, moving)"""
+        return read_sprites(self.memory)
+
     def read_pokedex_caught_count(self) -> int:
         """Read how many unique Pokemon species have been caught"""
         # Pokedex owned flags are stored in D2F7-D309
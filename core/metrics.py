@@ -0,0 +1,194 @@
+"""
+Metrics - Instrumentación ligera por fase del loop principal
+Histogramas rodantes (p50/p95/p99), contadores y exportación a fichero
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+
+class _NullTimer:
+    """Timer vacío para cuando las métricas están desactivadas"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """Context manager que mide una fase con perf_counter"""
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class RollingHistogram:
+    """Ventana rodante de observaciones con percentiles bajo demanda"""
+
+    def __init__(self, window=1000):
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q):
+        """Percentil q (0-100) sobre la ventana actual"""
+        if not self.values:
+            return 0.0
+        ordered = sorted(self.values)
+        idx = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def summary(self):
+        if not self.values:
+            return {'count': self.count, 'sum': self.total, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+        ordered = sorted(self.values)
+        last = len(ordered) - 1
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'p50': ordered[int(round(0.50 * last))],
+            'p95': ordered[int(round(0.95 * last))],
+            'p99': ordered[int(round(0.99 * last))],
+        }
+
+
+class Metrics:
+    """
+    Colector de métricas del agente
+
+    Los tiempos se registran con `timer(nombre)` y los contadores con `incr`.
+    La exportación se hace a un fichero local en formato Prometheus o JSONL.
+    """
+
+    def __init__(self, enabled=True, window=1000, export_path=None,
+                 export_format='prometheus', export_every=50):
+        """
+        Args:
+            enabled: Si es False, todas las operaciones son no-op
+            window: Tamaño de la ventana rodante de cada histograma
+            export_path: Fichero de salida (None = no exportar)
+            export_format: 'prometheus' (sobrescribe) o 'jsonl' (añade línea)
+            export_every: Cada cuántos steps exporta `maybe_export`
+        """
+        self.enabled = enabled
+        self.window = window
+        self.export_path = export_path
+        self.export_format = export_format
+        self.export_every = max(1, export_every)
+
+        self.histograms = {}
+        self.counters = {}
+
+    def timer(self, name):
+        """Context manager que mide la duración de una fase"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name, value):
+        """Registra una observación en el histograma `name`"""
+        if not self.enabled:
+            return
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = RollingHistogram(self.window)
+        hist.add(value)
+
+    def incr(self, name, value=1):
+        """Incrementa un contador"""
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def percentile(self, name, q):
+        """Percentil de un histograma (None si no hay datos)"""
+        hist = self.histograms.get(name)
+        if hist is None or not hist.values:
+            return None
+        return hist.percentile(q)
+
+    def error_rate(self):
+        """Tasa de errores de la API del LLM"""
+        requests = self.counters.get('llm_requests', 0)
+        if requests == 0:
+            return 0.0
+        return self.counters.get('llm_errors', 0) / requests
+
+    def snapshot(self):
+        """Retorna un dict con el estado actual de todas las métricas"""
+        return {
+            'timestamp': time.time(),
+            'histograms': {name: h.summary() for name, h in self.histograms.items()},
+            'counters': dict(self.counters),
+            'llm_error_rate': self.error_rate(),
+        }
+
+    def maybe_export(self, step):
+        """Exporta si toca según `export_every`"""
+        if self.enabled and self.export_path and step % self.export_every == 0:
+            self.export()
+
+    def export(self):
+        """Escribe las métricas al fichero configurado"""
+        if not self.enabled or not self.export_path:
+            return
+
+        snap = self.snapshot()
+        try:
+            if self.export_format == 'jsonl':
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(snap) + "\n")
+            else:
+                # Escritura atómica para que un scraper nunca lea un fichero a medias
+                tmp_path = self.export_path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self._to_prometheus(snap))
+                os.replace(tmp_path, self.export_path)
+        except OSError as e:
+            print(f"    ERROR: exporting metrics: {e}")
+
+    def _to_prometheus(self, snap):
+        """Formato de texto de Prometheus (summaries + counters)"""
+        lines = []
+        for name, s in sorted(snap['histograms'].items()):
+            metric = f"mgaf_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for q, key in (("0.5", 'p50'), ("0.95", 'p95'), ("0.99", 'p99')):
+                lines.append(f'{metric}{{quantile="{q}"}} {s[key]:.6f}')
+            lines.append(f"{metric}_sum {s['sum']:.6f}")
+            lines.append(f"{metric}_count {s['count']}")
+
+        for name, value in sorted(snap['counters'].items()):
+            metric = f"mgaf_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        lines.append("# TYPE mgaf_llm_error_rate gauge")
+        lines.append(f"mgaf_llm_error_rate {snap['llm_error_rate']:.6f}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+"""
+Objective Cursor - Jerarquía de objectives.json aplanada en un array indexado
+Contexto en O(1) y salto automático sobre objetivos que ya están cumplidos
+"""
+
+from dataclasses import dataclass, field
+
+# Claves de game_state que sirven para saltar: no retroceden y siguen el orden de la
+# historia ('max_level' no: se puede subir de nivel antes de tiempo)
+DURABLE_STATE_KEYS = frozenset({'party_count'})
+
+
+@dataclass(frozen=True)
+class ObjectiveRecord:
+    """Un objetivo atómico con su contexto precalculado"""
+
+    index: int
+    phase: int
+    tactical: int
+    atomic: int
+    text: str
+    context: dict = field(compare=False, hash=False)
+
+
+class _RecordingState(dict):
+    """game_state que apunta qué claves consulta el predicado"""
+
+    def __init__(self, accessed):
+        super().__init__()
+        self.accessed = accessed
+
+    def __getitem__(self, key):
+        self.accessed.add(key)
+        return 0
+
+    def get(self, key, default=None):
+        self.accessed.add(key)
+        return 0
+
+
+class _RecordingMemory:
+    """Memoria a cero que apunta si el predicado la lee"""
+
+    def __init__(self, accessed):
+        self.accessed = accessed
+
+    def __getitem__(self, addr):
+        self.accessed.add('memory')
+        if isinstance(addr, slice):
+            return [0] * len(range(addr.start, addr.stop, addr.step or 1))
+        return 0
+
+
+def is_durable_predicate(event_checker, text):
+    """
+    True si el predicado del objetivo solo depende de cosas que no se pierden
+    y siguen el orden de la historia (flags, objetos, medallas leídos de RAM)
+
+    Los predicados de ubicación ("no estar en Viridian Forest") o los que
+    devuelven True sin mirar nada no sirven para saltar hacia delante.
+    """
+    accessed = set()
+    try:
+        event_checker.check_objective_complete(text, _RecordingState(accessed), _RecordingMemory(accessed))
+    except (KeyError, TypeError, ValueError):
+        return False
+    if not accessed:
+        return False
+    return accessed <= DURABLE_STATE_KEYS | {'memory'}
+
+
+class ObjectiveCursor:
+    """
+    Cursor sobre los objetivos atómicos de objectives.json
+
+    `current` es O(1); `skip_satisfied` avanza sobre los objetivos consecutivos,
+    desde el actual, cuyo predicado duradero ya se cumple.
+    """
+
+    def __init__(self, objectives):
+        """
+        Args:
+            objectives: Contenido de objectives.json
+        """
+        self.records = []
+        phases = objectives['objective_hierarchy']['layer_1_strategic']
+        for p, phase in enumerate(phases):
+            for t, tactical in enumerate(phase['layer_2_tactical']):
+                for a, text in enumerate(tactical['layer_3_atomic']):
+                    self.records.append(ObjectiveRecord(
+                        index=len(self.records),
+                        phase=p,
+                        tactical=t,
+                        atomic=a,
+                        text=text,
+                        context={
+                            'strategic_goal': phase['goal'],
+                            'tactical_goal': tactical['goal'],
+                            'current_step': text,
+                            'phase_id': phase['id'],
+                            'tactical_id': tactical['id'],
+                        },
+                    ))
+        self._positions = {(r.phase, r.tactical, r.atomic): r.index for r in self.records}
+        self.index = 0
+        self.event_checker = None
+        self.durable = frozenset()
+
+    def bind(self, event_checker):
+        """Precalcula qué objetivos tienen predicado duradero"""
+        self.event_checker = event_checker
+        self.durable = frozenset(
+            r.index for r in self.records if is_durable_predicate(event_checker, r.text)
+        )
+
+    @property
+    def current(self):
+        """ObjectiveRecord actual, o None si se completaron todos"""
+        if self.index < len(self.records):
+            return self.records[self.index]
+        return None
+
+    @property
+    def finished(self):
+        return self.index >= len(self.records)
+
+    def advance(self):
+        self.index = min(self.index + 1, len(self.records))
+        return self.current
+
+    def seek(self, phase, tactical, atomic):
+        """Coloca el cursor en una posición (fase, táctico, atómico)"""
+        self.index = self._positions.get((phase, tactical, atomic), len(self.records))
+
+    def skip_satisfied(self, game_state, memory):
+        """
+        Salta sobre los objetivos ya cumplidos
+
+        Solo avanza por el tramo contiguo desde el objetivo actual: un predicado
+        que se dispare por error muy por delante no salta media partida.
+
+        Returns:
+            Lista de ObjectiveRecord saltados (vacía si no hubo salto)
+        """
+        if self.event_checker is None:
+            return []
+        start = self.index
+        while self.index in self.durable:
+            text = self.records[self.index].text
+            if not self.event_checker.check_objective_complete(text, game_state, memory):
+                break
+            self.index += 1
+        return self.records[start:self.index]
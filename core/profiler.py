@@ -0,0 +1,178 @@
+"""
+Profiler Hooks - Perfilado bajo demanda durante una partida en curso
+Se activa con una señal (SIGUSR1) o con una ventana de steps configurada
+"""
+
+import cProfile
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+class _StackSampler(threading.Thread):
+    """Muestrea la pila del hilo principal para generar collapsed stacks"""
+
+    def __init__(self, target_thread_id, interval):
+        super().__init__(daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=1.0)
+
+
+class ProfilerHooks:
+    """
+    Ganchos de perfilado para el runner del agente
+
+    Mientras la ventana está activa se ejecutan cProfile, un muestreador de
+    pilas y tracemalloc. Al cerrarse se escriben:
+        - <prefijo>.pstats      (cargable con pstats / snakeviz)
+        - <prefijo>.collapsed   (formato flamegraph.pl / speedscope)
+        - <prefijo>.tracemalloc.txt (top de crecimiento de memoria)
+    """
+
+    def __init__(self, output_dir="profiles", step_range=None, signal_window=200,
+                 sample_interval=0.005, use_signal=True):
+        """
+        Args:
+            output_dir: Carpeta donde se guardan los perfiles
+            step_range: Tupla (inicio, fin) de steps a perfilar, o None
+            signal_window: Steps que dura una ventana activada por señal (None = hasta otra señal)
+            sample_interval: Segundos entre muestras de pila
+            use_signal: Instalar el handler de SIGUSR1 si la plataforma lo soporta
+        """
+        self.output_dir = output_dir
+        self.step_range = step_range
+        self.signal_window = signal_window
+        self.sample_interval = sample_interval
+
+        self.active = False
+        self.start_step = 0
+        self.stop_at_step = None
+        self._toggle_requested = False
+
+        self._profile = None
+        self._sampler = None
+        self._mem_start = None
+        self._started_tracemalloc = False
+
+        if use_signal and hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self._on_signal)
+
+    def _on_signal(self, signum, frame):
+        """Solo marca la petición; el cambio real se hace entre steps"""
+        self._toggle_requested = True
+
+    def on_step(self, step, context=None):
+        """
+        Llamar al inicio de cada step del loop principal
+
+        Args:
+            step: Número de step actual
+            context: Resultado de LLMPlanner.get_current_context()
+        """
+        if self._toggle_requested:
+            self._toggle_requested = False
+            if self.active:
+                self.stop(step, context)
+            else:
+                stop_at = step + self.signal_window if self.signal_window else None
+                self.start(step, stop_at)
+            return
+
+        if self.active:
+            if self.stop_at_step is not None and step >= self.stop_at_step:
+                self.stop(step, context)
+        elif self.step_range and step == self.step_range[0]:
+            self.start(step, self.step_range[1])
+
+    def start(self, step, stop_at_step=None):
+        """Inicia la ventana de perfilado"""
+        if self.active:
+            return
+
+        print(f"\n🔬 PROFILER ON (step {step})\n")
+        self.active = True
+        self.start_step = step
+        self.stop_at_step = stop_at_step
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self._mem_start = tracemalloc.take_snapshot()
+
+        self._sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+        self._sampler.start()
+
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, step, context=None):
+        """Cierra la ventana y escribe los ficheros de salida"""
+        if not self.active:
+            return
+
+        self._profile.disable()
+        self._sampler.stop()
+        mem_end = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.active = False
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(
+            self.output_dir,
+            f"prof_{self.start_step:06d}-{step:06d}_{self._objective_tag(context)}_{int(time.time())}"
+        )
+
+        try:
+            self._profile.dump_stats(prefix + ".pstats")
+
+            with open(prefix + ".collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            with open(prefix + ".tracemalloc.txt", 'w', encoding='utf-8') as f:
+                f.write(f"# steps {self.start_step}-{step}\n")
+                if context:
+                    f.write(f"# objective: {context['current_step']}\n")
+                for stat in mem_end.compare_to(self._mem_start, 'lineno')[:30]:
+                    f.write(f"{stat}\n")
+
+            print(f"\n🔬 PROFILER OFF (step {step}) → {prefix}.*\n")
+        except OSError as e:
+            print(f"    ERROR: writing profile: {e}")
+        finally:
+            self._profile = None
+            self._sampler = None
+            self._mem_start = None
+
+    def _objective_tag(self, context):
+        """Etiqueta corta y segura para nombres de fichero"""
+        if not context:
+            return "no_objective"
+        raw = f"{context['phase_id']}_{context['tactical_id']}_{context['current_step']}"
+        return re.sub(r'[^A-Za-z0-9]+', '_', raw).strip('_')[:60]
@@ -70,6 +70,24 @@ class ProgressTracker:
         distance = abs(x - w_x) + abs(y - w_y)
         return distance <= threshold
     
+    def to_dict(self):
+        """Snapshot serializable para checkpoints"""
+        return {
+            'checkpoints': [list(c) for c in self.checkpoints],
+            'last_progress_step': self.last_progress_step,
+            'no_progress_counter': self.no_progress_counter,
+        }
+    
+    def load_dict(self, data):
+        """Restaura el estado desde to_dict()"""
+        self.checkpoints = [tuple(c) for c in data['checkpoints']]
+        self.last_progress_step = data.get('last_progress_step', 0)
+        self.no_progress_counter = data.get('no_progress_counter', 0)
+    
+    def reset_no_progress(self):
+        """Reinicia solo el contador de estancamiento (p. ej. tras restaurar un estado)"""
+        self.no_progress_counter = 0
+    
     def reset_for_new_objective(self):
         """Resetea cuando cambia de objetivo"""
         self.checkpoints = []
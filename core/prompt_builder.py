@@ -0,0 +1,151 @@
+"""
+Prompt Builder - Prompt por secciones con presupuesto de tokens
+El prefijo estático se construye una vez y se envía byte a byte idéntico en cada
+llamada (mensaje de sistema), para que el caché de prompts del proveedor lo reutilice
+"""
+
+import re
+from dataclasses import dataclass
+
+CHARS_PER_TOKEN = 4             # estimación conservadora para texto en inglés/español
+
+STATIC_PREFIX = """You are playing Pokemon Red on a Game Boy.
+Each turn you get the player position, the current objective, a target hint, the recent actions and the allowed keys.
+Answer with ONE KEY from the allowed keys to get closer to the target.
+Try not to repeat the same KEY to move.
+JUST ONE WORD, NO MORE.
+Do not add a dot at the end of the answer."""
+
+_HISTORY_LINE = re.compile(r"^\s*\d+\.\s*(\S+)\s*→\s*(.*)$")
+
+
+def estimate_tokens(text):
+    """Tokens aproximados de un texto"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def parse_history(memory_summary):
+    """
+    Convierte MemoryBuffer.get_recent_summary() en una lista de (acción, resultado)
+
+    Admite también una lista ya parseada.
+    """
+    if not memory_summary:
+        return []
+    if not isinstance(memory_summary, str):
+        return list(memory_summary)
+    entries = []
+    for line in memory_summary.splitlines():
+        match = _HISTORY_LINE.match(line)
+        if match:
+            entries.append((match.group(1), match.group(2).strip()))
+    return entries
+
+
+def compact_history(entries):
+    """Historial en una línea, agrupando repeticiones: 'UP→Moved, LEFT→No change x3'"""
+    parts = []
+    previous, count = None, 0
+    for entry in entries:
+        if entry == previous:
+            count += 1
+            continue
+        if previous is not None:
+            parts.append(f"{previous[0]}→{previous[1]}" + (f" x{count}" if count > 1 else ""))
+        previous, count = entry, 1
+    if previous is not None:
+        parts.append(f"{previous[0]}→{previous[1]}" + (f" x{count}" if count > 1 else ""))
+    return ", ".join(parts)
+
+
+@dataclass(frozen=True)
+class PromptSection:
+    """
+    Sección del prompt dinámico
+
+    budget: tokens máximos del contenido (None = sin límite)
+    keep: 'head' conserva el principio al recortar, 'tail' el final (historial),
+          'drop' elimina la sección entera si no cabe (mapas, tablas)
+    label: prefijo fijo de la sección, fuera del presupuesto
+    """
+
+    name: str
+    budget: int = None
+    keep: str = 'head'
+    label: str = ""
+
+
+DEFAULT_SECTIONS = (
+    PromptSection('state', None),
+    PromptSection('frames', None),
+    PromptSection('map', 400, 'drop'),
+    PromptSection('sprites', 60, label="Nearby NPCs:\n"),
+    PromptSection('objective', 60, label="Objective: "),
+    PromptSection('waypoint', 60, label="Try to reach "),
+    PromptSection('history', 60, 'tail', label="Recent actions: "),
+    PromptSection('skills', 120, label="Tips:\n"),
+    PromptSection('keys', None),
+)
+
+
+def fit(text, budget, keep='head'):
+    """Recorta `text` a `budget` tokens estimados (por líneas, o por elementos si es una sola línea)"""
+    if budget is None or estimate_tokens(text) <= budget:
+        return text
+    if keep == 'drop':
+        return ""
+    separator = "\n" if "\n" in text else ", "
+    units = text.split(separator)
+    if len(units) > 1:
+        kept = []
+        ordered = units if keep == 'head' else reversed(units)
+        for unit in ordered:
+            if estimate_tokens(separator.join(kept + [unit])) > budget:
+                break
+            kept.append(unit)
+        if kept:
+            return separator.join(kept if keep == 'head' else reversed(kept))
+    limit = budget * CHARS_PER_TOKEN
+    return text[:limit] if keep == 'head' else text[-limit:]
+
+
+class PromptBuilder:
+    """
+    Ensambla el prompt dinámico sección a sección respetando el presupuesto de cada una
+
+    `static_prefix` no cambia nunca durante la ejecución; `build` solo concatena
+    las secciones variables en un orden fijo.
+    """
+
+    def __init__(self, sections=DEFAULT_SECTIONS, static_prefix=STATIC_PREFIX):
+        self.sections = tuple(sections)
+        self.static_prefix = static_prefix
+        self.static_tokens = estimate_tokens(static_prefix)
+        self.last_tokens = {}
+        self.last_truncated = ()
+
+    def build(self, parts):
+        """
+        Args:
+            parts: {nombre de sección: texto}; las secciones ausentes o vacías se omiten
+
+        Returns:
+            Texto del prompt dinámico
+        """
+        blocks = []
+        tokens = {}
+        truncated = []
+        for section in self.sections:
+            text = parts.get(section.name)
+            if not text:
+                continue
+            fitted = fit(text, section.budget, section.keep)
+            if fitted != text:
+                truncated.append(section.name)
+            if not fitted:
+                continue
+            blocks.append(section.label + fitted)
+            tokens[section.name] = estimate_tokens(fitted)
+        self.last_tokens = tokens
+        self.last_truncated = tuple(truncated)
+        return "\n".join(blocks)
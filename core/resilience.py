@@ -0,0 +1,133 @@
+"""
+Resilience - Circuit breaker y peticiones hedged para el LLM Planner
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from core.metrics import RollingHistogram
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico de tres estados
+
+    - closed: las peticiones pasan normalmente
+    - open: tras `failure_threshold` fallos seguidos se cortan las peticiones
+    - half_open: pasado `recovery_timeout` se deja pasar una petición de prueba
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow_request(self):
+        """True si se puede llamar a la API (incluye las pruebas en half_open)"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                print("   🔌 Circuit breaker HALF-OPEN: probing API")
+                return True
+            return False
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            print("   🔌 Circuit breaker CLOSED: API recovered")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"   🔌 Circuit breaker OPEN after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class HedgedCaller:
+    """
+    Ejecuta una llamada y lanza un duplicado si tarda más que el percentil observado
+
+    Se queda con la primera respuesta correcta. Hasta tener `min_samples`
+    latencias no hay hedging. `fn` recibe `cancel` (threading.Event): se activa
+    en la petición perdedora para que deje de leer y cierre su conexión.
+    """
+
+    def __init__(self, percentile=95, min_samples=20, min_delay=0.25, window=200, max_workers=4):
+        """
+        Args:
+            percentile: Percentil de latencia a partir del cual se duplica la petición
+            min_samples: Observaciones mínimas antes de activar el hedging
+            min_delay: Espera mínima (s) antes de lanzar el duplicado
+            window: Tamaño de la ventana de latencias
+            max_workers: Hilos del pool (2 por llamada como máximo)
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latencies = RollingHistogram(window)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def hedge_delay(self):
+        """Retraso antes del duplicado, o None si aún no hay datos suficientes"""
+        if len(self.latencies.values) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latencies.percentile(self.percentile))
+
+    def call(self, fn, *args):
+        """Llama a fn(*args, cancel=evento) con hedging; propaga la excepción si fallan todas"""
+        start = time.perf_counter()
+        delay = self.hedge_delay()
+
+        cancels = {}
+        primary = self._submit(fn, args, cancels)
+        if delay is None:
+            result = primary.result()
+            self.latencies.add(time.perf_counter() - start)
+            return result
+
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            result = primary.result()
+            self.latencies.add(time.perf_counter() - start)
+            return result
+
+        self.hedges_sent += 1
+        hedge = self._submit(fn, args, cancels)
+        pending = {primary, hedge}
+        error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedges_won += 1
+                    for loser in pending:
+                        cancels[loser].set()
+                    self.latencies.add(time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+
+        raise error
+
+    def _submit(self, fn, args, cancels):
+        cancel = threading.Event()
+        future = self.executor.submit(fn, *args, cancel=cancel)
+        cancels[future] = cancel
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,346 @@
+"""
+Run Store - Base de datos SQLite con todas las ejecuciones del agente
+Runs, steps, transiciones de objetivo, llamadas al LLM y eventos, con índices
+para las preguntas habituales ("p95 de steps del objetivo X por modelo",
+"qué mapas provocan más llamadas al LLM") sin tener que grepear logs
+
+Uso:
+    python -m core.run_store report --db runs.db
+    python -m core.run_store objectives --db runs.db --quantile 0.95
+    python -m core.run_store maps --db runs.db
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+
+from core.step_budget import quantile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL,
+    model TEXT,
+    observation_mode TEXT,
+    config TEXT,
+    steps INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running'
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step INTEGER NOT NULL,
+    objective_id TEXT,
+    map_id INTEGER,
+    x INTEGER,
+    y INTEGER,
+    action TEXT,
+    source TEXT,
+    frames INTEGER,
+    duration REAL,
+    t REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS objectives (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step INTEGER NOT NULL,
+    objective_id TEXT NOT NULL,
+    text TEXT,
+    outcome TEXT NOT NULL,
+    steps INTEGER,
+    model TEXT,
+    t REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS llm_calls (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step INTEGER,
+    objective_id TEXT,
+    map_id INTEGER,
+    model TEXT,
+    latency REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    prompt_tokens_estimated INTEGER,
+    completion_tokens_estimated INTEGER,
+    answer TEXT,
+    action TEXT,
+    error TEXT,
+    t REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step INTEGER,
+    name TEXT NOT NULL,
+    detail TEXT,
+    t REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_steps_run ON steps (run_id, step);
+CREATE INDEX IF NOT EXISTS idx_steps_map ON steps (map_id, source);
+CREATE INDEX IF NOT EXISTS idx_objectives_id ON objectives (objective_id, outcome);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_map ON llm_calls (map_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_run ON llm_calls (run_id, step);
+CREATE INDEX IF NOT EXISTS idx_events_name ON events (name, run_id);
+"""
+
+INSERTS = {
+    'steps': "INSERT INTO steps (run_id, step, objective_id, map_id, x, y, action, source, frames, duration, t) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    'objectives': "INSERT INTO objectives (run_id, step, objective_id, text, outcome, steps, model, t) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    'llm_calls': "INSERT INTO llm_calls (run_id, step, objective_id, map_id, model, latency, prompt_tokens, "
+                 "completion_tokens, prompt_tokens_estimated, completion_tokens_estimated, answer, action, "
+                 "error, t) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    'events': "INSERT INTO events (run_id, step, name, detail, t) VALUES (?, ?, ?, ?, ?)",
+}
+
+# Columnas añadidas después de crear el esquema: (tabla, columna, tipo)
+MIGRATIONS = (
+    ('llm_calls', 'prompt_tokens_estimated', 'INTEGER'),
+    ('llm_calls', 'completion_tokens_estimated', 'INTEGER'),
+)
+
+
+def connect(path):
+    """Conexión en modo WAL: el report puede leer mientras el agente escribe"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    return conn
+
+
+def _migrate(conn):
+    """Añade las columnas que le falten a una base de datos creada con un esquema anterior"""
+    with conn:
+        for table, column, kind in MIGRATIONS:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+
+class RunStore:
+    """
+    Escritor de una ejecución del agente
+
+    Las filas se acumulan en memoria y se escriben en una sola transacción cada
+    `batch_size` filas o `flush_interval` segundos, para no pagar un commit por step.
+    """
+
+    def __init__(self, path="runs.db", batch_size=200, flush_interval=5.0):
+        """
+        Args:
+            path: Base de datos SQLite
+            batch_size: Filas pendientes que fuerzan una escritura
+            flush_interval: Segundos máximos entre escrituras
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = connect(path)
+        self.run_id = None
+        self.step = 0
+        self._pending = {table: [] for table in INSERTS}
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def start_run(self, model=None, observation_mode=None, config=None):
+        """Registra una ejecución nueva y devuelve su id"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started, model, observation_mode, config) VALUES (?, ?, ?, ?)",
+                (time.time(), model, observation_mode, json.dumps(config or {}, default=str))
+            )
+        self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def begin_step(self, step):
+        """Step actual, para las filas que se registran desde el planner o el EventChecker"""
+        self.step = step
+
+    # --- Registro ---
+
+    def _add(self, table, row):
+        if self.run_id is None:
+            return
+        self._pending[table].append(row)
+        self._pending_rows += 1
+        if (self._pending_rows >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def record_step(self, step, objective_id, game_state, action, source, frames, duration):
+        self._add('steps', (
+            self.run_id, step, objective_id, game_state['map_id'], game_state['x'], game_state['y'],
+            action, source, frames, duration, time.time()
+        ))
+
+    def record_objective(self, objective_id, text, outcome, steps, model=None):
+        """Transición de objetivo: outcome 'completed', 'timeout' o 'skipped'"""
+        self._add('objectives', (
+            self.run_id, self.step, objective_id, text, outcome, steps, model, time.time()
+        ))
+
+    def record_llm_call(self, objective_id, map_id, model, latency, prompt_tokens=None,
+                        completion_tokens=None, answer=None, action=None, error=None, estimated=False):
+        """
+        estimated: los tokens son una estimación local (stream cortado antes del uso):
+        se guardan en las columnas *_estimated y los del proveedor quedan a NULL
+        """
+        reported = (None, None) if estimated else (prompt_tokens, completion_tokens)
+        guessed = (prompt_tokens, completion_tokens) if estimated else (None, None)
+        self._add('llm_calls', (
+            self.run_id, self.step, objective_id, map_id, model, latency,
+            *reported, *guessed, answer, action, error, time.time()
+        ))
+
+    def record_event(self, name, detail=None):
+        self._add('events', (self.run_id, self.step, name, detail, time.time()))
+
+    def flush(self):
+        """Escribe las filas pendientes en una transacción"""
+        self._last_flush = time.monotonic()
+        if not self._pending_rows:
+            return
+        try:
+            with self.conn:
+                for table, rows in self._pending.items():
+                    if rows:
+                        self.conn.executemany(INSERTS[table], rows)
+        except sqlite3.Error as e:
+            print(f"    ERROR: writing run store: {e}")
+        for rows in self._pending.values():
+            rows.clear()
+        self._pending_rows = 0
+
+    def end_run(self, status, steps):
+        """Cierra la ejecución con su estado final ('completed', 'interrupted', 'error'...)"""
+        self.flush()
+        if self.run_id is None:
+            return
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET ended = ?, status = ?, steps = ? WHERE id = ?",
+                (time.time(), status, steps, self.run_id)
+            )
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+# --- Consultas ---
+
+def objective_step_quantiles(conn, q=0.95, outcome='completed'):
+    """
+    Cuantil de steps por objetivo y modelo
+
+    Returns:
+        Lista de (objective_id, model, muestras, cuantil) ordenada por objetivo
+    """
+    rows = conn.execute(
+        """
+        SELECT o.objective_id, COALESCE(o.model, r.model), o.steps
+        FROM objectives o JOIN runs r ON r.id = o.run_id
+        WHERE o.outcome = ? AND o.steps IS NOT NULL
+        """,
+        (outcome,)
+    ).fetchall()
+    groups = {}
+    for objective_id, model, steps in rows:
+        groups.setdefault((objective_id, model), []).append(steps)
+    return [
+        (objective_id, model, len(samples), quantile(samples, q))
+        for (objective_id, model), samples in sorted(groups.items(), key=lambda kv: (kv[0][0], str(kv[0][1])))
+    ]
+
+
+def llm_calls_by_map(conn, limit=20):
+    """
+    Mapas con más llamadas al LLM
+
+    Returns:
+        Lista de (map_id, llamadas, latencia media, tokens de prompt, tokens de prompt estimados)
+    """
+    return conn.execute(
+        """
+        SELECT map_id, COUNT(*), AVG(latency), SUM(COALESCE(prompt_tokens, 0)),
+               SUM(COALESCE(prompt_tokens_estimated, 0))
+        FROM llm_calls
+        GROUP BY map_id
+        ORDER BY COUNT(*) DESC
+        LIMIT ?
+        """,
+        (limit,)
+    ).fetchall()
+
+
+def action_sources(conn, run_id=None):
+    """Steps por origen de la decisión (LLM, MACRO, ESCAPE...)"""
+    if run_id is None:
+        return conn.execute(
+            "SELECT source, COUNT(*) FROM steps GROUP BY source ORDER BY COUNT(*) DESC"
+        ).fetchall()
+    return conn.execute(
+        "SELECT source, COUNT(*) FROM steps WHERE run_id = ? GROUP BY source ORDER BY COUNT(*) DESC",
+        (run_id,)
+    ).fetchall()
+
+
+def run_summaries(conn, limit=10):
+    """Últimas ejecuciones: (id, inicio, estado, steps, modelo, objetivos completados, llamadas LLM)"""
+    return conn.execute(
+        """
+        SELECT r.id, r.started, r.status, r.steps, r.model,
+               (SELECT COUNT(*) FROM objectives o WHERE o.run_id = r.id AND o.outcome = 'completed'),
+               (SELECT COUNT(*) FROM llm_calls c WHERE c.run_id = r.id)
+        FROM runs r
+        ORDER BY r.id DESC
+        LIMIT ?
+        """,
+        (limit,)
+    ).fetchall()
+
+
+def _report(conn, args):
+    print("RUNS")
+    for run_id, started, status, steps, model, completed, calls in run_summaries(conn, args.limit):
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(started))
+        print(f"  #{run_id:<4} {when}  {status:11s} {steps:6d} steps  {completed:3d} objectives  "
+              f"{calls:6d} LLM calls  {model}")
+    print("\nACTION SOURCES")
+    for source, count in action_sources(conn):
+        print(f"  {source or '-':12s} {count:8d}")
+    _maps(conn, args)
+
+
+def _objectives(conn, args):
+    print(f"STEPS PER OBJECTIVE (p{int(args.quantile * 100)})")
+    for objective_id, model, samples, value in objective_step_quantiles(conn, args.quantile):
+        print(f"  {objective_id:40s} {model or '-':45s} n={samples:<4d} {value:8.1f}")
+
+
+def _maps(conn, args):
+    print("\nLLM CALLS PER MAP")
+    for map_id, calls, latency, tokens, estimated in llm_calls_by_map(conn, args.limit):
+        print(f"  map {map_id if map_id is not None else '-':>4}  {calls:7d} calls  "
+              f"{(latency or 0) * 1000:7.0f} ms avg  {tokens:9d} prompt tokens  (+{estimated} estimated)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Informes sobre la base de datos de ejecuciones")
+    parser.add_argument("command", choices=("report", "objectives", "maps"), nargs="?", default="report")
+    parser.add_argument("--db", default="runs.db")
+    parser.add_argument("--quantile", type=float, default=0.95)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        {'report': _report, 'objectives': _objectives, 'maps': _maps}[args.command](conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
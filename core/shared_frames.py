@@ -0,0 +1,297 @@
+"""
+Shared Frames - PyBoy en su propio proceso con un ring buffer en memoria compartida
+Frames y WRAM se publican en `multiprocessing.shared_memory`; las acciones van por una cola
+"""
+
+import io
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+FRAME_SHAPE = (144, 160, 4)             # RGBA, igual que PyBoy screen.ndarray
+WRAM_START = 0xC000
+WRAM_END = 0xE000
+WRAM_SIZE = WRAM_END - WRAM_START
+
+# Cabecera global: [último seq publicado]. Cabecera por slot: [seq, step, frames]
+_GLOBAL_HEADER = 8
+_SLOT_HEADER = 24
+_FRAME_BYTES = int(np.prod(FRAME_SHAPE))
+_SLOT_BYTES = _SLOT_HEADER + _FRAME_BYTES + WRAM_SIZE
+
+
+class FrameRing:
+    """
+    Ring buffer de frames + snapshots de WRAM en memoria compartida
+
+    Un único productor (el proceso del emulador) y cualquier número de
+    consumidores. Cada slot usa un seqlock: el seq es impar mientras se
+    escribe, así un lector puede comprobar con `is_valid` que el slot que ha
+    leído sin copiar no se sobrescribió mientras lo usaba.
+    """
+
+    def __init__(self, shm, slots, owner):
+        self.shm = shm
+        self.slots = slots
+        self.owner = owner
+
+        buf = shm.buf
+        self._latest = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=0)
+        self._headers = []
+        self._frames = []
+        self._wram = []
+        for i in range(slots):
+            base = _GLOBAL_HEADER + i * _SLOT_BYTES
+            self._headers.append(np.ndarray((3,), dtype=np.uint64, buffer=buf, offset=base))
+            self._frames.append(np.ndarray(FRAME_SHAPE, dtype=np.uint8, buffer=buf, offset=base + _SLOT_HEADER))
+            self._wram.append(np.ndarray(
+                (WRAM_SIZE,), dtype=np.uint8, buffer=buf, offset=base + _SLOT_HEADER + _FRAME_BYTES
+            ))
+
+    @classmethod
+    def create(cls, slots=8, name=None):
+        size = _GLOBAL_HEADER + slots * _SLOT_BYTES
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        ring = cls(shm, slots, owner=True)
+        ring._latest[0] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots=8):
+        return cls(shared_memory.SharedMemory(name=name), slots, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, frame, wram, step=0, frames=0):
+        """Escribe un frame + WRAM en el siguiente slot (solo el productor)"""
+        seq = int(self._latest[0]) + 1
+        slot = seq % self.slots
+        header = self._headers[slot]
+
+        header[0] = 2 * seq - 1         # impar: escribiendo
+        self._frames[slot][...] = frame
+        self._wram[slot][...] = wram
+        header[1] = step
+        header[2] = frames
+        header[0] = 2 * seq             # par: listo
+        self._latest[0] = seq
+        return seq
+
+    def latest(self):
+        """
+        Último slot publicado, sin copias
+
+        Returns:
+            (seq, frame_view, wram_view) o None si aún no hay nada publicado
+        """
+        seq = int(self._latest[0])
+        if seq == 0:
+            return None
+        slot = seq % self.slots
+        return seq, self._frames[slot], self._wram[slot]
+
+    def is_valid(self, seq):
+        """True si el slot de `seq` no se ha reescrito desde que se leyó"""
+        return int(self._headers[seq % self.slots][0]) == 2 * seq
+
+    def close(self):
+        self._latest = self._headers = self._frames = self._wram = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _emulator_main(rom_path, ring_name, slots, commands, replies, headless, scheduler_kwargs):
+    """Proceso del emulador: ejecuta comandos y publica cada resultado en el ring"""
+    from pyboy import PyBoy
+
+    from core.input_scheduler import InputScheduler, skip_intro
+    from core.watchpoints import MemoryWatcher
+
+    emu = PyBoy(rom_path, window="null" if headless else "SDL2")
+    emu.set_emulation_speed(0)
+    scheduler = InputScheduler(emu, **scheduler_kwargs)
+    watcher = None
+    ring = FrameRing.attach(ring_name, slots)
+    step = 0
+
+    def publish(frames=0):
+        wram = np.asarray(emu.memory[WRAM_START:WRAM_END], dtype=np.uint8)
+        return ring.publish(emu.screen.ndarray, wram, step, frames)
+
+    publish()
+    try:
+        while True:
+            command, arg = commands.get()
+            if command == 'step':
+                frames = scheduler.execute(arg)
+                step += 1
+                dirty = set()
+                if watcher:
+                    watcher.poll(emu)
+                    dirty = watcher.consume()
+                replies.put((publish(frames), frames, dirty))
+            elif command == 'skip_intro':
+                skip_intro(emu)
+                replies.put(publish())
+            elif command == 'watch':
+                watcher = MemoryWatcher(arg)
+                watcher.poll(emu)
+                replies.put(None)
+            elif command == 'collision':
+                replies.put(np.asarray(emu.game_wrapper.game_area_collision(), dtype=np.uint8))
+            elif command == 'save_state':
+                buffer = io.BytesIO()
+                emu.save_state(buffer)
+                replies.put(buffer.getvalue())
+            elif command == 'load_state':
+                emu.load_state(io.BytesIO(arg))
+                if watcher:
+                    watcher.poll(emu)
+                    watcher.mark_all_dirty()
+                replies.put(publish())
+            elif command == 'stop':
+                break
+    finally:
+        emu.stop(save=False)
+        ring.close()
+        replies.put(None)
+
+
+class _RemoteMemory:
+    """Lectura de WRAM desde el último snapshot del ring (misma API que emu.memory)"""
+
+    def __init__(self, remote):
+        self.remote = remote
+
+    def __getitem__(self, addr):
+        wram = self.remote._wram
+        if isinstance(addr, slice):
+            if addr.start < WRAM_START or addr.stop > WRAM_END:
+                raise IndexError(f"Address range {addr.start:#x}-{addr.stop:#x} outside WRAM snapshot")
+            # Lista de int como emu.memory de PyBoy (los np.uint8 no se serializan a JSON)
+            return wram[addr.start - WRAM_START:addr.stop - WRAM_START:addr.step].tolist()
+        if not WRAM_START <= addr < WRAM_END:
+            raise IndexError(f"Address {addr:#x} outside WRAM snapshot")
+        return int(wram[addr - WRAM_START])
+
+
+class _RemoteScreen:
+    def __init__(self, remote):
+        self.remote = remote
+
+    @property
+    def ndarray(self):
+        return self.remote._frame
+
+    @property
+    def image(self):
+        # Vista PIL sobre la memoria compartida (sin copia)
+        return Image.frombuffer('RGBA', (FRAME_SHAPE[1], FRAME_SHAPE[0]), self.remote._frame, 'raw', 'RGBA', 0, 1)
+
+
+class _RemoteGameWrapper:
+    """game_wrapper remoto: solo game_area_collision(), cacheado por frame publicado"""
+
+    def __init__(self, remote):
+        self.remote = remote
+        self._seq = None
+        self._collision = None
+
+    def game_area_collision(self):
+        if self._seq != self.remote._seq:
+            self._collision = self.remote._call('collision')
+            self._seq = self.remote._seq
+        return self._collision
+
+
+class RemoteEmulator:
+    """
+    Proxy del lado del planner para un PyBoy que corre en otro proceso
+
+    Expone el subconjunto de la API usado por el runner: `memory` (WRAM),
+    `screen.image` / `screen.ndarray`, `game_wrapper.game_area_collision()`
+    (máscara de acciones y mapa ASCII), `save_state`, `load_state`, `stop`, y
+    `execute(action)` como sustituto del InputScheduler.
+    """
+
+    def __init__(self, rom_path, headless=True, slots=8, watcher=None, **scheduler_kwargs):
+        """
+        Args:
+            rom_path: ROM de Pokémon Red
+            headless: Sin ventana en el proceso del emulador
+            slots: Slots del ring buffer
+            watcher: MemoryWatcher local al que se añaden las regiones sucias remotas
+            **scheduler_kwargs: Parámetros del InputScheduler remoto
+        """
+        ctx = mp.get_context("spawn")
+        self.ring = FrameRing.create(slots)
+        self.commands = ctx.Queue()
+        self.replies = ctx.Queue()
+        self.watcher = watcher
+        self.last_frames = 0
+        self.memory = _RemoteMemory(self)
+        self.screen = _RemoteScreen(self)
+        self.game_wrapper = _RemoteGameWrapper(self)
+        self._seq = 0
+        self._frame = None
+        self._wram = None
+
+        self.process = ctx.Process(
+            target=_emulator_main,
+            args=(rom_path, self.ring.name, slots, self.commands, self.replies, headless, scheduler_kwargs),
+            name="pyboy-emulator",
+            daemon=True,
+        )
+        self.process.start()
+        self._wait_for_first_frame()
+
+    def _wait_for_first_frame(self):
+        import time
+        while self.ring.latest() is None:
+            if not self.process.is_alive():
+                raise RuntimeError("Emulator process died during startup")
+            time.sleep(0.01)
+        self._refresh()
+
+    def _refresh(self):
+        self._seq, self._frame, self._wram = self.ring.latest()
+
+    def _call(self, command, arg=None):
+        self.commands.put((command, arg))
+        return self.replies.get()
+
+    def execute(self, action):
+        """Ejecuta la acción en el proceso del emulador; devuelve los frames usados"""
+        _, frames, dirty = self._call('step', action)
+        self._refresh()
+        if self.watcher is not None:
+            self.watcher.dirty.update(dirty)
+        self.last_frames = frames
+        return frames
+
+    def watch(self, regions):
+        """Activa watchpoints (sondeo por step) en el proceso del emulador"""
+        self._call('watch', regions)
+
+    def skip_intro(self):
+        self._call('skip_intro')
+        self._refresh()
+
+    def save_state(self, file_like):
+        file_like.write(self._call('save_state'))
+
+    def load_state(self, file_like):
+        self._call('load_state', file_like.read())
+        self._refresh()
+
+    def stop(self, save=False):
+        if self.process.is_alive():
+            self._call('stop')
+            self.process.join(timeout=5)
+        self._frame = self._wram = None
+        self.ring.close()
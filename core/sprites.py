@@ -0,0 +1,78 @@
+"""
+Sprites - Lectura de las tablas wSpriteStateData de pokered
+Posición, orientación y movimiento de NPCs, entrenadores y objetos en una sola lectura
+"""
+
+import numpy as np
+
+SPRITE_STATE_DATA_1 = 0xC100    # 16 entradas de 16 bytes
+SPRITE_STATE_DATA_2 = 0xC200
+SPRITE_STATE_END = 0xC300
+SPRITE_COUNT = 16
+SPRITE_ENTRY_SIZE = 16
+
+# Offsets dentro de cada entrada
+PICTURE_ID = 0x0                # Data1: 0 = slot vacío
+MOVEMENT_STATUS = 0x1           # Data1: 0 sin iniciar, 1 listo, 2 esperando, 3 moviéndose
+IMAGE_INDEX = 0x2               # Data1: 0xFF = no visible (fuera de pantalla u oculto)
+FACING = 0x9                    # Data1: 0 abajo, 4 arriba, 8 izquierda, 0xC derecha
+MAP_Y = 0x4                     # Data2: coordenada Y del mapa + 4
+MAP_X = 0x5                     # Data2: coordenada X del mapa + 4
+COORD_OFFSET = 4
+MOVING_STATUS = 3
+
+FACINGS = ("DOWN", "UP", "LEFT", "RIGHT")
+
+# Columnas del array devuelto por read_sprites
+SPRITE_FIELDS = ('sprite_id', 'x', 'y', 'facing', 'moving')
+
+
+def read_sprites(memory, include_player=False, visible_only=True):
+    """
+    Decodifica las tablas de sprites con una única lectura de 0xC100-0xC2FF
+
+    Args:
+        memory: Memoria del emulador (emu.memory)
+        include_player: Incluir el sprite 0 (el jugador)
+        visible_only: Omitir sprites fuera de pantalla u ocultos
+
+    Returns:
+        np.ndarray int16 de forma (n, 5) con columnas SPRITE_FIELDS. 'x' e 'y'
+        siguen la convención de read_game_state ('x' = Y del mapa, 'y' = X) y
+        'facing' es un índice de FACINGS.
+    """
+    raw = np.frombuffer(bytes(memory[SPRITE_STATE_DATA_1:SPRITE_STATE_END]), dtype=np.uint8)
+    table = raw.reshape(2, SPRITE_COUNT, SPRITE_ENTRY_SIZE).astype(np.int16)
+    data1, data2 = table[0], table[1]
+
+    mask = data1[:, PICTURE_ID] != 0
+    if not include_player:
+        mask[0] = False
+    if visible_only:
+        mask &= data1[:, IMAGE_INDEX] != 0xFF
+
+    sprites = np.empty((int(mask.sum()), len(SPRITE_FIELDS)), dtype=np.int16)
+    sprites[:, 0] = data1[mask, PICTURE_ID]
+    sprites[:, 1] = data2[mask, MAP_Y] - COORD_OFFSET
+    sprites[:, 2] = data2[mask, MAP_X] - COORD_OFFSET
+    sprites[:, 3] = (data1[mask, FACING] >> 2) & 0x3
+    sprites[:, 4] = data1[mask, MOVEMENT_STATUS] == MOVING_STATUS
+    return sprites
+
+
+def sprite_tiles(sprites):
+    """Casillas (x, y) ocupadas por sprites, para colisiones"""
+    return {(int(x), int(y)) for x, y in sprites[:, 1:3]}
+
+
+def describe_sprites(sprites, game_state, limit=5):
+    """Texto corto para el prompt con los sprites más cercanos al jugador"""
+    if len(sprites) == 0:
+        return "No NPCs nearby"
+    distances = np.abs(sprites[:, 1] - game_state['x']) + np.abs(sprites[:, 2] - game_state['y'])
+    lines = []
+    for index in np.argsort(distances)[:limit]:
+        sprite_id, x, y, facing, moving = (int(v) for v in sprites[index])
+        state = "moving" if moving else f"facing {FACINGS[facing]}"
+        lines.append(f"NPC #{sprite_id} at ({x}, {y}), {state}")
+    return "\n".join(lines)
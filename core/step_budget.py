@@ -0,0 +1,142 @@
+"""
+Step Budget - Presupuesto de steps por objetivo aprendido del historial
+Sustituye el tope fijo de 500 steps y dispara recuperaciones antes del timeout
+"""
+
+import json
+import os
+
+DEFAULT_RECOVERY = (
+    (0.6, 'reload_checkpoint'),
+    (0.8, 'escalate_model'),
+)
+
+
+def quantile(values, q):
+    """Cuantil con interpolación lineal (valores sin ordenar)"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    pos = (len(ordered) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+class StepBudget:
+    """
+    Historial de steps-hasta-completar por objetivo, persistido entre ejecuciones
+
+    budget = cuantil `quantile` del historial * `margin`, acotado entre
+    `min_budget` y `max_budget`. Sin suficientes muestras se usa `default_budget`.
+    Los timeouts son muestras censuradas: se guarda el presupuesto que se agotó
+    (cota inferior de lo que necesita el objetivo) y cada timeout seguido desde
+    la última vez que se completó duplica el presupuesto, para que un objetivo
+    más largo que `default_budget` no se corte en todas las ejecuciones.
+    Las recuperaciones se disparan una sola vez por objetivo al cruzar cada
+    fracción del presupuesto.
+    """
+
+    def __init__(self, path=None, quantile=0.9, margin=1.5, min_samples=3, default_budget=500,
+                 min_budget=30, max_budget=2000, history=50, recovery=DEFAULT_RECOVERY):
+        """
+        Args:
+            path: Fichero JSON con el historial (None = solo en memoria)
+            quantile: Cuantil del historial usado como base
+            margin: Multiplicador sobre el cuantil
+            min_samples: Muestras necesarias para dejar de usar default_budget
+            default_budget: Presupuesto sin historial (el antiguo max_steps_per_objective)
+            min_budget / max_budget: Límites del presupuesto
+            history: Muestras que se conservan por objetivo
+            recovery: Pares (fracción del presupuesto, acción) ordenados
+        """
+        self.path = path
+        self.quantile = quantile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.default_budget = default_budget
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self.history = history
+        self.recovery = tuple(recovery)
+
+        self.samples = {}       # objective_id -> [steps, ...]
+        self.timeouts = {}      # objective_id -> veces que agotó el presupuesto
+        self.streaks = {}       # objective_id -> timeouts seguidos desde la última vez que se completó
+        self._fired = set()     # (objective_id, acción) disparadas en el intento actual
+        self.dirty = False
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.load_dict(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"    ERROR: loading step budgets: {e}")
+
+    def budget(self, objective_id):
+        samples = self.samples.get(objective_id, ())
+        if len(samples) < self.min_samples:
+            value = self.default_budget
+        else:
+            value = quantile(samples, self.quantile) * self.margin
+        value *= 2 ** self.streaks.get(objective_id, 0)
+        return int(min(self.max_budget, max(self.min_budget, value)))
+
+    def _add_sample(self, objective_id, steps):
+        samples = self.samples.setdefault(objective_id, [])
+        samples.append(int(steps))
+        del samples[:-self.history]
+
+    def record(self, objective_id, steps):
+        """Registra un objetivo completado en `steps` steps"""
+        self._add_sample(objective_id, steps)
+        self.streaks.pop(objective_id, None)
+        self._reset_attempt(objective_id)
+        self.dirty = True
+
+    def record_timeout(self, objective_id):
+        """Registra un timeout: el presupuesto agotado entra como muestra censurada"""
+        self._add_sample(objective_id, self.budget(objective_id))
+        self.timeouts[objective_id] = self.timeouts.get(objective_id, 0) + 1
+        self.streaks[objective_id] = self.streaks.get(objective_id, 0) + 1
+        self._reset_attempt(objective_id)
+        self.dirty = True
+
+    def _reset_attempt(self, objective_id):
+        self._fired = {f for f in self._fired if f[0] != objective_id}
+
+    def check(self, objective_id, steps):
+        """
+        Returns:
+            'timeout' si se agotó el presupuesto, el nombre de una recuperación
+            si se acaba de cruzar su umbral, o None
+        """
+        budget = self.budget(objective_id)
+        if steps >= budget:
+            return 'timeout'
+        for fraction, action in self.recovery:
+            if steps >= fraction * budget and (objective_id, action) not in self._fired:
+                self._fired.add((objective_id, action))
+                return action
+        return None
+
+    def to_dict(self):
+        return {'samples': self.samples, 'timeouts': self.timeouts, 'streaks': self.streaks}
+
+    def load_dict(self, data):
+        self.samples = {k: list(v) for k, v in data.get('samples', {}).items()}
+        self.timeouts = dict(data.get('timeouts', {}))
+        self.streaks = dict(data.get('streaks', {}))
+
+    def save(self):
+        """Persiste el historial si hubo cambios (escritura atómica)"""
+        if not self.path or not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"    ERROR: saving step budgets: {e}")
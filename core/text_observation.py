@@ -0,0 +1,145 @@
+"""
+Text Observation - Mapa ASCII de la pantalla centrado en el jugador
+Alternativa barata a enviar la captura: colisiones, sprites, warps y el waypoint objetivo
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from core.world_graph import MAX_WARPS, NUM_WARPS_ADDR, WARP_ENTRIES_ADDR, WARP_ENTRY_SIZE
+
+# La pantalla son 9x10 bloques de 16x16 px; el jugador siempre ocupa el bloque (4, 4)
+GRID_ROWS = 9
+GRID_COLS = 10
+PLAYER_CELL = (4, 4)
+
+SHADOW_OAM_ADDR = 0xC300        # wShadowOAM: 40 entradas (y, x, tile, atributos)
+OAM_ENTRIES = 40
+
+LEGEND = {
+    '@': "you",
+    '.': "walkable",
+    '#': "blocked",
+    'N': "NPC / object",
+    'W': "warp (door, stairs, exit)",
+    '*': "target waypoint",
+}
+
+
+@dataclass
+class TileView:
+    """Lo que se ve en pantalla, en celdas de la rejilla 9x10 (fila, columna)"""
+
+    walkable: np.ndarray                      # (9, 10) bool
+    sprites: set = field(default_factory=set)
+    warps: set = field(default_factory=set)
+    origin: tuple = (0, 0)                    # Coordenadas RAM (Y, X) de la celda (0, 0)
+
+
+def read_screen_sprites(memory):
+    """Celdas ocupadas por sprites según la OAM sombra (una sola lectura)"""
+    oam = memory[SHADOW_OAM_ADDR:SHADOW_OAM_ADDR + OAM_ENTRIES * 4]
+    cells = set()
+    for i in range(OAM_ENTRIES):
+        y, x = oam[i * 4] - 16, oam[i * 4 + 1] - 8
+        if not (0 <= x < 160 and -8 <= y < 144):
+            continue
+        # Los sprites del overworld se dibujan 4 px por encima de su bloque
+        cell = ((y + 4) // 16, x // 16)
+        if cell != PLAYER_CELL and 0 <= cell[0] < GRID_ROWS and 0 <= cell[1] < GRID_COLS:
+            cells.add(cell)
+    return cells
+
+
+def read_screen_warps(memory, origin):
+    """Celdas de la pantalla con un warp del mapa actual"""
+    count = memory[NUM_WARPS_ADDR]
+    if count > MAX_WARPS:
+        return set()
+    raw = memory[WARP_ENTRIES_ADDR:WARP_ENTRIES_ADDR + count * WARP_ENTRY_SIZE]
+    cells = set()
+    for i in range(count):
+        warp_y, warp_x = raw[i * WARP_ENTRY_SIZE], raw[i * WARP_ENTRY_SIZE + 1]
+        row, col = warp_y - origin[0], warp_x - origin[1]
+        if 0 <= row < GRID_ROWS and 0 <= col < GRID_COLS:
+            cells.add((row, col))
+    return cells
+
+
+def read_walkable_blocks(wrapper):
+    """
+    Rejilla 9x10 de bloques transitables
+
+    game_area_collision() de PyBoy 2.x devuelve 18x20 tiles de 8 px con cada bloque
+    de 16 px repetido 2x2; se toma un tile por bloque.
+    """
+    tiles = np.asarray(wrapper.game_area_collision(), dtype=bool)
+    if tiles.shape != (GRID_ROWS * 2, GRID_COLS * 2):
+        raise ValueError(f"Unexpected collision grid shape: {tiles.shape}")
+    return tiles[::2, ::2]
+
+
+def capture_tile_view(emu, game_state):
+    """
+    Lee colisiones (game wrapper de PyBoy), sprites (OAM) y warps (RAM)
+
+    game_state sigue la convención de read_game_state: 'x' es la Y de la RAM
+    (filas de la pantalla) e 'y' la X (columnas).
+    """
+    walkable = read_walkable_blocks(emu.game_wrapper)
+    origin = (game_state['x'] - PLAYER_CELL[0], game_state['y'] - PLAYER_CELL[1])
+    return TileView(
+        walkable=walkable,
+        sprites=read_screen_sprites(emu.memory),
+        warps=read_screen_warps(emu.memory, origin),
+        origin=origin,
+    )
+
+
+def _target_cell(view, target):
+    """Celda del waypoint en la rejilla (puede caer fuera de la pantalla)"""
+    return (target['x'] - view.origin[0], target['y'] - view.origin[1])
+
+
+def render_text_map(view, target=None, legend=True):
+    """
+    Convierte la vista en texto para el prompt
+
+    Args:
+        view: TileView de capture_tile_view
+        target: Waypoint {'map', 'x', 'y'} a marcar, o None
+        legend: Añadir la leyenda de símbolos
+
+    Returns:
+        String con la rejilla y, si el objetivo está fuera de pantalla, su dirección
+    """
+    rows = [['.' if view.walkable[r, c] else '#' for c in range(GRID_COLS)] for r in range(GRID_ROWS)]
+    for r, c in view.warps:
+        rows[r][c] = 'W'
+    for r, c in view.sprites:
+        rows[r][c] = 'N'
+
+    target_note = None
+    if target is not None:
+        tr, tc = _target_cell(view, target)
+        if 0 <= tr < GRID_ROWS and 0 <= tc < GRID_COLS:
+            rows[tr][tc] = '*'
+        else:
+            vertical = tr - PLAYER_CELL[0]
+            horizontal = tc - PLAYER_CELL[1]
+            parts = []
+            if vertical:
+                parts.append(f"{abs(vertical)} {'DOWN' if vertical > 0 else 'UP'}")
+            if horizontal:
+                parts.append(f"{abs(horizontal)} {'RIGHT' if horizontal > 0 else 'LEFT'}")
+            target_note = f"Target off-screen: {', '.join(parts)}"
+    rows[PLAYER_CELL[0]][PLAYER_CELL[1]] = '@'
+
+    lines = ["MAP (top = UP, left = LEFT):"]
+    lines.extend(' '.join(row) for row in rows)
+    if target_note:
+        lines.append(target_note)
+    if legend:
+        lines.append("Legend: " + ", ".join(f"{k}={v}" for k, v in LEGEND.items()))
+    return "\n".join(lines)
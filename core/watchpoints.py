@@ -0,0 +1,86 @@
+"""
+Watchpoints - Notificaciones de cambios en regiones de RAM
+El loop principal solo recalcula estado y objetivos cuando sus entradas cambian
+"""
+
+# Regiones que alimentan read_game_state (inicio, fin) [fin exclusivo]
+STATE_REGIONS = {
+    'map': (0xD35E, 0xD35F),
+    'coords': (0xD361, 0xD363),
+    'badges': (0xD356, 0xD357),
+    'battle': (0xD057, 0xD058),
+    'money': (0xD347, 0xD34A),
+    # Solo party_count y el byte de nivel de cada slot (lo único que lee read_game_state):
+    # HP, PP y experiencia cambian en cada batalla sin afectar al estado
+    'party': [(0xD163, 0xD164)] + [(0xD18C + i * 44, 0xD18D + i * 44) for i in range(6)],
+}
+
+# Regiones de las que depende EventChecker.check_objective_complete
+OBJECTIVE_REGION_NAMES = ('events', 'map', 'badges', 'money', 'party')
+
+
+def merge_addresses(addresses, max_gap=16):
+    """Agrupa direcciones sueltas en rangos contiguos [inicio, fin)"""
+    ranges = []
+    for addr in sorted(set(addresses)):
+        if ranges and addr - ranges[-1][1] <= max_gap:
+            ranges[-1][1] = addr + 1
+        else:
+            ranges.append([addr, addr + 1])
+    return [tuple(r) for r in ranges]
+
+
+class MemoryWatcher:
+    """
+    Vigila regiones de memoria y acumula qué regiones se han ensuciado
+
+    PyBoy no expone watchpoints de escritura, así que cada región se compara
+    con su copia anterior una vez por step (`poll`, tras ejecutar la acción).
+    Sondear por frame costaría más que la lectura que se ahorra, y un flag que
+    cambia y vuelve a su valor entre dos steps tampoco serviría de nada: los
+    checks leen la memoria actual.
+    """
+
+    def __init__(self, regions=None):
+        """
+        Args:
+            regions: Dict nombre -> (inicio, fin) o lista de rangos [(inicio, fin), ...]
+        """
+        self.regions = {}
+        self.snapshots = {}
+        self.dirty = set()
+        for name, spec in (regions or {}).items():
+            self.add_region(name, spec)
+
+    def add_region(self, name, spec):
+        ranges = [spec] if isinstance(spec[0], int) else list(spec)
+        self.regions[name] = ranges
+        self.snapshots[name] = None
+        self.dirty.add(name)
+
+    def poll(self, emu):
+        """Compara cada región con su último valor (llamar una vez por step)"""
+        mem = emu.memory
+        for name, ranges in self.regions.items():
+            current = tuple(bytes(mem[start:end]) for start, end in ranges)
+            if current != self.snapshots[name]:
+                self.snapshots[name] = current
+                self.dirty.add(name)
+
+    def is_dirty(self, names):
+        return not self.dirty.isdisjoint(names)
+
+    @staticmethod
+    def is_dirty_set(dirty, names):
+        """Como is_dirty, pero sobre un conjunto ya devuelto por consume()"""
+        return not dirty.isdisjoint(names)
+
+    def consume(self):
+        """Devuelve las regiones sucias desde la última llamada y las limpia"""
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def mark_all_dirty(self):
+        """Tras cargar un save state todo puede haber cambiado"""
+        self.dirty.update(self.regions)
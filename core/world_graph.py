@@ -0,0 +1,234 @@
+"""
+World Graph - Grafo de transiciones entre mapas aprendido de los warps observados
+Permite calcular por qué salida del mapa actual hay que ir para llegar a otro mapa
+"""
+
+import heapq
+import json
+import os
+
+# Tabla de warps del mapa cargado (pokered: wNumberOfWarps / wWarpEntries)
+NUM_WARPS_ADDR = 0xD3AE
+WARP_ENTRIES_ADDR = 0xD3AF
+WARP_ENTRY_SIZE = 4         # y, x, warp destino, mapa destino
+MAX_WARPS = 32
+LAST_MAP_ADDR = 0xD365      # Destino 0xFF = "mapa anterior"
+LAST_MAP_MARKER = 0xFF
+
+# Las salidas vistas en partida valen más que las leídas de RAM (sin verificar)
+OBSERVED_WEIGHT = 1.0
+RAM_WEIGHT = 1.5
+
+
+def _matches(entry, tile, dst_map):
+    """
+    True si `entry` lleva a `dst_map` desde `tile` o una casilla adyacente
+
+    La tabla de warps guarda la casilla del warp, pero la salida observada se
+    registra en la casilla desde la que se pulsó la acción: en una puerta es la
+    de al lado.
+    """
+    return entry['dst_map'] == dst_map and abs(entry['x'] - tile['x']) + abs(entry['y'] - tile['y']) <= 1
+
+
+class WorldGraph:
+    """
+    Grafo dirigido mapa -> mapa con las casillas de salida como aristas
+
+    Cada salida guarda casilla de origen, acción que la disparó, casilla de
+    destino (si se ha visto) y cuántas veces se ha observado. Las coordenadas
+    siguen la convención de read_game_state ('x' = 0xD361, 'y' = 0xD362).
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: Fichero JSON donde persistir el grafo (None = solo en memoria)
+        """
+        self.path = path
+        # src_map -> {clave_salida: {...}}
+        self.exits = {}
+        self.dirty = False
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.load_dict(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"    ERROR: loading world graph: {e}")
+
+    @staticmethod
+    def _exit_key(x, y, action):
+        return f"{x},{y},{action or '-'}"
+
+    def record_transition(self, before, action, after):
+        """
+        Registra un cambio de mapa observado
+
+        Args:
+            before: Estado antes de la acción
+            action: Botón que provocó el cambio
+            after: Estado después de la acción
+
+        Returns:
+            True si es una salida nueva
+        """
+        src_map = before['map_id']
+        dst_map = after['map_id']
+        if src_map == dst_map:
+            return False
+
+        exits = self.exits.setdefault(src_map, {})
+        key = self._exit_key(before['x'], before['y'], action)
+
+        # Una salida sembrada desde RAM queda verificada al observarla
+        seeded = [k for k, e in exits.items() if e['source'] == 'ram' and _matches(e, before, dst_map)]
+        for ram_key in seeded:
+            del exits[ram_key]
+
+        entry = exits.get(key)
+        is_new = entry is None
+        if is_new:
+            entry = exits[key] = {
+                'x': before['x'], 'y': before['y'], 'action': action,
+                'dst_map': dst_map, 'dst_x': None, 'dst_y': None,
+                'count': 0, 'source': 'observed',
+            }
+        entry['dst_map'] = dst_map
+        entry['dst_x'] = after['x']
+        entry['dst_y'] = after['y']
+        entry['count'] += 1
+        entry['source'] = 'observed'
+
+        self.dirty = True
+        if is_new and not seeded:
+            print(f"   🗺️ NEW EXIT: map {src_map} ({before['x']},{before['y']}) {action} → map {dst_map}")
+        return is_new
+
+    def seed_from_ram(self, memory, map_id):
+        """
+        Añade las salidas de la tabla de warps del mapa cargado
+
+        Args:
+            memory: Memoria del emulador (emu.memory)
+            map_id: Mapa actualmente cargado
+
+        Returns:
+            Número de salidas nuevas
+        """
+        count = memory[NUM_WARPS_ADDR]
+        if count > MAX_WARPS:
+            return 0
+
+        raw = memory[WARP_ENTRIES_ADDR:WARP_ENTRIES_ADDR + count * WARP_ENTRY_SIZE]
+        last_map = memory[LAST_MAP_ADDR]
+        exits = self.exits.setdefault(map_id, {})
+        added = 0
+
+        for i in range(count):
+            warp_y, warp_x, _, dst_map = raw[i * WARP_ENTRY_SIZE:(i + 1) * WARP_ENTRY_SIZE]
+            if dst_map == LAST_MAP_MARKER:
+                dst_map = last_map
+            # Convención de read_game_state: 'x' contiene la coordenada Y de la RAM
+            x, y = warp_y, warp_x
+
+            warp = {'x': x, 'y': y}
+            if any((e['x'], e['y']) == (x, y) or _matches(e, warp, dst_map) for e in exits.values()):
+                continue
+
+            exits[self._exit_key(x, y, None)] = {
+                'x': x, 'y': y, 'action': None,
+                'dst_map': dst_map, 'dst_x': None, 'dst_y': None,
+                'count': 0, 'source': 'ram',
+            }
+            added += 1
+
+        if added:
+            self.dirty = True
+        return added
+
+    def _edge_weight(self, entry):
+        return OBSERVED_WEIGHT if entry['source'] == 'observed' else RAM_WEIGHT
+
+    def shortest_path(self, src_map, dst_map):
+        """
+        Dijkstra sobre los mapas
+
+        Returns:
+            Lista de salidas (dicts) a recorrer, [] si ya estamos, None si no hay ruta
+        """
+        if src_map == dst_map:
+            return []
+
+        best = {src_map: 0.0}
+        previous = {}
+        heap = [(0.0, src_map)]
+
+        while heap:
+            cost, current = heapq.heappop(heap)
+            if current == dst_map:
+                break
+            if cost > best.get(current, float('inf')):
+                continue
+
+            # Por mapa destino, quedarse con la salida más barata
+            for entry in self.exits.get(current, {}).values():
+                nxt = entry['dst_map']
+                new_cost = cost + self._edge_weight(entry)
+                if new_cost < best.get(nxt, float('inf')):
+                    best[nxt] = new_cost
+                    previous[nxt] = (current, entry)
+                    heapq.heappush(heap, (new_cost, nxt))
+
+        if dst_map not in previous:
+            return None
+
+        path = []
+        node = dst_map
+        while node != src_map:
+            node, entry = previous[node]
+            path.append(entry)
+        path.reverse()
+        return path
+
+    def next_exit(self, game_state, target_map):
+        """
+        Salida del mapa actual por la que empezar la ruta hacia target_map
+
+        Si hay varias salidas al mismo mapa siguiente, elige la más cercana.
+        """
+        path = self.shortest_path(game_state['map_id'], target_map)
+        if not path:
+            return None
+
+        next_map = path[0]['dst_map']
+        candidates = [
+            e for e in self.exits.get(game_state['map_id'], {}).values()
+            if e['dst_map'] == next_map
+        ]
+        return min(
+            candidates,
+            key=lambda e: (
+                abs(e['x'] - game_state['x']) + abs(e['y'] - game_state['y']),
+                -e['count']
+            )
+        )
+
+    def to_dict(self):
+        return {'exits': {str(m): exits for m, exits in self.exits.items()}}
+
+    def load_dict(self, data):
+        self.exits = {int(m): exits for m, exits in data.get('exits', {}).items()}
+
+    def save(self):
+        """Persiste el grafo si hubo cambios (escritura atómica)"""
+        if not self.path or not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"    ERROR: saving world graph: {e}")
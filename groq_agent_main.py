@@ -3,22 +3,42 @@ Agente principal para jugar Pokémon Red usando Groq + Llama 4 Scout
 VERSIÓN MEJORADA con Progress Tracker + Dialog Detector
 """
 
+import argparse
+import io
 import time
-import base64
 import cv2
 import numpy as np
 from pyboy import PyBoy
-from pyboy.utils import WindowEvent
 import sys
 import os
+from collections import deque
 
 # Importar componentes del proyecto
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from core.llm_planner import LLMPlanner
+from core.llm_planner import LLMPlanner, create_http_client
 from core.memory_buffer import MemoryBuffer
 from core.event_checker import EventChecker
 from core.progress_tracker import ProgressTracker
 from core.dialog_detector import DialogDetector
+from core.game_state import read_game_state
+from core.metrics import Metrics
+from core.profiler import ProfilerHooks
+from core.checkpoint import CheckpointManager
+from core.world_graph import WorldGraph
+from core.input_scheduler import InputScheduler, skip_intro
+from core.shared_frames import RemoteEmulator
+from core.text_observation import capture_tile_view
+from core.image_payload import ImagePreparer
+from core.frame_history import FrameHistory
+from core.action_mask import passable_directions
+from core.sprites import read_sprites
+from core.step_budget import StepBudget
+from core.macro_library import MacroLibrary
+from core.escape_kb import EscapeKnowledgeBase
+from core.run_store import RunStore
+from core.lookahead import LookaheadSearch
+from core.cell_archive import CellArchive
+from core.watchpoints import MemoryWatcher, STATE_REGIONS, OBJECTIVE_REGION_NAMES, merge_addresses
 
 # ============================================================================
 # CONFIGURACIÓN (EDITAR AQUÍ)
@@ -37,76 +57,105 @@ VIDEO_OUTPUT = "agent_playthrough.mp4"
 VIDEO_FPS = 2
 
 MAX_STEPS = 10000
-RATE_LIMIT_DELAY = 2
+RATE_LIMIT_DELAY = 2                  # solo se espera tras pasos decididos por el LLM
 
-# ============================================================================
-# MAPEO DE ACCIONES
-# ============================================================================
+HEADLESS = False                      # True = sin ventana (window="null")
 
-ACTION_MAP = {
-    "UP": WindowEvent.PRESS_ARROW_UP,
-    "DOWN": WindowEvent.PRESS_ARROW_DOWN,
-    "LEFT": WindowEvent.PRESS_ARROW_LEFT,
-    "RIGHT": WindowEvent.PRESS_ARROW_RIGHT,
-    "A": WindowEvent.PRESS_BUTTON_A,
-    "B": WindowEvent.PRESS_BUTTON_B,
-    "START": WindowEvent.PRESS_BUTTON_START,
-    "SELECT": WindowEvent.PRESS_BUTTON_SELECT,
-}
+# "inprocess" = PyBoy en este proceso; "multiprocess" = PyBoy en su propio proceso
+# publicando frames y WRAM en memoria compartida (ver core/shared_frames.py)
+ARCHITECTURE_MODE = "inprocess"
+FRAME_RING_SLOTS = 8
 
-# ============================================================================
-# LECTURA DE ESTADO DEL JUEGO
-# ============================================================================
+# Instrumentación por fase (ver core/metrics.py)
+METRICS_ENABLED = True
+METRICS_FILE = "agent_metrics.prom"   # .prom = texto Prometheus, .jsonl = una línea por export
+METRICS_EXPORT_EVERY = 50             # steps entre exportaciones
+METRICS_WINDOW = 1000                 # observaciones por histograma rodante
 
-MEMORY_ADDRESSES = {
-    'map_id': 0xD35E,
-    'player_x': 0xD361,
-    'player_y': 0xD362,
-    'badges': 0xD356,
-    'party_count': 0xD163,
-    'money_bcd1': 0xD347,
-    'money_bcd2': 0xD348,
-    'money_bcd3': 0xD349,
-    'in_battle': 0xD057,
-}
+# Perfilado bajo demanda (ver core/profiler.py)
+# `kill -USR1 <pid>` abre/cierra una ventana de PROFILE_SIGNAL_WINDOW steps
+PROFILE_DIR = "profiles"
+PROFILE_STEP_RANGE = None             # ej. (7000, 7200) para perfilar esa ventana
+PROFILE_SIGNAL_WINDOW = 200
 
-def read_game_state(emu):
-    """Lee el estado actual del juego desde la memoria"""
-    mem = emu.memory
-    
-    # Leer dinero (formato BCD)
-    money_h = mem[MEMORY_ADDRESSES['money_bcd1']]
-    money_m = mem[MEMORY_ADDRESSES['money_bcd2']]
-    money_l = mem[MEMORY_ADDRESSES['money_bcd3']]
-    money = ((money_h >> 4) * 100000 + (money_h & 0xF) * 10000 +
-             (money_m >> 4) * 1000 + (money_m & 0xF) * 100 +
-             (money_l >> 4) * 10 + (money_l & 0xF))
-    
-    # Nivel máximo del equipo
-    party_count = mem[MEMORY_ADDRESSES['party_count']]
-    max_level = 0
-    if 0 < party_count <= 6:
-        for i in range(party_count):
-            level_addr = 0xD18C + (i * 44)
-            level = mem[level_addr]
-            max_level = max(max_level, level)
-    
-    return {
-        'map_id': mem[MEMORY_ADDRESSES['map_id']],
-        'x': mem[MEMORY_ADDRESSES['player_x']],
-        'y': mem[MEMORY_ADDRESSES['player_y']],
-        'badges': bin(mem[MEMORY_ADDRESSES['badges']]).count('1'),
-        'party_count': party_count if 0 < party_count <= 6 else 0,
-        'max_level': max_level,
-        'money': money,
-        'in_battle': mem[MEMORY_ADDRESSES['in_battle']] > 0
-    }
+# Checkpoints crash-safe (ver core/checkpoint.py); reanudar con --resume
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_EVERY = 250                # steps entre checkpoints
+CHECKPOINT_KEEP = 3                   # checkpoints rotados que se conservan
+
+# Grafo de transiciones entre mapas (ver core/world_graph.py)
+WORLD_GRAPH_FILE = "world_graph.json"
+
+# Planificador de entradas (ver core/input_scheduler.py)
+INPUT_MAX_FRAMES = 120                # tope de frames por acción
+INPUT_PRESS_FRAMES = 4                # frames mínimos con el botón pulsado
+INPUT_SETTLE_FRAMES = 4               # frames "quietos" para dar la acción por terminada
+
+# Búsqueda por ramas cuando no hay progreso (ver core/lookahead.py)
+LOOKAHEAD_ENABLED = True
+LOOKAHEAD_WORKERS = 4                 # procesos del pool (solo en HEADLESS)
+
+# Archivo Go-Explore de estados prometedores (ver core/cell_archive.py)
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = "cell_archive"
+ARCHIVE_MEMORY_MB = 64
+ARCHIVE_DISK_MB = 1024
+
+# Transporte HTTP del planner (pool keep-alive, HTTP/2 si `h2` está instalado)
+LLM_POOL_MAX_CONNECTIONS = 4
+LLM_POOL_MAX_KEEPALIVE = 4
+LLM_KEEPALIVE_EXPIRY = 120            # segundos; > RATE_LIMIT_DELAY para no reconectar
+LLM_HTTP2 = True
+
+# Presupuesto de steps por objetivo aprendido del historial (ver core/step_budget.py)
+STEP_BUDGET_FILE = "step_budgets.json"
+STEP_BUDGET_QUANTILE = 0.9            # cuantil de steps-hasta-completar observados
+STEP_BUDGET_MARGIN = 1.5
+STEP_BUDGET_DEFAULT = 500             # sin historial (antiguo max_steps_per_objective)
+ESCALATION_MODEL = None               # modelo al que escalar antes del timeout; None = no escalar
+
+# Macros: trayectorias que completaron un objetivo, reproducidas con verificación
+# por paso antes de consultar al LLM (ver core/macro_library.py)
+MACROS_ENABLED = True
+MACRO_DB = "macros.db"
+
+# Secuencias de escape aprendidas por (mapa, x, y, objetivo) (ver core/escape_kb.py)
+ESCAPE_KB_FILE = "escape_kb.json"
+ESCAPE_MAX_SEQUENCE = 8               # acciones por intento antes de darlo por fallido
+ESCAPE_CLEAR_STEPS = 5                # steps seguidos sin atasco para dar el escape por bueno
+
+# Base de datos de ejecuciones: steps, objetivos, llamadas al LLM y eventos
+# (ver core/run_store.py; informes con `python -m core.run_store report`)
+RUN_STORE_ENABLED = True
+RUN_DB = "runs.db"
+RUN_STORE_BATCH = 200                 # filas por transacción
+
+# Observación enviada al LLM: "image" (captura), "text" (mapa ASCII, ver
+# core/text_observation.py; permite modelos solo texto), "both" o "history"
+# (últimas capturas en una sola imagen con flechas del recorrido, ver core/frame_history.py)
+OBSERVATION_MODE = "image"
+FRAME_HISTORY_FRAMES = 3              # capturas por hoja en modo "history", incluida la actual
+
+# Preparación de la captura (ver core/image_payload.py)
+IMAGE_QUANTIZE = True                 # 4 tonos de la Game Boy
+IMAGE_ROI_BLOCKS = 3                  # bloques de 16 px alrededor del jugador; None = pantalla completa
+IMAGE_SCALE = 2                       # escalado con vecino más cercano
+IMAGE_FORMATS = ('png', 'webp')       # se envía el más pequeño; 'jpeg' también disponible
+
+# Resiliencia del planner (ver core/resilience.py)
+LLM_HEDGING = True                    # duplicar la petición si supera el p95 observado
+LLM_BREAKER_FAILURES = 3              # fallos seguidos que abren el circuito
+LLM_BREAKER_COOLDOWN = 30             # segundos con política local antes de probar la API
 
 # ============================================================================
 # MAIN LOOP
 # ============================================================================
 
-def main():
+def main(resume=None):
+    """
+    Args:
+        resume: Ruta de un checkpoint, 'latest' para el más reciente, o None para empezar de cero
+    """
     print("╔══════════════════════════════════════════════════════════════╗")
     print("║       POKÉMON RED - GROQ AGENT (LLAMA 4 SCOUT)               ║")
     print("╚══════════════════════════════════════════════════════════════╝\n")
@@ -126,18 +175,118 @@ def main():
             return
     
     # Inicializar componentes
-    print("🎮 Inicializando emulador...")
-    emu = PyBoy(ROM_PATH, window="SDL2")
-    emu.set_emulation_speed(0)
+    print("📊 Inicializando métricas...")
+    metrics = Metrics(
+        enabled=METRICS_ENABLED,
+        window=METRICS_WINDOW,
+        export_path=METRICS_FILE,
+        export_format='jsonl' if METRICS_FILE.endswith('.jsonl') else 'prometheus',
+        export_every=METRICS_EXPORT_EVERY
+    )
+    
+    profiler = ProfilerHooks(
+        output_dir=PROFILE_DIR,
+        step_range=PROFILE_STEP_RANGE,
+        signal_window=PROFILE_SIGNAL_WINDOW
+    )
     
     print("🤖 Inicializando LLM Planner...")
-    planner = LLMPlanner(GROQ_API_KEY, OBJECTIVES_FILE, SKILLS_FILE, WAYPOINTS_FILE)
+    http_client = create_http_client(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        http2=LLM_HTTP2
+    )
+    step_budget = StepBudget(
+        STEP_BUDGET_FILE,
+        quantile=STEP_BUDGET_QUANTILE,
+        margin=STEP_BUDGET_MARGIN,
+        default_budget=STEP_BUDGET_DEFAULT
+    )
+    planner = LLMPlanner(GROQ_API_KEY, OBJECTIVES_FILE, SKILLS_FILE, WAYPOINTS_FILE,
+                         metrics=metrics, http_client=http_client, hedging=LLM_HEDGING,
+                         breaker_failures=LLM_BREAKER_FAILURES,
+                         breaker_cooldown=LLM_BREAKER_COOLDOWN,
+                         observation_mode=OBSERVATION_MODE,
+                         step_budget=step_budget, escalation_model=ESCALATION_MODEL)
+    
+    # La conexión con Groq se abre en paralelo con el arranque del emulador y la intro
+    warm_up_thread = planner.warm_up_async()
+    
+    image_preparer = ImagePreparer(
+        quantize=IMAGE_QUANTIZE,
+        roi_blocks=IMAGE_ROI_BLOCKS,
+        scale=IMAGE_SCALE,
+        formats=IMAGE_FORMATS,
+        metrics=metrics
+    )
+    
+    frame_history = FrameHistory(FRAME_HISTORY_FRAMES) if planner.uses_frame_history else None
+    
+    print("🎮 Inicializando emulador...")
+    multiprocess = ARCHITECTURE_MODE == "multiprocess"
+    scheduler_kwargs = {
+        'press_frames': INPUT_PRESS_FRAMES,
+        'settle_frames': INPUT_SETTLE_FRAMES,
+        'max_frames': INPUT_MAX_FRAMES,
+    }
+    if multiprocess:
+        # El proxy remoto hace de emulador y de scheduler a la vez
+        emu = RemoteEmulator(ROM_PATH, headless=HEADLESS, slots=FRAME_RING_SLOTS, **scheduler_kwargs)
+        scheduler = emu
+    else:
+        emu = PyBoy(ROM_PATH, window="null" if HEADLESS else "SDL2")
+        emu.set_emulation_speed(0)
+        scheduler = InputScheduler(emu, **scheduler_kwargs)
+    
+    print("🗺️ Inicializando World Graph...")
+    world_graph = WorldGraph(WORLD_GRAPH_FILE)
+    planner.world_graph = world_graph
     
     print("💾 Inicializando Memory Buffer...")
-    memory = MemoryBuffer(max_size=20)
+    memory = MemoryBuffer(max_size=20, world_graph=world_graph)
     
     print("✅ Inicializando Event Checker...")
     event_checker = EventChecker(EVENTS_FILE)
+    planner.cursor.bind(event_checker)
+    
+    run_store = None
+    if RUN_STORE_ENABLED:
+        print("🗄️ Inicializando Run Store...")
+        run_store = RunStore(RUN_DB, batch_size=RUN_STORE_BATCH)
+        run_store.start_run(model=planner.base_model, observation_mode=OBSERVATION_MODE, config={
+            'architecture': ARCHITECTURE_MODE,
+            'max_steps': MAX_STEPS,
+            'escalation_model': ESCALATION_MODEL,
+            'lookahead': LOOKAHEAD_ENABLED,
+            'archive': ARCHIVE_ENABLED,
+            'macros': MACROS_ENABLED,
+            'resume': resume,
+        })
+        planner.run_store = run_store
+        event_checker.run_store = run_store
+    
+    lookahead = None
+    if LOOKAHEAD_ENABLED:
+        # Con el emulador en otro proceso las ramas siempre se simulan en el pool
+        lookahead = LookaheadSearch(ROM_PATH, headless=HEADLESS or multiprocess,
+                                    workers=LOOKAHEAD_WORKERS, scheduler_kwargs=scheduler_kwargs)
+    
+    archive = None
+    if ARCHIVE_ENABLED:
+        archive = CellArchive(
+            ARCHIVE_DIR,
+            memory_budget=ARCHIVE_MEMORY_MB * 1024 * 1024,
+            disk_budget=ARCHIVE_DISK_MB * 1024 * 1024
+        )
+    
+    # Watchpoints: estado y objetivos solo se recalculan si sus entradas cambian
+    watcher = MemoryWatcher(STATE_REGIONS)
+    watcher.add_region('events', merge_addresses(event_checker.watched_addresses()))
+    if multiprocess:
+        # Se sondea tras cada acción en el proceso del emulador; execute() trae las regiones sucias
+        emu.watcher = watcher
+        emu.watch(watcher.regions)
     
     print("📈 Inicializando Progress Tracker...")
     progress_tracker = ProgressTracker(WAYPOINTS_FILE)
@@ -152,42 +301,64 @@ def main():
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         video = cv2.VideoWriter(VIDEO_OUTPUT, fourcc, VIDEO_FPS, (160, 144))
     
-    # Skip intro MANUAL
-    print("⏩ Saltando intro del juego...")
-    
-    # Esperar a pantalla de título
-    for _ in range(300):
-        emu.tick()
-    
-    # Presionar START para entrar
-    emu.send_input(WindowEvent.PRESS_BUTTON_START)
-    for _ in range(10):
-        emu.tick()
-    emu.send_input(WindowEvent.RELEASE_BUTTON_START)
-    for _ in range(50):
-        emu.tick()
-    
-    # Presionar START repetidamente
-    for _ in range(100):
-        emu.send_input(WindowEvent.PRESS_BUTTON_START)
-        for _ in range(2): 
-            emu.tick()
-        emu.send_input(WindowEvent.RELEASE_BUTTON_START)
-        for _ in range(2): 
-            emu.tick()
-    
-    # Presionar A para continuar
-    for _ in range(100):
-        emu.send_input(WindowEvent.PRESS_BUTTON_A)
-        for _ in range(2): 
-            emu.tick()
-        emu.send_input(WindowEvent.RELEASE_BUTTON_A)
-        for _ in range(2): 
-            emu.tick()
-    
-    # Esperar estabilización
-    for _ in range(30): 
-        emu.tick()
+    macros = MacroLibrary(MACRO_DB) if MACROS_ENABLED else None
+    escapes = EscapeKnowledgeBase(ESCAPE_KB_FILE, max_sequence=ESCAPE_MAX_SEQUENCE,
+                                  clear_steps=ESCAPE_CLEAR_STEPS)
+    
+    def restart_macro_recording(state):
+        """Nueva trayectoria desde `state` (cambio de objetivo o salto de estado)"""
+        if macros:
+            objective_id = planner.current_objective_id()
+            if objective_id:
+                macros.start_recording(objective_id, emu, state)
+            else:
+                macros.cancel_recording()
+    
+    objective_start = {'objective_id': None, 'state': None, 'step': 0}
+    
+    def snapshot_objective_start():
+        """Save state en memoria al empezar un objetivo (para la recuperación 'reload_checkpoint')"""
+        buffer = io.BytesIO()
+        emu.save_state(buffer)
+        objective_start.update(objective_id=planner.current_objective_id(), state=buffer.getvalue(), step=step)
+    
+    checkpoints = CheckpointManager(CHECKPOINT_DIR, every=CHECKPOINT_EVERY, keep=CHECKPOINT_KEEP)
+    components = {
+        'planner': planner,
+        'memory': memory,
+        'progress_tracker': progress_tracker,
+        'event_checker': event_checker,
+    }
+    
+    step = 0
+    payload = None
+    if resume:
+        payload = checkpoints.load(None if resume == 'latest' else resume)
+        if payload is None:
+            print(f"⚠️ No hay checkpoints en '{CHECKPOINT_DIR}', empezando de cero")
+    
+    if payload:
+        # Reanudar: el save state sustituye a la intro
+        step = checkpoints.restore(payload, emu, components)
+        print(f"♻️ Reanudando desde el step {step}")
+    else:
+        # Skip intro MANUAL
+        print("⏩ Saltando intro del juego...")
+        if multiprocess:
+            emu.skip_intro()
+        else:
+            skip_intro(emu)
+    
+    warm_up_thread.join(timeout=10)
+    
+    initial_state = read_game_state(emu)
+    world_graph.seed_from_ram(emu.memory, initial_state['map_id'])
+    if run_store:
+        run_store.begin_step(step)
+    event_checker.poll_story_flags(emu.memory)
+    planner.skip_satisfied_objectives(initial_state, emu.memory)
+    restart_macro_recording(initial_state)
+    snapshot_objective_start()
     
     # Obtener objetivo inicial
     context = planner.get_current_context()
@@ -199,22 +370,40 @@ def main():
     print("="*70)
     print("🚀 INICIANDO AGENTE\n")
     
-    step = 0
+    watcher.mark_all_dirty()
+    state_after = None          # Estado cacheado del step anterior
+    checked_objective = None    # Último objetivo evaluado por el EventChecker
+    pending_actions = deque()   # Secuencia comprometida por el lookahead
+    replay = None               # Macro en reproducción
+    run_status = 'error'        # Estado final para el run store
     
     try:
         while step < MAX_STEPS:
-            # Leer estado ANTES
-            state_before = read_game_state(emu)
+            step_start = time.perf_counter()
+            profiler.on_step(step, planner.get_current_context())
+            step_objective = planner.current_objective_id()
+            if run_store:
+                run_store.begin_step(step)
             
-            # Capturar screenshot
-            screen = emu.screen.image
-            screen.save("temp.png")
-            with open("temp.png", "rb") as f:
-                img_b64 = base64.b64encode(f.read()).decode()
+            # Leer estado ANTES (entre steps no se emula: vale el estado DESPUÉS anterior)
+            with metrics.timer('read_state'):
+                state_before = dict(state_after) if state_after is not None else read_game_state(emu)
+                state_before['in_dialog'] = dialog_detector.is_in_dialog(emu)
+            with metrics.timer('action_mask'):
+                state_before['passable'] = passable_directions(emu, state_before)
+            
+            # Capturar screenshot (solo si el planner envía imagen); se compone y
+            # codifica más abajo, únicamente si la decisión llega al LLM
+            screen = None
+            if planner.uses_image:
+                with metrics.timer('capture'):
+                    # Copia: el lookahead en proceso emula ramas sobre este mismo emulador
+                    screen = emu.screen.image.copy()
             
             # SISTEMA DE DECISIÓN JERÁRQUICO
             action = None
             action_source = "LLM"
+            detection = EscapeKnowledgeBase.SKIPPED     # Resultado de la detección de atasco
             
             #PRIORIDAD 1: Detectar diálogos
             #if dialog_detector.is_in_dialog(emu):
@@ -222,84 +411,291 @@ def main():
             #        action = "A"
             #        action_source = "DIALOG"
             
+            # PRIORIDAD 1.5: Continuar una secuencia ya elegida por el lookahead
+            if action is None and pending_actions:
+                action = pending_actions.popleft()
+                action_source = "LOOKAHEAD"
+            
+            # PRIORIDAD 1.6: Continuar una macro verificada
+            if replay is not None and replay.done:
+                # Se terminó la macro sin completar el objetivo
+                macros.report(replay.macro_id, False)
+                replay = None
+            # En batalla o diálogo la macro se pausa: decide el planner y se retoma después
+            replay_paused = state_before.get('in_battle') or state_before.get('in_dialog')
+            if action is None and replay is not None and not replay_paused:
+                action = replay.next_action()
+                action_source = "MACRO"
+            
             # PRIORIDAD 2: Verificar progreso
             if action is None:
                 context = planner.get_current_context()
                 if context:
-                    progress_status = progress_tracker.check_progress(
-                        state_before, 
-                        context['current_step']
-                    )
+                    with metrics.timer('progress_check'):
+                        progress_status = progress_tracker.check_progress(
+                            state_before, 
+                            context['current_step']
+                        )
                     
-                    if progress_status == 'stuck':
-                        action = memory.get_stuck_suggestion()
-                        action_source = "NO_PROGRESS"
-                    elif memory.detect_stuck() or memory.detect_loop():
-                        action = memory.get_stuck_suggestion()
-                        action_source = "STUCK/LOOP"
+                    if progress_status == 'stuck' and lookahead:
+                        # Simular ramas desde un save state y repetir la mejor en vivo
+                        with metrics.timer('lookahead'):
+                            branch = lookahead.search(
+                                emu, state_before,
+                                target=planner._find_target_waypoint(context['current_step'], state_before),
+                                visits=planner.local_policy.visits
+                            )
+                        if branch:
+                            print(f"   🌳 LOOKAHEAD: {' '.join(branch.actions)} (score {branch.score:.1f})")
+                            pending_actions.extend(branch.actions)
+                            action = pending_actions.popleft()
+                            action_source = "LOOKAHEAD"
+                    
+                    if action is None and progress_status == 'stuck' and archive:
+                        # Sin rama buena: volver a una celda poco explorada del mismo objetivo
+                        score = planner.progress_score()
+                        cell = archive.select_frontier(
+                            archive.cell_key(emu, state_before), min_score=score, max_score=score
+                        )
+                        if cell:
+                            archive.restore(emu, cell)
+                            restart_macro_recording(read_game_state(emu))
+                            replay = None
+                            escapes.cancel()
+                            if frame_history:
+                                frame_history.clear()
+                            print(f"   📦 ARCHIVE: restored cell {cell.key[:4]} (chosen {cell.chosen}x)")
+                            metrics.incr('archive_restores')
+                            if run_store:
+                                run_store.record_event('archive_restore', repr(cell.key[:4]))
+                            watcher.mark_all_dirty()
+                            progress_tracker.reset_no_progress()
+                            state_after = None
+                            continue
+                    
+                    if action is None:
+                        stuck_source = None
+                        if progress_status == 'stuck':
+                            stuck_source = "NO_PROGRESS"
+                        elif memory.detect_stuck() or memory.detect_loop():
+                            stuck_source = "STUCK/LOOP"
+                        detection = EscapeKnowledgeBase.ESCAPE if stuck_source else EscapeKnowledgeBase.CLEAR
+                        if stuck_source:
+                            # Primero lo que ya funcionó en esta casilla; si no, heurística
+                            action = escapes.suggest(
+                                EscapeKnowledgeBase.key(state_before, planner.current_objective_id())
+                            )
+                            action_source = "ESCAPE"
+                            if action is None:
+                                action = memory.get_stuck_suggestion()
+                                action_source = stuck_source
+                            # Las sugerencias de atasco tampoco se ejecutan contra una pared
+                            action = planner.mask_action(action, state_before)
+            
+            # PRIORIDAD 2.5: Macro grabada para este objetivo desde esta casilla
+            if action is None and macros and replay is None:
+                with metrics.timer('macro_lookup'):
+                    replay = macros.lookup(planner.current_objective_id(), emu, state_before)
+                if replay is not None:
+                    print(f"   📼 MACRO #{replay.macro_id}: {len(replay.actions) - replay.index} steps")
+                    action = replay.next_action()
+                    action_source = "MACRO"
             
             # PRIORIDAD 3: Decisión normal con LLM
             if action is None:
+                image = None
+                if screen is not None:
+                    if frame_history:
+                        with metrics.timer('frame_sheet'):
+                            sheet = frame_history.compose(
+                                screen, memory.get_position_history(FRAME_HISTORY_FRAMES), state_before
+                            )
+                        with metrics.timer('encode'):
+                            image = image_preparer.prepare(sheet, state_before, crop=False)
+                    else:
+                        with metrics.timer('encode'):
+                            image = image_preparer.prepare(screen, state_before)
                 memory_summary = memory.get_recent_summary()
-                action = planner.decide_action(img_b64, state_before, memory_summary)
-                action_source = "LLM"
+                tile_view = None
+                if planner.uses_text_map:
+                    with metrics.timer('text_observation'):
+                        tile_view = capture_tile_view(emu, state_before)
+                sprites = None
+                if not state_before['in_battle']:
+                    with metrics.timer('sprites'):
+                        sprites = read_sprites(emu.memory)
+                with metrics.timer('decide'):
+                    action = planner.decide_action(image, state_before, memory_summary, tile_view, sprites)
+                action_source = planner.last_source
+            if frame_history and screen is not None:
+                # El historial guarda todos los steps, decida quien decida
+                with metrics.timer('frame_push'):
+                    frame_history.push(screen)
+            metrics.incr(f"actions_{action_source.replace('/', '_').lower()}")
             
             # Mostrar info con source
             source_icons = {
                 "LLM": "🤖",
                 "DIALOG": "💬",
                 "STUCK/LOOP": "⚠️",
-                "NO_PROGRESS": "🔄"
+                "NO_PROGRESS": "🔄",
+                "FALLBACK": "🧭",
+                "LOOKAHEAD": "🌳",
+                "MACRO": "📼",
+                "ESCAPE": "🪜"
             }
             icon = source_icons.get(action_source, "")
             
-            print(f"[{step:04d}] {icon} {action:6s} | Pos: ({state_before['x']:3d},{state_before['y']:3d}) Map: {state_before['map_id']:3d} | Badges: {state_before['badges']}/8")
+            # Ejecutar acción (ticks hasta que la acción termina de verdad)
+            with metrics.timer('tick'):
+                frames = scheduler.execute(action)
+            metrics.incr('emulated_frames', frames)
             
-            # Ejecutar acción
-            if action in ACTION_MAP:
-                emu.send_input(ACTION_MAP[action])
-                for _ in range(30):
-                    emu.tick()
-                emu.send_input(ACTION_MAP[action] + 8)  # Release
+            print(f"[{step:04d}] {icon} {action:6s} | Pos: ({state_before['x']:3d},{state_before['y']:3d}) Map: {state_before['map_id']:3d} | Badges: {state_before['badges']}/8 | {frames:3d}f")
             
-            # Estado DESPUÉS
-            state_after = read_game_state(emu)
+            # Estado DESPUÉS: solo se reconstruye si cambió alguna de sus regiones
+            if not multiprocess:
+                watcher.poll(emu)
+            dirty = watcher.consume()
+            with metrics.timer('read_state'):
+                if watcher.is_dirty_set(dirty, STATE_REGIONS):
+                    state_after = read_game_state(emu)
+                else:
+                    state_after = dict(state_before)
+                    state_after.pop('in_dialog', None)
+                    state_after.pop('passable', None)
+                    metrics.incr('state_reads_skipped')
             
             # Guardar en memoria
             memory.add(action, state_before, state_after)
+            if macros:
+                macros.record_step(action, emu, state_after)
+                if action_source == "MACRO" and replay is not None:
+                    if not replay.verify(state_after):
+                        if state_after.get('in_battle') or dialog_detector.is_in_dialog(emu):
+                            # Encuentro salvaje o entrenador: no cuenta como fallo de la macro
+                            print(f"   📼 MACRO #{replay.macro_id} interrupted by a battle/dialog, back to the planner")
+                            metrics.incr('macro_interruptions')
+                        else:
+                            print(f"   📼 MACRO #{replay.macro_id} diverged, back to the planner")
+                            macros.report(replay.macro_id, False)
+                            metrics.incr('macro_failures')
+                        replay = None
+            if action_source in ("LOOKAHEAD", "MACRO"):
+                # Otra rama tomó el control: sus steps no son del escape
+                escapes.cancel()
+            elif escapes.observe(action, detection):
+                metrics.incr('escape_episodes')
+            planner.local_policy.record_transition(action, state_before, state_after)
+            if state_after['map_id'] != state_before['map_id']:
+                world_graph.seed_from_ram(emu.memory, state_after['map_id'])
+                world_graph.save()
+            if archive and watcher.is_dirty_set(dirty, ('map', 'coords', 'badges', 'events')):
+                with metrics.timer('archive_update'):
+                    archive.update(emu, state_after, planner.progress_score())
+            
+            # Saltar objetivos que el progreso incidental ya dejó cumplidos
+            if watcher.is_dirty_set(dirty, OBJECTIVE_REGION_NAMES):
+                with metrics.timer('event_check'):
+                    for flag_name in event_checker.poll_story_flags(emu.memory):
+                        print(f"   🚩 EVENT: {flag_name}")
+                    if planner.skip_satisfied_objectives(state_after, emu.memory):
+                        progress_tracker.reset_for_new_objective()
+                        pending_actions.clear()
+                        restart_macro_recording(state_after)
+                        snapshot_objective_start()
+                        replay = None
+                if planner.cursor.finished:
+                    print("\n🎉 ¡TODOS LOS OBJETIVOS COMPLETADOS!\n")
+                    run_status = 'completed'
+                    break
             
             # Verificar si completó objetivo actual
             context = planner.get_current_context()
-            if context:
-                obj_complete = event_checker.check_objective_complete(
-                    context['current_step'], 
-                    state_after, 
-                    emu.memory
-                )
+            if context and (context['current_step'] != checked_objective
+                            or watcher.is_dirty_set(dirty, OBJECTIVE_REGION_NAMES)):
+                checked_objective = context['current_step']
+                with metrics.timer('event_check'):
+                    obj_complete = event_checker.check_objective_complete(
+                        context['current_step'], 
+                        state_after, 
+                        emu.memory
+                    )
                 if obj_complete:
                     print(f"\n✅ COMPLETADO: {context['current_step']}")
                     planner.advance_objective()
                     progress_tracker.reset_for_new_objective()  # Reset waypoints
+                    step_budget.save()
+                    escapes.cancel()
+                    escapes.save()
+                    if macros:
+                        if replay is not None:
+                            macros.report(replay.macro_id, True)
+                        macros.finish_recording()
+                        restart_macro_recording(state_after)
+                        replay = None
+                    snapshot_objective_start()
+                    pending_actions.clear()
                     context = planner.get_current_context()
                     if context:
                         print(f"➡️ NUEVO: {context['current_step']}\n")
                     else:
                         print("\n🎉 ¡TODOS LOS OBJETIVOS COMPLETADOS!\n")
+                        run_status = 'completed'
                         break
             
             # Grabar frame
             if video:
-                frame = np.array(emu.screen.image.convert('RGB'))
-                frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                video.write(frame_bgr)
+                with metrics.timer('video_write'):
+                    frame = np.array(emu.screen.image.convert('RGB'))
+                    frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                    video.write(frame_bgr)
             
-            # Incrementar contador de planner
-            planner.increment_step_counter()
+            if run_store:
+                run_store.record_step(step, step_objective, state_before, action,
+                                      action_source, frames, time.perf_counter() - step_start)
+            
+            # Incrementar contador de planner (presupuesto y recuperaciones)
+            if planner.increment_step_counter():
+                # Timeout: la trayectoria del objetivo abandonado no se guarda
+                restart_macro_recording(state_after)
+                snapshot_objective_start()
+                replay = None
+            if planner.pop_recovery() == 'reload_checkpoint':
+                # Volver al inicio del objetivo actual (snapshot en memoria, no el último
+                # checkpoint, que suele ser del propio intento atascado); el planner conserva su estado
+                if (objective_start['state'] is not None
+                        and objective_start['objective_id'] == planner.current_objective_id()):
+                    emu.load_state(io.BytesIO(objective_start['state']))
+                    restart_macro_recording(read_game_state(emu))
+                    replay = None
+                    escapes.cancel()
+                    if frame_history:
+                        frame_history.clear()
+                    print(f"   ♻️ RECOVERY: back to the start of the objective (step {objective_start['step']})")
+                    metrics.incr('recovery_reloads')
+                    if run_store:
+                        run_store.record_event('objective_reload', str(objective_start['step']))
+                    watcher.mark_all_dirty()
+                    progress_tracker.reset_no_progress()
+                    pending_actions.clear()
+                    state_after = None
             
             step += 1
-            time.sleep(RATE_LIMIT_DELAY)
+            checkpoints.maybe_save(step, emu, components)
+            metrics.observe('step_active', time.perf_counter() - step_start)
+            metrics.maybe_export(step)
+            
+            # El rate limit solo aplica a las llamadas a la API
+            if action_source == "LLM":
+                with metrics.timer('sleep'):
+                    time.sleep(RATE_LIMIT_DELAY)
+            metrics.observe('step_total', time.perf_counter() - step_start)
+        else:
+            run_status = 'max_steps'
     
     except KeyboardInterrupt:
+        run_status = 'interrupted'
         print("\n\n⏸️ Interrumpido por el usuario")
     
     finally:
@@ -307,7 +703,25 @@ def main():
             video.release()
             print(f"\n✅ Video guardado: {VIDEO_OUTPUT}")
         
+        checkpoints.wait()
+        world_graph.save()
+        step_budget.save()
+        escapes.save()
+        if macros:
+            macros.close()
+        if run_store:
+            run_store.end_run(run_status, step)
+            run_store.close()
+        if archive:
+            archive.save_index()
+        metrics.export()
+        profiler.stop(step, planner.get_current_context())
+        
         emu.stop()
+        if lookahead:
+            lookahead.close()
+        planner.close()
+        http_client.close()
         
         progress = planner.get_progress_info()
         print(f"\n📊 PROGRESO FINAL:")
@@ -322,4 +736,10 @@ def main():
         print("\n👋 Sesión terminada")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pokémon Red agent (Groq)")
+    parser.add_argument(
+        "--resume", nargs="?", const="latest", default=None,
+        help="Reanudar desde un checkpoint (sin ruta = el más reciente)"
+    )
+    args = parser.parse_args()
+    main(resume=args.resume)
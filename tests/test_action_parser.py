@@ -0,0 +1,49 @@
+"""Tests de la gramática estricta de ActionStreamParser"""
+
+import pytest
+
+from core.action_parser import ActionStreamParser, parse_action
+
+
+def feed_chunks(chunks):
+    parser = ActionStreamParser()
+    for chunk in chunks:
+        if parser.feed(chunk):
+            break
+    return parser.finish()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("UP", "UP"),
+    ("down.", "DOWN"),
+    ("A", "A"),
+    (" b ", "B"),
+    ("RIGHT\n", "RIGHT"),
+    ("ATTACK", None),
+    ("UPSTAIRS", None),
+    ("", None),
+])
+def test_parse_action(text, expected):
+    assert parse_action(text) == expected
+
+
+def test_article_a_is_not_button_after_first_word():
+    assert parse_action("Press A to talk") is None
+    assert parse_action("I think a LEFT turn") == "LEFT"
+
+
+def test_word_split_across_chunks():
+    assert feed_chunks(["LE", "FT"]) == "LEFT"
+    assert feed_chunks(["U", "PSTAIRS"]) is None
+
+
+def test_stops_at_first_complete_word():
+    parser = ActionStreamParser()
+    assert parser.feed("UP") is None        # "UP" podría seguir como "UPSTAIRS"
+    assert parser.feed(" and more") == "UP"
+    assert parser.feed(" DOWN") == "UP"
+    assert parser.text == "UP and more"
+
+
+def test_custom_valid_actions():
+    assert parse_action("A", valid_actions=("UP", "DOWN")) is None
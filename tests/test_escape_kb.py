@@ -0,0 +1,82 @@
+"""Tests de EscapeKnowledgeBase: episodios y ranking"""
+
+from core.escape_kb import EscapeKnowledgeBase
+
+ESCAPE = EscapeKnowledgeBase.ESCAPE
+CLEAR = EscapeKnowledgeBase.CLEAR
+SKIPPED = EscapeKnowledgeBase.SKIPPED
+KEY = (1, 5, 5, 'phase_1/tactical_1/0')
+
+
+def escape(kb, key, action):
+    kb.suggest(key)
+    return kb.observe(action, ESCAPE)
+
+
+def test_success_after_clear_steps():
+    kb = EscapeKnowledgeBase(clear_steps=2)
+    assert not escape(kb, KEY, 'UP')
+    assert not escape(kb, KEY, 'LEFT')
+    assert not kb.observe('A', CLEAR)
+    assert kb.observe('A', CLEAR)
+    assert kb.stats[KEY] == {('UP', 'LEFT'): [1, 1, 2]}
+    assert kb.best(KEY) == ('UP', 'LEFT')
+
+
+def test_skipped_steps_do_not_clear():
+    kb = EscapeKnowledgeBase(clear_steps=2)
+    escape(kb, KEY, 'UP')
+    for _ in range(5):
+        assert not kb.observe('A', SKIPPED)
+    assert kb.episode is not None
+
+
+def test_stuck_again_resets_quiet_counter():
+    kb = EscapeKnowledgeBase(clear_steps=2)
+    escape(kb, KEY, 'UP')
+    kb.observe('A', CLEAR)
+    escape(kb, KEY, 'RIGHT')
+    assert not kb.observe('A', CLEAR)
+    assert kb.observe('A', CLEAR)
+    assert kb.best(KEY) == ('UP', 'RIGHT')
+
+
+def test_failure_after_max_sequence():
+    kb = EscapeKnowledgeBase(max_sequence=2, clear_steps=1)
+    kb.update(KEY, ('UP',), True, 1)
+    assert kb.suggest(KEY) == 'UP'
+    kb.observe('UP', ESCAPE)
+    assert escape(kb, KEY, 'DOWN')
+    assert kb.stats[KEY][('UP',)] == [2, 1, 1]
+    assert kb.episode is None
+
+
+def test_new_bout_on_other_tile_starts_new_episode():
+    kb = EscapeKnowledgeBase(clear_steps=3)
+    kb.update(KEY, ('UP',), True, 1)
+    escape(kb, KEY, 'UP')
+    kb.observe('A', CLEAR)
+    other = (1, 6, 6, KEY[3])
+    kb.suggest(other)
+    assert kb.episode['key'] == other
+    assert kb.stats[KEY][('UP',)] == [2, 1, 1]
+
+
+def test_ranking_prefers_fewer_steps_to_clear():
+    kb = EscapeKnowledgeBase()
+    kb.update(KEY, ('UP', 'UP'), True, 6)
+    kb.update(KEY, ('LEFT', 'LEFT'), True, 2)
+    assert kb.best(KEY) == ('LEFT', 'LEFT')
+    kb.update(KEY, ('LEFT', 'LEFT'), False)
+    kb.update(KEY, ('LEFT', 'LEFT'), False)
+    assert kb.best(KEY) == ('UP', 'UP')
+
+
+def test_round_trip_and_old_entries():
+    kb = EscapeKnowledgeBase()
+    kb.update(KEY, ('UP',), True, 3)
+    loaded = EscapeKnowledgeBase()
+    loaded.load_dict(kb.to_dict())
+    assert loaded.stats == kb.stats
+    loaded.load_dict({'entries': [{'key': list(KEY), 'sequence': ['B'], 'attempts': 1, 'successes': 1}]})
+    assert loaded.stats[KEY] == {('B',): [1, 1, 0]}
@@ -0,0 +1,41 @@
+"""Tests de macro_library.remove_cycles"""
+
+from core.macro_library import remove_cycles
+
+
+def test_removes_round_trip():
+    actions = ['UP', 'DOWN', 'RIGHT']
+    points = [(1, 5, 5), (1, 4, 5), (1, 5, 5), (1, 5, 6)]
+    assert remove_cycles(actions, points) == (['RIGHT'], [(1, 5, 5), (1, 5, 6)])
+
+
+def test_removes_loop_around_obstacle():
+    actions = ['UP', 'RIGHT', 'DOWN', 'LEFT', 'UP']
+    points = [(1, 5, 5), (1, 4, 5), (1, 4, 6), (1, 5, 6), (1, 5, 5), (1, 4, 5)]
+    assert remove_cycles(actions, points) == (['UP'], [(1, 5, 5), (1, 4, 5)])
+
+
+def test_bumps_against_wall_are_removed():
+    actions = ['LEFT', 'LEFT', 'UP']
+    points = [(1, 5, 5), (1, 5, 5), (1, 5, 5), (1, 4, 5)]
+    assert remove_cycles(actions, points) == (['UP'], [(1, 5, 5), (1, 4, 5)])
+
+
+def test_keeps_turn_before_button():
+    # El giro decide hacia dónde mira el jugador al pulsar A
+    actions = ['LEFT', 'A']
+    points = [(1, 5, 5), (1, 5, 5), (1, 5, 5)]
+    assert remove_cycles(actions, points) == (actions, points)
+
+
+def test_no_cycle_is_unchanged():
+    actions = ['UP', 'UP', 'RIGHT']
+    points = [(1, 5, 5), (1, 4, 5), (1, 3, 5), (1, 3, 6)]
+    assert remove_cycles(actions, points) == (actions, points)
+
+
+def test_does_not_modify_arguments():
+    actions = ['UP', 'DOWN']
+    points = [(1, 5, 5), (1, 4, 5), (1, 5, 5)]
+    remove_cycles(actions, points)
+    assert actions == ['UP', 'DOWN']
@@ -0,0 +1,69 @@
+"""Tests de ObjectiveCursor.skip_satisfied (sin emulador)"""
+
+from core.objective_cursor import ObjectiveCursor, is_durable_predicate
+
+OBJECTIVES = {
+    'objective_hierarchy': {
+        'layer_1_strategic': [{
+            'id': 'phase_1',
+            'goal': 'Start',
+            'layer_2_tactical': [{
+                'id': 'tactical_1',
+                'goal': 'Get a Pokemon',
+                'layer_3_atomic': ['flag one', 'flag two', 'leave town', 'flag three'],
+            }],
+        }],
+    },
+}
+
+MEMORY = bytes(0x10000)
+
+
+class FakeEventChecker:
+    """Predicados: 'flag *' leen memoria, 'leave town' solo la ubicación"""
+
+    def __init__(self, done):
+        self.done = set(done)
+
+    def check_objective_complete(self, text, game_state, memory):
+        if text.startswith('flag'):
+            memory[0xD747]
+            return text in self.done
+        return game_state['map_id'] != 0
+
+
+def make_cursor(done):
+    cursor = ObjectiveCursor(OBJECTIVES)
+    cursor.bind(FakeEventChecker(done))
+    return cursor
+
+
+def test_durable_predicates():
+    checker = FakeEventChecker(())
+    assert is_durable_predicate(checker, 'flag one')
+    assert not is_durable_predicate(checker, 'leave town')
+
+
+def test_skips_contiguous_satisfied_prefix():
+    cursor = make_cursor({'flag one', 'flag two'})
+    skipped = cursor.skip_satisfied({'map_id': 0}, MEMORY)
+    assert [r.text for r in skipped] == ['flag one', 'flag two']
+    assert cursor.current.text == 'leave town'
+
+
+def test_stops_at_non_durable_objective():
+    # 'flag three' se cumple, pero 'leave town' no es duradero y corta el salto
+    cursor = make_cursor({'flag one', 'flag two', 'flag three'})
+    cursor.skip_satisfied({'map_id': 1}, MEMORY)
+    assert cursor.current.text == 'leave town'
+
+
+def test_does_not_jump_over_unsatisfied_objective():
+    cursor = make_cursor({'flag two'})
+    assert cursor.skip_satisfied({'map_id': 0}, MEMORY) == []
+    assert cursor.index == 0
+
+
+def test_unbound_cursor_never_skips():
+    cursor = ObjectiveCursor(OBJECTIVES)
+    assert cursor.skip_satisfied({'map_id': 0}, MEMORY) == []
@@ -0,0 +1,68 @@
+"""Tests de StepBudget y quantile"""
+
+import pytest
+
+from core.step_budget import StepBudget, quantile
+
+
+def test_quantile_interpolates():
+    assert quantile([10, 0, 20], 0.5) == 10
+    assert quantile([0, 10], 0.25) == pytest.approx(2.5)
+    assert quantile([7], 0.9) == 7
+    assert quantile([], 0.5) is None
+
+
+def test_default_budget_without_samples():
+    budget = StepBudget(default_budget=100, min_samples=3)
+    budget.record('o', 10)
+    assert budget.budget('o') == 100
+
+
+def test_budget_from_samples_is_clamped():
+    budget = StepBudget(quantile=0.5, margin=2.0, min_samples=3, min_budget=30, max_budget=1000)
+    for steps in (40, 50, 60):
+        budget.record('o', steps)
+    assert budget.budget('o') == 100
+    for steps in (1, 1, 1, 1):
+        budget.record('short', steps)
+    assert budget.budget('short') == 30
+
+
+def test_check_fires_each_recovery_once():
+    budget = StepBudget(default_budget=100)
+    assert budget.check('o', 10) is None
+    assert budget.check('o', 60) == 'reload_checkpoint'
+    assert budget.check('o', 61) is None
+    assert budget.check('o', 80) == 'escalate_model'
+    assert budget.check('o', 90) is None
+    assert budget.check('o', 100) == 'timeout'
+
+
+def test_timeouts_grow_budget_until_completed():
+    budget = StepBudget(default_budget=100, max_budget=350)
+    budget.record_timeout('o')
+    assert budget.budget('o') == 200
+    budget.record_timeout('o')
+    assert budget.budget('o') == 350
+    assert budget.samples['o'] == [100, 200]
+    budget.record('o', 300)
+    assert 'o' not in budget.streaks
+    assert budget.budget('o') == 350      # p90 de [100, 200, 300] * 1.5, acotado
+
+
+def test_timeout_resets_recoveries():
+    budget = StepBudget(default_budget=100)
+    assert budget.check('o', 60) == 'reload_checkpoint'
+    budget.record_timeout('o')
+    assert budget.check('o', 120) == 'reload_checkpoint'
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "budget.json")
+    budget = StepBudget(path)
+    budget.record('o', 42)
+    budget.record_timeout('p')
+    budget.save()
+    loaded = StepBudget(path)
+    assert loaded.samples == budget.samples
+    assert loaded.budget('p') == budget.budget('p')